@@ -6,20 +6,55 @@ Este script lê e analisa automaticamente os arquivos de resultados de testes de
 gerando estatísticas, gráficos e relatórios para facilitar a avaliação dos experimentos.
 
 Uso:
-    python analyze_results.py
+    python analyze_results.py [--workers N] [--no-cache] [--redraw] [--traces logs/traces.jsonl]
+    python analyze_results.py --stream [--chunksize N]   # .jtl maiores que a memória
+
+Os arquivos .jtl são lidos em paralelo (um processo por arquivo) e cada run
+lido fica em cache em analysis_output/.cache, indexado por tamanho, mtime e
+hash do conteúdo; nas execuções seguintes só runs novos ou alterados são lidos
+de novo.
+
+Os gráficos são desenhados em paralelo e só são refeitos quando os dados de
+entrada da figura (ou o código que a desenha) mudam; o hash de cada figura
+fica em analysis_output/.cache/figures.json. --redraw refaz todos.
+
+Com --traces, os logs de traces do servidor (TRACE_SAMPLE_RATE > 0) são
+cruzados com as amostras do .jtl pelo requestId (X-Request-ID) e o tempo de
+cada fase (validate, auth, lookup, commit, ...) é exportado por cenário e tipo
+em server_phase_breakdown.csv.
+
+Com --stream os .jtl são lidos em blocos e resumidos em sketches mergeáveis
+(histograma de latência, contagens por segundo e por código de resposta), com
+memória limitada independente do tamanho dos arquivos; os CSVs são os mesmos,
+e dos gráficos só os de throughput são gerados.
 
 Dependências:
     pip install pandas numpy matplotlib seaborn
+    pip install pyarrow  # opcional: cache em Parquet (sem ele usa pickle)
 """
+import argparse
+import hashlib
+import importlib.util
+import inspect
+import json
 import os
+import shutil
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # sem interface gráfica: as figuras só são salvas em arquivo, inclusive nos processos do pool
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 import matplotlib.ticker as mticker
 
+# pyarrow é opcional: sem ele o cache usa pickle (find_spec não importa o pacote)
+CACHE_FORMAT = 'parquet' if importlib.util.find_spec('pyarrow') is not None else 'pkl'
+
 # Configurações globais de visualização
 sns.set(style='whitegrid', palette='Set2')
 plt.rcParams['figure.figsize'] = (12, 6)
@@ -29,8 +64,20 @@ plt.rcParams['legend.fontsize'] = 11
 
 RESULTS_DIR = 'results'
 OUTPUT_DIR = 'analysis_output'
+CACHE_DIR = os.path.join(OUTPUT_DIR, '.cache')
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Colunas do .jtl usadas pela análise e seus tipos (as demais não são lidas)
+JTL_DTYPES = {
+    'timeStamp': 'int64',
+    'elapsed': 'int64',
+    'label': 'category',
+    'responseCode': 'category',
+    'responseMessage': 'string',
+    'success': 'bool',
+    'failureMessage': 'string',
+}
+
 # Ordem fixa dos cenários para os gráficos e tabelas
 SCENARIO_LABELS = {
     'sas_full_flow_low': 'Low',
@@ -53,183 +100,319 @@ def parse_metadata(fp: Path):
     run_id = fp.stem.split('_')[1] if '_' in fp.stem else '1'
     return scenario, run_id
 
-def load_data(jtl_files: List[Path]) -> pd.DataFrame:
-    """Lê todos os arquivos .jtl e concatena em um único DataFrame, com tratamento de erros."""
+def file_digest(fp: Path) -> str:
+    h = hashlib.sha1()
+    with open(fp, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def cache_path(digest: str) -> str:
+    return os.path.join(CACHE_DIR, f'{digest}.{CACHE_FORMAT}')
+
+def read_cached(path: str) -> pd.DataFrame:
+    if CACHE_FORMAT == 'parquet':
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+def parse_jtl(fp: Path, use_cache: bool = True):
+    """Lê um .jtl só com as colunas usadas e grava o resultado no cache (executa nos processos do pool)."""
+    df = pd.read_csv(
+        fp,
+        usecols=lambda c: c in JTL_DTYPES,
+        dtype={c: t for c, t in JTL_DTYPES.items() if t != 'bool'},
+        true_values=['true', 'True', 'TRUE'],
+        false_values=['false', 'False', 'FALSE'],
+    )
+    stat = fp.stat()
+    entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': file_digest(fp)}
+    if use_cache:
+        path = cache_path(entry['sha1'])
+        if CACHE_FORMAT == 'parquet':
+            df.to_parquet(path, index=False)
+        else:
+            df.to_pickle(path)
+    return df, entry
+
+def load_manifest() -> Dict[str, dict]:
+    try:
+        with open(os.path.join(CACHE_DIR, 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest: Dict[str, dict]):
+    path = os.path.join(CACHE_DIR, 'manifest.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+    # Remove caches de runs que não existem mais
+    referenced = {os.path.basename(cache_path(entry['sha1'])) for entry in manifest.values()}
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(f'.{CACHE_FORMAT}') and name not in referenced:
+            os.remove(os.path.join(CACHE_DIR, name))
+
+def cached_run(fp: Path, entry: Optional[dict]) -> Optional[pd.DataFrame]:
+    """DataFrame do cache se o arquivo não mudou desde a última leitura.
+
+    Tamanho e mtime iguais bastam; com mtime diferente (arquivo copiado ou
+    restaurado de backup) o hash do conteúdo decide.
+    """
+    if not entry or not os.path.exists(cache_path(entry['sha1'])):
+        return None
+    stat = fp.stat()
+    if stat.st_size != entry['size']:
+        return None
+    if stat.st_mtime_ns != entry['mtime_ns']:
+        if file_digest(fp) != entry['sha1']:
+            return None
+        entry['mtime_ns'] = stat.st_mtime_ns
+    try:
+        return read_cached(cache_path(entry['sha1']))
+    except Exception:
+        return None
+
+def load_data(jtl_files: List[Path], workers: Optional[int] = None, use_cache: bool = True) -> pd.DataFrame:
+    """Lê todos os arquivos .jtl e concatena em um único DataFrame, com tratamento de erros.
+
+    Runs já lidos vêm do cache; os novos ou alterados são lidos em paralelo.
+    """
+    if use_cache:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+    manifest = load_manifest() if use_cache else {}
+    frames = {}
+    to_parse = []
+    for f in jtl_files:
+        df = cached_run(f, manifest.get(str(f))) if use_cache else None
+        if df is None:
+            to_parse.append(f)
+        else:
+            frames[f] = df
+    print(f"[INFO] {len(frames)} runs do cache, {len(to_parse)} para ler.")
+
+    if to_parse:
+        workers = min(workers or os.cpu_count() or 1, len(to_parse))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {f: pool.submit(parse_jtl, f, use_cache) for f in to_parse}
+                results = {}
+                for f, future in futures.items():
+                    try:
+                        results[f] = future.result()
+                    except Exception as e:
+                        print(f"[ERRO] Falha ao ler {f}: {e}")
+        else:
+            results = {}
+            for f in to_parse:
+                try:
+                    results[f] = parse_jtl(f, use_cache)
+                except Exception as e:
+                    print(f"[ERRO] Falha ao ler {f}: {e}")
+        for f, (df, entry) in results.items():
+            frames[f] = df
+            manifest[str(f)] = entry
+
+    if use_cache:
+        save_manifest({str(f): manifest[str(f)] for f in jtl_files if str(f) in manifest})
+
     dfs = []
     for f in jtl_files:
-        try:
-            df = pd.read_csv(f)
-            scenario, run_id = parse_metadata(f)
-            df['scenario'] = scenario
-            df['run'] = run_id
-            df['request_type'] = df['label'] if 'label' in df.columns else 'unknown'
-            dfs.append(df)
-        except Exception as e:
-            print(f"[ERRO] Falha ao ler {f}: {e}")
+        if f not in frames:
+            continue
+        df = frames[f]
+        scenario, run_id = parse_metadata(f)
+        df['scenario'] = scenario
+        df['run'] = run_id
+        df['request_type'] = df['label'].astype(str) if 'label' in df.columns else 'unknown'
+        dfs.append(df)
     if dfs:
         all_data = pd.concat(dfs, ignore_index=True)
         print(f"[INFO] Total de linhas carregadas: {len(all_data)}")
         # Cálculo do tempo relativo (em segundos desde o início de cada run)
         if 'timeStamp' in all_data.columns:
             all_data['timeStamp'] = pd.to_datetime(all_data['timeStamp'], unit='ms')
-            all_data['time_rel'] = (
-                all_data.groupby(['scenario','run'])['timeStamp']
-                .transform(lambda ts: (ts - ts.min()).dt.total_seconds())
-            )
+            start = all_data.groupby(['scenario','run'])['timeStamp'].transform('min')
+            all_data['time_rel'] = (all_data['timeStamp'] - start).dt.total_seconds()
         return all_data
     else:
         print("[ERRO] Nenhum dado carregado.")
         return pd.DataFrame()
 
+# Percentis exportados, pelo nome da coluna
+QUANTILES = {'p50': 0.5, 'p90': 0.9, 'p95': 0.95, 'p99': 0.99, 'p999': 0.999}
+
+def group_quantiles(grouped, names: List[str]) -> pd.DataFrame:
+    """Vários percentis de todos os grupos em uma única chamada (uma coluna por nome de QUANTILES)."""
+    values = [QUANTILES[name] for name in names]
+    q = grouped.quantile(values).unstack()[values]
+    q.columns = names
+    return q
+
+def summarize_groups(grouped) -> pd.DataFrame:
+    """Estatísticas descritivas e todos os percentis de QUANTILES por grupo."""
+    stats = grouped.agg(['mean', 'median', 'std', 'min', 'max', 'count'])
+    return stats.join(group_quantiles(grouped, list(QUANTILES)))
+
+def compute_aggregates(all_data: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Agregações compartilhadas por todos os gráficos e CSVs, calculadas uma única vez.
+
+    - latency: estatísticas de elapsed por cenário e tipo
+    - throughput: requisições em cada segundo (time_rel arredondado) por cenário e tipo
+    - throughput_stats: estatísticas dessas contagens por cenário e tipo
+    """
+    keys = ['scenario','request_type']
+    aggregates = {}
+    if 'elapsed' in all_data.columns:
+        aggregates['latency'] = summarize_groups(all_data.groupby(keys)['elapsed']).reset_index()
+    if 'time_rel' in all_data.columns:
+        second = all_data['time_rel'].round().astype(int).rename('second')
+        throughput = (
+            all_data.groupby([all_data['scenario'], all_data['request_type'], second])
+            .size()
+            .rename('throughput')
+            .reset_index()
+        )
+        aggregates['throughput'] = throughput
+        aggregates['throughput_stats'] = summarize_groups(throughput.groupby(keys)['throughput']).reset_index()
+    return aggregates
+
+def export_stats(stats: pd.DataFrame, columns: List[str], filename: str) -> pd.DataFrame:
+    """Exporta colunas de uma agregação com o rótulo e a ordem fixa dos cenários."""
+    df_stats = stats[['scenario','request_type'] + columns].copy()
+    df_stats['scenario'] = pd.Categorical(df_stats['scenario'].map(get_scenario_label), categories=SCENARIO_ORDER, ordered=True)
+    df_stats = df_stats.sort_values('scenario')
+    df_stats.to_csv(f'{OUTPUT_DIR}/{filename}', index=False)
+    return df_stats
+
 def calc_stats(all_data: pd.DataFrame) -> pd.DataFrame:
     """Calcula estatísticas descritivas por cenário, tipo e run."""
     if 'elapsed' not in all_data.columns:
         print("[ERRO] Coluna 'elapsed' não encontrada.")
         return pd.DataFrame()
+    grouped = all_data.groupby(['scenario','request_type','run'])['elapsed']
     per_run = (
-        all_data
-        .groupby(['scenario','request_type','run'])['elapsed']
-        .agg(
-          count='count',
-          mean='mean',
-          p50=lambda x: x.median(),
-          p90=lambda x: np.percentile(x, 90),
-          p99=lambda x: np.percentile(x, 99),
-          std='std'
-        )
+        grouped.agg(['count', 'mean'])
+        .join(group_quantiles(grouped, ['p50', 'p90', 'p99']))
+        .join(grouped.std().rename('std'))
         .reset_index()
     )
+    export_per_run_stats(per_run)
+    return per_run
+
+class FigureJob(NamedTuple):
+    """Uma figura a desenhar: draw(data, path, **options) roda em um processo do pool."""
+    path: str
+    draw: Callable
+    data: pd.DataFrame
+    options: dict
+    description: str
+
+def export_per_run_stats(per_run: pd.DataFrame):
     per_run.to_csv(f'{OUTPUT_DIR}/stats_per_run.csv', index=False)
     print(f"[INFO] Estatísticas por run salvas em {OUTPUT_DIR}/stats_per_run.csv")
-    return per_run
 
-def plot_latency_boxplot(all_data: pd.DataFrame, request_type_order=None):
-    """Generates a latency boxplot by scenario/type and exports statistics."""
-    if 'elapsed' not in all_data.columns:
+def plot_latency_boxplot(all_data: pd.DataFrame, aggregates: Dict[str, pd.DataFrame], request_type_order=None) -> List[FigureJob]:
+    """Exports latency statistics and returns the latency boxplot by scenario/type."""
+    if 'latency' not in aggregates:
         print("[ERROR] Column 'elapsed' not found for latency.")
-        return
-    all_data = all_data.copy()
-    all_data['scenario_label'] = all_data['scenario'].map(get_scenario_label)
-    stats = []
-    for (scenario, req_type), grp in all_data.groupby(['scenario','request_type']):
-        lat = grp['elapsed']
-        stats.append({
-            'scenario': get_scenario_label(scenario),
-            'request_type': req_type,
-            'mean': float(lat.mean()),
-            'median': float(lat.median()),
-            'std': float(lat.std()),
-            'min': float(lat.min()),
-            'max': float(lat.max()),
-            'p90': float(np.percentile(lat, 90)),
-            'p99': float(np.percentile(lat, 99))
-        })
-    df_stats = pd.DataFrame(stats)
-    # Ensure scenario order in export
-    df_stats['scenario'] = pd.Categorical(df_stats['scenario'], categories=SCENARIO_ORDER, ordered=True)
-    df_stats = df_stats.sort_values('scenario')
-    df_stats.to_csv(f'{OUTPUT_DIR}/latency_stats.csv', index=False)
-    print(f"[INFO] Latency statistics saved to {OUTPUT_DIR}/latency_stats.csv")
+        return []
+    export_latency_stats(aggregates)
+    data = all_data[['request_type','elapsed']].assign(scenario_label=all_data['scenario'].map(get_scenario_label))
+    return [FigureJob(f'{OUTPUT_DIR}/boxplot_latency.png', draw_latency_boxplot, data, {'request_type_order': request_type_order}, 'Latency boxplot')]
+
+def draw_latency_boxplot(data: pd.DataFrame, fname: str, request_type_order=None):
     plt.figure(figsize=(10,6))
-    sns.boxplot(data=all_data, x='scenario_label', y='elapsed', hue='request_type', hue_order=request_type_order, order=SCENARIO_ORDER, showfliers=False)
+    sns.boxplot(data=data, x='scenario_label', y='elapsed', hue='request_type', hue_order=request_type_order, order=SCENARIO_ORDER, showfliers=False)
     plt.yscale('log')
     plt.title('Latency Boxplot (ms) by Scenario and Type')
     plt.xlabel('Scenario')
     plt.ylabel('Latency (ms)')
     plt.legend(title='Request Type', bbox_to_anchor=(1.05, 1), loc='upper left')
     plt.tight_layout()
-    plt.savefig(f'{OUTPUT_DIR}/boxplot_latency.png')
+    plt.savefig(fname)
     plt.close()
-    print(f"[INFO] Latency boxplot saved: {OUTPUT_DIR}/boxplot_latency.png")
 
-def plot_throughput_boxplot(all_data: pd.DataFrame, request_type_order=None):
-    """Generates a throughput boxplot (req/s) by scenario/type and exports statistics."""
-    if 'time_rel' not in all_data.columns:
+def export_latency_stats(aggregates: Dict[str, pd.DataFrame]):
+    stats = aggregates['latency'].astype({c: float for c in ['mean','median','std','min','max','p90','p99']})
+    export_stats(stats, ['mean','median','std','min','max','p90','p99'], 'latency_stats.csv')
+    print(f"[INFO] Latency statistics saved to {OUTPUT_DIR}/latency_stats.csv")
+
+def plot_throughput_boxplot(aggregates: Dict[str, pd.DataFrame], request_type_order=None) -> List[FigureJob]:
+    """Exports throughput statistics and returns the throughput boxplot (req/s) by scenario/type."""
+    if 'throughput' not in aggregates:
         print("[ERROR] Column 'time_rel' not found for throughput.")
-        return
-    all_data = all_data.copy()
-    all_data['time_rel_rounded'] = all_data['time_rel'].round().astype(int)
-    all_data['scenario_label'] = all_data['scenario'].map(get_scenario_label)
-    stats = []
-    throughput_data = []
-    for (scenario, req_type), grp in all_data.groupby(['scenario','request_type']):
-        ts = grp.groupby('time_rel_rounded').size()
-        for v in ts:
-            throughput_data.append({'scenario': get_scenario_label(scenario), 'request_type': req_type, 'throughput': v})
-        stats.append({
-            'scenario': get_scenario_label(scenario),
-            'request_type': req_type,
-            'mean': ts.mean(),
-            'median': ts.median(),
-            'std': ts.std(),
-            'min': ts.min(),
-            'max': ts.max(),
-            'p90': np.percentile(ts, 90),
-            'p99': np.percentile(ts, 99)
-        })
-    df_throughput = pd.DataFrame(throughput_data)
-    df_stats = pd.DataFrame(stats)
-    # Ensure scenario order in export
-    df_stats['scenario'] = pd.Categorical(df_stats['scenario'], categories=SCENARIO_ORDER, ordered=True)
-    df_stats = df_stats.sort_values('scenario')
-    df_stats.to_csv(f'{OUTPUT_DIR}/throughput_stats.csv', index=False)
+        return []
+    export_throughput_stats(aggregates)
+    df_throughput = aggregates['throughput'][['scenario','request_type','throughput']].copy()
+    if df_throughput.empty:
+        return []
+    df_throughput['scenario'] = pd.Categorical(df_throughput['scenario'].map(get_scenario_label), categories=SCENARIO_ORDER, ordered=True)
+    return [FigureJob(f'{OUTPUT_DIR}/boxplot_throughput.png', draw_throughput_boxplot, df_throughput, {'request_type_order': request_type_order}, 'Throughput boxplot')]
+
+def draw_throughput_boxplot(data: pd.DataFrame, fname: str, request_type_order=None):
+    plt.figure(figsize=(10,6))
+    sns.boxplot(data=data, x='scenario', y='throughput', hue='request_type', hue_order=request_type_order, order=SCENARIO_ORDER, showfliers=False)
+    plt.title('Throughput Boxplot (req/s) by Scenario and Type')
+    plt.xlabel('Scenario')
+    plt.ylabel('Requests per second')
+    plt.legend(title='Request Type', bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.tight_layout()
+    plt.savefig(fname)
+    plt.close()
+
+def export_throughput_stats(aggregates: Dict[str, pd.DataFrame]):
+    export_stats(aggregates['throughput_stats'], ['mean','median','std','min','max','p90','p99'], 'throughput_stats.csv')
     print(f"[INFO] Throughput statistics saved to {OUTPUT_DIR}/throughput_stats.csv")
-    if not df_throughput.empty:
-        df_throughput['scenario'] = pd.Categorical(df_throughput['scenario'], categories=SCENARIO_ORDER, ordered=True)
-        plt.figure(figsize=(10,6))
-        sns.boxplot(data=df_throughput, x='scenario', y='throughput', hue='request_type', hue_order=request_type_order, order=SCENARIO_ORDER, showfliers=False)
-        plt.title('Throughput Boxplot (req/s) by Scenario and Type')
-        plt.xlabel('Scenario')
-        plt.ylabel('Requests per second')
-        plt.legend(title='Request Type', bbox_to_anchor=(1.05, 1), loc='upper left')
-        plt.tight_layout()
-        plt.savefig(f'{OUTPUT_DIR}/boxplot_throughput.png')
-        plt.close()
-        print(f"[INFO] Throughput boxplot saved: {OUTPUT_DIR}/boxplot_throughput.png")
-
-def plot_error_rate_barplot(all_data: pd.DataFrame, request_type_order=None):
-    """Generates a barplot of mean error rate by scenario/type and exports statistics."""
+
+def plot_error_rate_barplot(all_data: pd.DataFrame, request_type_order=None) -> List[FigureJob]:
+    """Exports error rate statistics and returns the barplot of mean error rate by scenario/type."""
     if 'success' not in all_data.columns:
         print("[ERROR] Column 'success' not found for error rate.")
-        return
-    all_data = all_data.copy()
-    all_data['is_error'] = ~all_data['success'].astype(bool)
-    all_data['scenario_label'] = all_data['scenario'].map(get_scenario_label)
+        return []
+    data = all_data[['scenario','request_type']].assign(is_error=~all_data['success'].astype(bool))
     stats = (
-        all_data.groupby(['scenario','request_type'])['is_error']
+        data.groupby(['scenario','request_type'])['is_error']
         .agg(['mean','std','min','max'])
         .reset_index()
         .rename(columns={'mean':'error_rate_mean','std':'error_rate_std','min':'error_rate_min','max':'error_rate_max'})
     )
-    # Replace scenario names in export and ensure order
-    stats['scenario'] = stats['scenario'].map(get_scenario_label)
-    stats['scenario'] = pd.Categorical(stats['scenario'], categories=SCENARIO_ORDER, ordered=True)
-    stats = stats.sort_values('scenario')
-    stats.to_csv(f'{OUTPUT_DIR}/error_rate_stats.csv', index=False)
-    print(f"[INFO] Error rate statistics saved to {OUTPUT_DIR}/error_rate_stats.csv")
+    export_error_rate_stats(stats)
+    data['scenario_label'] = data.pop('scenario').map(get_scenario_label)
+    return [FigureJob(f'{OUTPUT_DIR}/barplot_error_rate.png', draw_error_rate_barplot, data, {'request_type_order': request_type_order}, 'Error rate barplot')]
+
+def draw_error_rate_barplot(data: pd.DataFrame, fname: str, request_type_order=None):
     plt.figure(figsize=(10,6))
-    sns.barplot(data=all_data, x='scenario_label', y='is_error', hue='request_type', hue_order=request_type_order, order=SCENARIO_ORDER, estimator=np.mean)
+    sns.barplot(data=data, x='scenario_label', y='is_error', hue='request_type', hue_order=request_type_order, order=SCENARIO_ORDER, estimator=np.mean)
     plt.title('Mean Error Rate by Scenario and Type')
     plt.xlabel('Scenario')
     plt.ylabel('Mean error rate')
     plt.legend(title='Request Type', bbox_to_anchor=(1.05, 1), loc='upper left')
     plt.tight_layout()
-    plt.savefig(f'{OUTPUT_DIR}/barplot_error_rate.png')
+    plt.savefig(fname)
     plt.close()
-    print(f"[INFO] Error rate barplot saved: {OUTPUT_DIR}/barplot_error_rate.png")
+
+def export_error_rate_stats(stats: pd.DataFrame):
+    # Replace scenario names in export and ensure order
+    stats['scenario'] = stats['scenario'].map(get_scenario_label)
+    stats['scenario'] = pd.Categorical(stats['scenario'], categories=SCENARIO_ORDER, ordered=True)
+    stats = stats.sort_values('scenario')
+    stats.to_csv(f'{OUTPUT_DIR}/error_rate_stats.csv', index=False)
+    print(f"[INFO] Error rate statistics saved to {OUTPUT_DIR}/error_rate_stats.csv")
+
+def export_response_codes(resp: pd.DataFrame):
+    resp = resp.sort_values(['scenario','request_type','count'], ascending=[True,True,False])
+    resp.to_csv(f'{OUTPUT_DIR}/response_codes.csv', index=False)
+    print(f"[INFO] Tabela de responseCode salva em {OUTPUT_DIR}/response_codes.csv")
 
 def export_reports(all_data: pd.DataFrame):
     """Exporta tabelas de códigos de resposta e erros para CSV."""
     if 'responseCode' in all_data.columns:
-        resp = (
+        export_response_codes(
             all_data
             .groupby(['scenario','request_type','responseCode'])
             .size()
             .reset_index(name='count')
-            .sort_values(['scenario','request_type','count'], ascending=[True,True,False])
         )
-        resp.to_csv(f'{OUTPUT_DIR}/response_codes.csv', index=False)
-        print(f"[INFO] Tabela de responseCode salva em {OUTPUT_DIR}/response_codes.csv")
     if 'success' in all_data.columns and 'failureMessage' in all_data.columns:
         erros = all_data[all_data['success'] == False]
         if not erros.empty:
@@ -238,162 +421,525 @@ def export_reports(all_data: pd.DataFrame):
             erros[cols].to_csv(f'{OUTPUT_DIR}/erros.csv', index=False)
             print(f"[INFO] Tabela de erros salva em {OUTPUT_DIR}/erros.csv")
 
-def tail_latency_stats(all_data: pd.DataFrame):
+def tail_latency_stats(aggregates: Dict[str, pd.DataFrame]):
     """Calculates and exports advanced percentiles (p95, p99, p99.9) for latency by scenario and request type."""
-    stats = []
-    for (scenario, req_type), grp in all_data.groupby(['scenario','request_type']):
-        lat = grp['elapsed']
-        stats.append({
-            'scenario': get_scenario_label(scenario),
-            'request_type': req_type,
-            'p95': float(np.percentile(lat, 95)),
-            'p99': float(np.percentile(lat, 99)),
-            'p999': float(np.percentile(lat, 99.9)),
-            'max': float(lat.max()),
-            'count': int(len(lat))
-        })
-    df_stats = pd.DataFrame(stats)
-    df_stats['scenario'] = pd.Categorical(df_stats['scenario'], categories=SCENARIO_ORDER, ordered=True)
-    df_stats = df_stats.sort_values('scenario')
-    df_stats.to_csv(f'{OUTPUT_DIR}/tail_latency_stats.csv', index=False)
+    if 'latency' not in aggregates:
+        print("[ERROR] Column 'elapsed' not found for tail latency stats.")
+        return
+    stats = aggregates['latency'].astype({'p95': float, 'p99': float, 'p999': float, 'max': float, 'count': int})
+    df_stats = export_stats(stats, ['p95','p99','p999','max','count'], 'tail_latency_stats.csv')
     print(f"[INFO] Tail latency percentiles saved to {OUTPUT_DIR}/tail_latency_stats.csv")
     print(df_stats)
 
-def tail_throughput_stats(all_data: pd.DataFrame):
+def tail_throughput_stats(aggregates: Dict[str, pd.DataFrame]):
     """Calculates and exports advanced percentiles (p95, p99, p99.9) for throughput by scenario and request type."""
-    if 'time_rel' not in all_data.columns:
+    if 'throughput' not in aggregates:
         print("[ERROR] Column 'time_rel' not found for tail throughput stats.")
         return
-    all_data = all_data.copy()
-    all_data['time_rel_rounded'] = all_data['time_rel'].round().astype(int)
-    throughput_data = []
-    for (scenario, req_type), grp in all_data.groupby(['scenario','request_type']):
-        ts = grp.groupby('time_rel_rounded').size()
-        throughput_data.append({
-            'scenario': get_scenario_label(scenario),
-            'request_type': req_type,
-            'p95': float(np.percentile(ts, 95)) if len(ts) > 0 else np.nan,
-            'p99': float(np.percentile(ts, 99)) if len(ts) > 0 else np.nan,
-            'p999': float(np.percentile(ts, 99.9)) if len(ts) > 0 else np.nan,
-            'max': float(ts.max()) if len(ts) > 0 else np.nan,
-            'count': int(len(ts))
-        })
-    df_stats = pd.DataFrame(throughput_data)
-    df_stats['scenario'] = pd.Categorical(df_stats['scenario'], categories=SCENARIO_ORDER, ordered=True)
-    df_stats = df_stats.sort_values('scenario')
-    df_stats.to_csv(f'{OUTPUT_DIR}/tail_throughput_stats.csv', index=False)
+    stats = aggregates['throughput_stats'].astype({'p95': float, 'p99': float, 'p999': float, 'max': float, 'count': int})
+    df_stats = export_stats(stats, ['p95','p99','p999','max','count'], 'tail_throughput_stats.csv')
     print(f"[INFO] Tail throughput percentiles saved to {OUTPUT_DIR}/tail_throughput_stats.csv")
     print(df_stats)
 
-def plot_latency_by_type(all_data: pd.DataFrame):
-    """Gera boxplots de latência por tipo de requisição, comparando cenários."""
+def figure_by_type(req_type, suffix: str) -> str:
+    return f'{OUTPUT_DIR}/{suffix}_{req_type}.png'.replace(' ', '_')
+
+def plot_latency_by_type(all_data: pd.DataFrame) -> List[FigureJob]:
+    """Boxplots de latência por tipo de requisição, comparando cenários (uma figura por tipo)."""
+    jobs = []
     for req_type in all_data['request_type'].unique():
-        subset = all_data[all_data['request_type'] == req_type].copy()
+        subset = all_data.loc[all_data['request_type'] == req_type, ['scenario','elapsed']]
         if subset.empty:
             continue
-        subset['scenario_label'] = subset['scenario'].map(get_scenario_label)
-        plt.figure(figsize=(8,5))
-        sns.boxplot(
-            data=subset,
-            x='scenario_label',
-            y='elapsed',
-            order=SCENARIO_ORDER,
-            showfliers=False
-        )
-        plt.yscale('log')
-        plt.grid(which='major', axis='y', linestyle='-', linewidth=1, alpha=0.8)
-        plt.title(f'Latency (ms) — {req_type}')
-        plt.xlabel('Scenario')
-        plt.ylabel('Latency (ms)')
-        plt.tight_layout()
-        fname = f'{OUTPUT_DIR}/boxplot_latency_{req_type}.png'.replace(' ', '_')
-        plt.savefig(fname)
-        plt.close()
-        print(f"[INFO] Latency boxplot by type saved: {fname}")
-
-def plot_throughput_by_type(all_data: pd.DataFrame):
-    """Gera boxplots de throughput por tipo de requisição, comparando cenários, todos alinhados com o mesmo limite de eixo y."""
-    if 'time_rel' not in all_data.columns:
+        data = subset[['elapsed']].assign(scenario_label=subset['scenario'].map(get_scenario_label))
+        jobs.append(FigureJob(figure_by_type(req_type, 'boxplot_latency'), draw_latency_by_type, data, {'req_type': str(req_type)}, 'Latency boxplot by type'))
+    return jobs
+
+def draw_latency_by_type(data: pd.DataFrame, fname: str, req_type: str):
+    plt.figure(figsize=(8,5))
+    sns.boxplot(
+        data=data,
+        x='scenario_label',
+        y='elapsed',
+        order=SCENARIO_ORDER,
+        showfliers=False
+    )
+    plt.yscale('log')
+    plt.grid(which='major', axis='y', linestyle='-', linewidth=1, alpha=0.8)
+    plt.title(f'Latency (ms) — {req_type}')
+    plt.xlabel('Scenario')
+    plt.ylabel('Latency (ms)')
+    plt.tight_layout()
+    plt.savefig(fname)
+    plt.close()
+
+def plot_throughput_by_type(aggregates: Dict[str, pd.DataFrame]) -> List[FigureJob]:
+    """Boxplots de throughput por tipo de requisição, comparando cenários (uma figura por tipo)."""
+    if 'throughput' not in aggregates:
         print("[ERROR] Column 'time_rel' not found for throughput by type.")
-        return
-    all_data = all_data.copy()
-    all_data['time_rel_rounded'] = all_data['time_rel'].round().astype(int)
-    all_data['scenario_label'] = all_data['scenario'].map(get_scenario_label)
-    throughput_data = []
-    for (scenario, req_type), grp in all_data.groupby(['scenario','request_type']):
-        ts = grp.groupby('time_rel_rounded').size()
-        for v in ts:
-            throughput_data.append({'scenario': get_scenario_label(scenario), 'request_type': req_type, 'throughput': v})
-    df_throughput = pd.DataFrame(throughput_data)
+        return []
+    df_throughput = aggregates['throughput']
+    jobs = []
     for req_type in df_throughput['request_type'].unique():
-        subset = df_throughput[df_throughput['request_type'] == req_type].copy()
+        subset = df_throughput.loc[df_throughput['request_type'] == req_type, ['scenario','throughput']]
         if subset.empty:
             continue
-        subset['scenario_label'] = subset['scenario'].map(get_scenario_label)
-        subset['scenario_label'] = pd.Categorical(subset['scenario_label'], categories=SCENARIO_ORDER, ordered=True)
-        plt.figure(figsize=(8,5))
-        sns.boxplot(
-            data=subset,
-            x='scenario_label',
-            y='throughput',
-            order=SCENARIO_ORDER,
-            showfliers=False
+        data = subset[['throughput']].assign(
+            scenario_label=pd.Categorical(subset['scenario'].map(get_scenario_label), categories=SCENARIO_ORDER, ordered=True)
         )
-        plt.grid(which='major', axis='y', linestyle='-', linewidth=1, alpha=0.8)
-        plt.title(f'Throughput (req/s) — {req_type}')
-        plt.xlabel('Scenario')
-        plt.ylabel('Requests per second')
-        plt.tight_layout()
-        fname = f'{OUTPUT_DIR}/boxplot_throughput_{req_type}.png'.replace(' ', '_')
-        plt.savefig(fname)
-        plt.close()
-        print(f"[INFO] Throughput boxplot by type saved: {fname}")
-
-def plot_error_rate_by_type(all_data: pd.DataFrame):
-    """Gera gráficos de barra da taxa de erro por tipo de requisição, comparando cenários."""
-    all_data = all_data.copy()
-    all_data['is_error'] = ~all_data['success'].astype(bool)
+        jobs.append(FigureJob(figure_by_type(req_type, 'boxplot_throughput'), draw_throughput_by_type, data, {'req_type': str(req_type)}, 'Throughput boxplot by type'))
+    return jobs
+
+def draw_throughput_by_type(data: pd.DataFrame, fname: str, req_type: str):
+    plt.figure(figsize=(8,5))
+    sns.boxplot(
+        data=data,
+        x='scenario_label',
+        y='throughput',
+        order=SCENARIO_ORDER,
+        showfliers=False
+    )
+    plt.grid(which='major', axis='y', linestyle='-', linewidth=1, alpha=0.8)
+    plt.title(f'Throughput (req/s) — {req_type}')
+    plt.xlabel('Scenario')
+    plt.ylabel('Requests per second')
+    plt.tight_layout()
+    plt.savefig(fname)
+    plt.close()
+
+def plot_error_rate_by_type(all_data: pd.DataFrame) -> List[FigureJob]:
+    """Gráficos de barra da taxa de erro por tipo de requisição, comparando cenários (uma figura por tipo)."""
+    jobs = []
     for req_type in all_data['request_type'].unique():
-        subset = all_data[all_data['request_type'] == req_type].copy()
+        subset = all_data.loc[all_data['request_type'] == req_type, ['scenario','success']]
         if subset.empty:
             continue
-        subset['scenario_label'] = subset['scenario'].map(get_scenario_label)
-        plt.figure(figsize=(8,5))
-        sns.barplot(
-            data=subset,
-            x='scenario_label',
-            y='is_error',
-            order=SCENARIO_ORDER,
-            estimator=np.mean
-        )
-        plt.title(f'Mean Error Rate — {req_type}')
-        plt.xlabel('Scenario')
-        plt.ylabel('Mean error rate')
-        plt.tight_layout()
-        fname = f'{OUTPUT_DIR}/barplot_error_rate_{req_type}.png'.replace(' ', '_')
-        plt.savefig(fname)
-        plt.close()
-        print(f"[INFO] Error rate barplot by type saved: {fname}")
+        data = pd.DataFrame({
+            'scenario_label': subset['scenario'].map(get_scenario_label),
+            'is_error': ~subset['success'].astype(bool),
+        })
+        jobs.append(FigureJob(figure_by_type(req_type, 'barplot_error_rate'), draw_error_rate_by_type, data, {'req_type': str(req_type)}, 'Error rate barplot by type'))
+    return jobs
+
+def draw_error_rate_by_type(data: pd.DataFrame, fname: str, req_type: str):
+    plt.figure(figsize=(8,5))
+    sns.barplot(
+        data=data,
+        x='scenario_label',
+        y='is_error',
+        order=SCENARIO_ORDER,
+        estimator=np.mean
+    )
+    plt.title(f'Mean Error Rate — {req_type}')
+    plt.xlabel('Scenario')
+    plt.ylabel('Mean error rate')
+    plt.tight_layout()
+    plt.savefig(fname)
+    plt.close()
+
+# --- Renderização das figuras: em paralelo e só quando os dados de entrada mudam ---
+
+FIGURES_MANIFEST = os.path.join(CACHE_DIR, 'figures.json')
+
+def figure_key(job: FigureJob) -> str:
+    """Hash de tudo que define a figura: código da função de desenho, opções e dados de entrada."""
+    h = hashlib.sha1(inspect.getsource(job.draw).encode())
+    h.update(json.dumps(job.options, sort_keys=True).encode())
+    h.update(json.dumps([[str(c), str(t)] for c, t in job.data.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(job.data, index=False).values.tobytes())
+    return h.hexdigest()
+
+def render_figures(jobs: List[FigureJob], workers: Optional[int] = None, redraw: bool = False):
+    """Desenha as figuras em um pool de processos, pulando as que já existem com o mesmo hash em FIGURES_MANIFEST."""
+    try:
+        with open(FIGURES_MANIFEST) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    pending = []
+    for job in jobs:
+        key = figure_key(job)
+        if not redraw and manifest.get(job.path) == key and os.path.exists(job.path):
+            print(f"[INFO] {job.description} unchanged: {job.path}")
+        else:
+            pending.append((job, key))
+    workers = max(min(workers or os.cpu_count() or 1, len(pending)), 1)
+    # Com um único processo o pool só acrescentaria o custo de copiar os dados
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        if pool:
+            results = [(job, key, pool.submit(job.draw, job.data, job.path, **job.options)) for job, key in pending]
+        else:
+            results = [(job, key, None) for job, key in pending]
+        for job, key, future in results:
+            try:
+                if future:
+                    future.result()
+                else:
+                    job.draw(job.data, job.path, **job.options)
+            except Exception as e:
+                manifest.pop(job.path, None)
+                print(f"[ERRO] Falha ao desenhar {job.path}: {e}")
+                continue
+            manifest[job.path] = key
+            print(f"[INFO] {job.description} saved: {job.path}")
+    finally:
+        if pool:
+            pool.shutdown()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(FIGURES_MANIFEST + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(FIGURES_MANIFEST + '.tmp', FIGURES_MANIFEST)
+
+# --- Fases do servidor (--traces): log de traces cruzado com as linhas do .jtl pelo requestId ---
+
+# Fases do Server-Timing na ordem do fluxo; "app" é o tempo do servidor fora delas
+# e "network" a diferença entre o elapsed do cliente e o total do servidor
+SERVER_PHASES = ['validate', 'auth', 'lookup', 'conflict', 'commit', 'ledger', 'serialize', 'app']
+
+def load_traces(paths: List[str]) -> pd.DataFrame:
+    """Lê os logs de traces do servidor (uma linha JSON por requisição) com uma coluna por fase, em ms."""
+    records = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                trace = json.loads(line)
+                record = {'requestId': trace['requestId'], 'route': trace.get('route'), 'server_total': trace['total']}
+                record.update(trace.get('phases', {}))
+                records.append(record)
+    traces = pd.DataFrame(records, columns=['requestId', 'route', 'server_total'] + SERVER_PHASES[:-1])
+    traces[SERVER_PHASES[:-1]] = traces[SERVER_PHASES[:-1]].astype(float).fillna(0.0)
+    traces['app'] = (traces['server_total'] - traces[SERVER_PHASES[:-1]].sum(axis=1)).clip(lower=0.0)
+    return traces.drop_duplicates('requestId', keep='last')
+
+def read_request_ids(jtl_files: List[Path]) -> pd.DataFrame:
+    """requestId, tipo e elapsed de cada amostra dos .jtl que têm a coluna requestId."""
+    frames = []
+    for fp in jtl_files:
+        df = pd.read_csv(fp, usecols=lambda c: c in ('label', 'elapsed', 'requestId'), dtype={'label': 'str', 'requestId': 'str'})
+        if 'requestId' not in df.columns:
+            continue
+        df['scenario'], df['run'] = parse_metadata(fp)
+        frames.append(df.dropna(subset=['requestId']).rename(columns={'label': 'request_type'}))
+    if not frames:
+        return pd.DataFrame(columns=['request_type', 'elapsed', 'requestId', 'scenario', 'run'])
+    return pd.concat(frames, ignore_index=True)
+
+def server_phase_breakdown(jtl_files: List[Path], trace_paths: List[str]) -> List[FigureJob]:
+    """Cruza os traces do servidor com as amostras do .jtl e exporta o tempo por fase por cenário e tipo."""
+    samples = read_request_ids(jtl_files)
+    if samples.empty:
+        print("[ERROR] Nenhum .jtl com a coluna requestId (JMeter com -Jsample_variables=requestId ou scripts/load_generator.py).")
+        return []
+    joined = samples.merge(load_traces(trace_paths), on='requestId', how='inner')
+    print(f"[INFO] {len(joined)} de {len(samples)} amostras com trace do servidor.")
+    if joined.empty:
+        return []
+    joined['network'] = (joined['elapsed'] - joined['server_total']).clip(lower=0.0)
+    phases = SERVER_PHASES + ['network']
+    long = joined.melt(id_vars=['scenario', 'request_type', 'elapsed'], value_vars=phases, var_name='phase', value_name='ms')
+    grouped = long.groupby(['scenario', 'request_type', 'phase'], sort=False)['ms']
+    breakdown = grouped.agg(['count', 'mean']).join(group_quantiles(grouped, ['p50', 'p99'])).reset_index()
+    breakdown = breakdown.rename(columns={'mean': 'mean_ms', 'p50': 'p50_ms', 'p99': 'p99_ms'})
+    elapsed = joined.groupby(['scenario', 'request_type'])['elapsed'].mean().rename('elapsed_mean_ms')
+    breakdown = breakdown.join(elapsed, on=['scenario', 'request_type'])
+    breakdown['share'] = breakdown['mean_ms'] / breakdown['elapsed_mean_ms']
+    breakdown['phase'] = pd.Categorical(breakdown['phase'], categories=phases, ordered=True)
+    breakdown['scenario'] = pd.Categorical(breakdown['scenario'].map(get_scenario_label), categories=SCENARIO_ORDER, ordered=True)
+    breakdown = breakdown.sort_values(['scenario', 'request_type', 'phase'])
+    breakdown.to_csv(f'{OUTPUT_DIR}/server_phase_breakdown.csv', index=False)
+    print(f"[INFO] Server phase breakdown saved to {OUTPUT_DIR}/server_phase_breakdown.csv")
+    data = breakdown[['scenario', 'request_type', 'phase', 'mean_ms']].copy()
+    return [FigureJob(f'{OUTPUT_DIR}/barplot_server_phases.png', draw_server_phases, data, {}, 'Server phase barplot')]
+
+def draw_server_phases(data: pd.DataFrame, fname: str):
+    scenarios = [s for s in SCENARIO_ORDER if (data['scenario'] == s).any()]
+    fig, axes = plt.subplots(1, len(scenarios), figsize=(5 * len(scenarios), 6), sharey=True, squeeze=False)
+    for ax, scenario in zip(axes[0], scenarios):
+        table = data[data['scenario'] == scenario].pivot_table(index='request_type', columns='phase', values='mean_ms', observed=True)
+        table.plot(kind='bar', stacked=True, ax=ax, legend=False, colormap='tab10')
+        ax.set_title(scenario)
+        ax.set_xlabel('Request Type')
+        ax.set_ylabel('Mean time (ms)')
+    handles, labels = axes[0][0].get_legend_handles_labels()
+    fig.legend(handles, labels, title='Phase', bbox_to_anchor=(1.0, 0.5), loc='center left')
+    fig.suptitle('Mean Server Time per Phase by Scenario and Type')
+    fig.tight_layout()
+    fig.savefig(fname, bbox_inches='tight')
+    plt.close(fig)
+
+# --- Modo streaming (--stream): .jtl lidos em blocos e resumidos em sketches mergeáveis ---
+
+STREAM_CHUNK_SIZE = 200000
+# Bits significativos do histograma de latência: valores até 1023 ms são exatos,
+# acima disso o erro relativo é menor que 0,2% (como um HDR histogram)
+HISTOGRAM_BITS = 10
+
+class LatencyHistogram:
+    """Histograma mergeável de latências inteiras (ms) com média e variância exatas.
+
+    Percentis são interpolados como no np.percentile (método linear) sobre os
+    valores dos buckets; média e variância usam a combinação de momentos de
+    Chan, então dois histogramas somados dão o mesmo resultado que um só.
+    """
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, values: np.ndarray):
+        if len(values) == 0:
+            return
+        values = np.maximum(values.astype(np.int64), 0)
+        shift = np.maximum(np.floor(np.log2(np.maximum(values, 1))).astype(np.int64) - (HISTOGRAM_BITS - 1), 0)
+        buckets, counts = np.unique((values >> shift) << shift, return_counts=True)
+        self.counts.update(dict(zip(buckets.tolist(), counts.tolist())))
+        chunk = LatencyHistogram()
+        chunk.count = len(values)
+        chunk.mean = float(values.mean())
+        chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+        chunk.min, chunk.max = int(values.min()), int(values.max())
+        self._merge_moments(chunk)
+
+    def merge(self, other: 'LatencyHistogram'):
+        self.counts.update(other.counts)
+        self._merge_moments(other)
+
+    def _merge_moments(self, other: 'LatencyHistogram'):
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else np.nan
+
+    def quantiles(self, qs: List[float]) -> List[float]:
+        values = np.array(sorted(self.counts), dtype=float)
+        cumulative = np.cumsum([self.counts[v] for v in sorted(self.counts)])
+        result = []
+        for q in qs:
+            h = (self.count - 1) * q
+            lo = int(np.floor(h))
+            t = h - lo
+            a = values[np.searchsorted(cumulative, lo, side='right')]
+            b = values[np.searchsorted(cumulative, min(lo + 1, self.count - 1), side='right')]
+            # Mesma fórmula do np.percentile (lerp simétrico)
+            result.append(float(b - (b - a) * (1 - t)) if t >= 0.5 else float(a + (b - a) * t))
+        return result
+
+class RunSketch:
+    """Resumo de um .jtl por tipo de requisição: latência, contagens por segundo, erros e códigos de resposta."""
+
+    def __init__(self, scenario: str, run: str):
+        self.scenario = scenario
+        self.run = run
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self.per_second: Dict[str, Counter] = {}
+        self.outcomes: Dict[str, List[int]] = {}  # [requisições, erros]
+        self.codes: Counter = Counter()  # (label, responseCode) -> contagem
+        self.errors_file: Optional[str] = None
+
+    def add(self, chunk: pd.DataFrame, start: int):
+        # Segundo relativo ao início do run, arredondado como no modo em memória
+        second = np.round((chunk['timeStamp'].to_numpy() - start) / 1000.0).astype(int)
+        is_error = ~chunk['success'].to_numpy(dtype=bool)
+        labels = chunk['label'].astype(str).to_numpy()
+        for label in np.unique(labels):
+            mask = labels == label
+            self.latency.setdefault(label, LatencyHistogram()).add(chunk['elapsed'].to_numpy()[mask])
+            seconds, counts = np.unique(second[mask], return_counts=True)
+            self.per_second.setdefault(label, Counter()).update(dict(zip(seconds.tolist(), counts.tolist())))
+            outcome = self.outcomes.setdefault(label, [0, 0])
+            outcome[0] += int(mask.sum())
+            outcome[1] += int(is_error[mask].sum())
+        codes = chunk.groupby([chunk['label'].astype(str), chunk['responseCode'].astype(str)], observed=True).size()
+        self.codes.update(codes.to_dict())
+
+def sketch_jtl(fp: Path, chunksize: int, errors_dir: str) -> RunSketch:
+    """Resume um .jtl em duas passadas por blocos: início do run e depois os sketches (executa nos processos do pool)."""
+    scenario, run_id = parse_metadata(fp)
+    sketch = RunSketch(scenario, run_id)
+    start = None
+    for chunk in pd.read_csv(fp, usecols=['timeStamp'], dtype={'timeStamp': 'int64'}, chunksize=chunksize):
+        chunk_min = int(chunk['timeStamp'].min())
+        start = chunk_min if start is None else min(start, chunk_min)
+    if start is None:
+        return sketch
+
+    errors_path = os.path.join(errors_dir, f'{hashlib.sha1(str(fp).encode()).hexdigest()}.csv')
+    reader = pd.read_csv(
+        fp,
+        usecols=lambda c: c in JTL_DTYPES,
+        dtype={c: t for c, t in JTL_DTYPES.items() if t != 'bool'},
+        true_values=['true', 'True', 'TRUE'],
+        false_values=['false', 'False', 'FALSE'],
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        sketch.add(chunk, start)
+        failed = chunk[~chunk['success'].astype(bool)]
+        if not failed.empty:
+            # Linhas com erro vão direto para um CSV parcial (erros.csv é a concatenação)
+            failed = failed.assign(
+                timeStamp=pd.to_datetime(failed['timeStamp'], unit='ms'),
+                scenario=scenario, request_type=failed['label'].astype(str), run=run_id
+            )
+            cols = [c for c in ['timeStamp','label','responseCode','responseMessage','failureMessage','scenario','request_type','run'] if c in failed.columns]
+            failed[cols].to_csv(errors_path, mode='a', header=sketch.errors_file is None, index=False)
+            sketch.errors_file = errors_path
+    return sketch
+
+def stream_aggregates(sketches: List[RunSketch]) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame], pd.DataFrame, pd.DataFrame]:
+    """Combina os sketches dos runs nas mesmas tabelas do modo em memória."""
+    per_run_rows = []
+    latency: Dict[Tuple[str, str], LatencyHistogram] = {}
+    per_second: Dict[Tuple[str, str], Counter] = {}
+    outcomes: Dict[Tuple[str, str], List[int]] = {}
+    codes: Counter = Counter()
+    for sketch in sketches:
+        for label, hist in sketch.latency.items():
+            p50, p90, p99 = hist.quantiles([0.5, 0.9, 0.99])
+            per_run_rows.append({
+                'scenario': sketch.scenario, 'request_type': label, 'run': sketch.run,
+                'count': hist.count, 'mean': hist.mean, 'p50': p50, 'p90': p90, 'p99': p99, 'std': hist.std,
+            })
+            latency.setdefault((sketch.scenario, label), LatencyHistogram()).merge(hist)
+            # Como no modo em memória, o mesmo segundo de runs diferentes é somado
+            per_second.setdefault((sketch.scenario, label), Counter()).update(sketch.per_second[label])
+            outcome = outcomes.setdefault((sketch.scenario, label), [0, 0])
+            outcome[0] += sketch.outcomes[label][0]
+            outcome[1] += sketch.outcomes[label][1]
+        for (label, code), count in sketch.codes.items():
+            codes[(sketch.scenario, label, code)] += count
+
+    per_run = pd.DataFrame(per_run_rows).sort_values(['scenario','request_type','run'], kind='stable').reset_index(drop=True)
+
+    latency_rows = []
+    for (scenario, label), hist in sorted(latency.items()):
+        row = {'scenario': scenario, 'request_type': label, 'mean': hist.mean, 'median': hist.quantiles([0.5])[0],
+               'std': hist.std, 'min': hist.min, 'max': hist.max, 'count': hist.count}
+        row.update(zip(QUANTILES, hist.quantiles(list(QUANTILES.values()))))
+        latency_rows.append(row)
+    throughput = pd.DataFrame(
+        [(scenario, label, second, count)
+         for (scenario, label), counter in sorted(per_second.items())
+         for second, count in sorted(counter.items())],
+        columns=['scenario', 'request_type', 'second', 'throughput'],
+    )
+    aggregates = {
+        'latency': pd.DataFrame(latency_rows),
+        'throughput': throughput,
+        'throughput_stats': summarize_groups(throughput.groupby(['scenario','request_type'])['throughput']).reset_index(),
+    }
+
+    error_rows = []
+    for (scenario, label), (total, errors) in sorted(outcomes.items()):
+        rate = errors / total
+        error_rows.append({
+            'scenario': scenario, 'request_type': label,
+            'error_rate_mean': rate,
+            'error_rate_std': float(np.sqrt(rate * (1 - rate) * total / (total - 1))) if total > 1 else np.nan,
+            'error_rate_min': errors == total,
+            'error_rate_max': errors > 0,
+        })
+    response_codes = pd.DataFrame(
+        [(scenario, label, code, count) for (scenario, label, code), count in sorted(codes.items())],
+        columns=['scenario', 'request_type', 'responseCode', 'count'],
+    )
+    return per_run, aggregates, pd.DataFrame(error_rows), response_codes
+
+def stream_analysis(jtl_files: List[Path], workers: Optional[int] = None, chunksize: int = STREAM_CHUNK_SIZE, redraw: bool = False):
+    """Gera os CSVs lendo cada .jtl em blocos; um processo por arquivo, memória limitada pelo tamanho do bloco."""
+    errors_dir = tempfile.mkdtemp(dir=OUTPUT_DIR)
+    try:
+        workers = max(min(workers or os.cpu_count() or 1, len(jtl_files)), 1)
+        sketches = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {f: pool.submit(sketch_jtl, f, chunksize, errors_dir) for f in jtl_files}
+            for f, future in futures.items():
+                try:
+                    sketches.append(future.result())
+                except Exception as e:
+                    print(f"[ERRO] Falha ao ler {f}: {e}")
+        sketches = [sketch for sketch in sketches if sketch.latency]
+        if not sketches:
+            print("[ERROR] No data to analyze.")
+            return
+        print(f"[INFO] Total de linhas resumidas: {sum(h.count for sk in sketches for h in sk.latency.values())}")
+
+        per_run, aggregates, error_stats, response_codes = stream_aggregates(sketches)
+        request_type_order = sorted(per_run['request_type'].unique())
+        export_per_run_stats(per_run)
+        export_latency_stats(aggregates)
+        figures = plot_throughput_boxplot(aggregates, request_type_order=request_type_order)
+        export_error_rate_stats(error_stats)
+        tail_latency_stats(aggregates)
+        tail_throughput_stats(aggregates)
+        figures += plot_throughput_by_type(aggregates)
+        export_response_codes(response_codes)
+        error_files = [sketch.errors_file for sketch in sketches if sketch.errors_file]
+        if error_files:
+            with open(f'{OUTPUT_DIR}/erros.csv', 'wb') as out:
+                for i, path in enumerate(error_files):
+                    with open(path, 'rb') as part:
+                        if i > 0:
+                            part.readline()  # cabeçalho
+                        shutil.copyfileobj(part, out)
+            print(f"[INFO] Tabela de erros salva em {OUTPUT_DIR}/erros.csv")
+        render_figures(figures, workers=workers, redraw=redraw)
+        print("[INFO] Boxplots de latência e gráficos de taxa de erro não são gerados no modo --stream.")
+    finally:
+        shutil.rmtree(errors_dir, ignore_errors=True)
 
 def main():
+    parser = argparse.ArgumentParser(description="Análise dos resultados de performance (.jtl)")
+    parser.add_argument('--workers', type=int, help="Processos para ler os .jtl e desenhar os gráficos (padrão: número de CPUs)")
+    parser.add_argument('--no-cache', action='store_true', help=f"Ignora o cache em {CACHE_DIR} e lê todos os .jtl")
+    parser.add_argument('--redraw', action='store_true', help="Redesenha todos os gráficos, mesmo os que não mudaram")
+    parser.add_argument('--traces', nargs='+', metavar='ARQUIVO', help="Logs de traces do servidor (TRACE_LOG_FILE) para o tempo por fase, cruzados com o .jtl pelo requestId")
+    parser.add_argument('--stream', action='store_true', help="Lê os .jtl em blocos com memória limitada (arquivos maiores que a memória)")
+    parser.add_argument('--chunksize', type=int, default=STREAM_CHUNK_SIZE, help=f"Linhas por bloco no modo --stream (padrão: {STREAM_CHUNK_SIZE})")
+    args = parser.parse_args()
+
     print("[INFO] Searching for .jtl files...")
     jtl_files = get_jtl_files()
     print(f"[INFO] {len(jtl_files)} files found.")
-    all_data = load_data(jtl_files)
+    if args.stream:
+        stream_analysis(jtl_files, workers=args.workers, chunksize=args.chunksize, redraw=args.redraw)
+        print(f"[INFO] Analysis completed. Results in: {OUTPUT_DIR}/")
+        return
+    all_data = load_data(jtl_files, workers=args.workers, use_cache=not args.no_cache)
     if all_data.empty:
         print("[ERROR] No data to analyze.")
         return
     calc_stats(all_data)
+    aggregates = compute_aggregates(all_data)
     request_type_order = sorted(all_data['request_type'].unique())
-    plot_latency_boxplot(all_data, request_type_order=request_type_order)
-    plot_throughput_boxplot(all_data, request_type_order=request_type_order)
-    plot_error_rate_barplot(all_data, request_type_order=request_type_order)
-    tail_latency_stats(all_data)
-    tail_throughput_stats(all_data)
-    plot_latency_by_type(all_data)
-    plot_throughput_by_type(all_data)
-    plot_error_rate_by_type(all_data)
+    figures = plot_latency_boxplot(all_data, aggregates, request_type_order=request_type_order)
+    figures += plot_throughput_boxplot(aggregates, request_type_order=request_type_order)
+    figures += plot_error_rate_barplot(all_data, request_type_order=request_type_order)
+    tail_latency_stats(aggregates)
+    tail_throughput_stats(aggregates)
+    figures += plot_latency_by_type(all_data)
+    figures += plot_throughput_by_type(aggregates)
+    figures += plot_error_rate_by_type(all_data)
     export_reports(all_data)
+    if args.traces:
+        figures += server_phase_breakdown(jtl_files, args.traces)
+    render_figures(figures, workers=args.workers, redraw=args.redraw)
     print(f"[INFO] Analysis completed. Results in: {OUTPUT_DIR}/")
 
 if __name__ == "__main__":
@@ -0,0 +1,26 @@
+"""
+Configuração do gunicorn (lida automaticamente de ./gunicorn.conf.py ao rodar
+da raiz do projeto; de outro diretório use `-c gunicorn.conf.py`).
+
+Com PROMETHEUS_MULTIPROC_DIR definido, o master limpa os arquivos de métricas
+de uma execução anterior ao iniciar e marca como morto cada worker que sai,
+para que os Gauges "livesum"/"liveall" deixem de somar os valores dele.
+"""
+
+import glob
+import os
+
+
+def on_starting(server):
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        # Arquivos de processos de uma execução anterior seriam somados aos atuais
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
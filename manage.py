@@ -5,7 +5,7 @@ Script para gerenciar o banco de dados do SAS
 
 import os
 import sys
-from sqlalchemy import create_engine, text
+from sqlalchemy import BigInteger, Integer, create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 
 # Adicionar o diretório src ao path
@@ -38,6 +38,77 @@ def init_db():
         print(f"❌ Erro ao inicializar banco: {e}")
         sys.exit(1)
 
+def migrate_db():
+    """Criar tabelas e índices que ainda não existem e alargar colunas (bancos de versões anteriores)"""
+    print("🔧 Aplicando migrações do banco de dados...")
+    
+    try:
+        Base.metadata.create_all(bind=engine)
+        
+        # create_all só cria índices junto com tabelas novas
+        inspector = inspect(engine)
+        for table in Base.metadata.sorted_tables:
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=engine)
+                    print(f"  ➕ Índice {index.name} criado em {table.name}")
+
+        # Colunas que passaram de Integer para BigInteger (no SQLite INTEGER já tem 64 bits)
+        if engine.dialect.name == "postgresql":
+            for table in Base.metadata.sorted_tables:
+                existing = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if isinstance(column.type, BigInteger) and isinstance(existing.get(column.name), Integer) \
+                            and not isinstance(existing[column.name], BigInteger):
+                        with engine.begin() as connection:
+                            connection.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN {column.name} TYPE BIGINT"))
+                        print(f"  🔁 Coluna {table.name}.{column.name} convertida para BIGINT")
+        print("✅ Banco de dados atualizado!")
+        
+    except Exception as e:
+        print(f"❌ Erro ao migrar banco: {e}")
+        sys.exit(1)
+
+def archive_events(days=None):
+    """Arquivar eventos mais antigos que a retenção em arquivos comprimidos"""
+    import asyncio
+    from src.models.database import AsyncSessionLocal
+    from src.services.event_archive import EventArchiver
+    
+    days = int(days) if days is not None else settings.event_retention_days
+    if days <= 0:
+        print("❌ Informe a retenção em dias ou defina EVENT_RETENTION_DAYS")
+        sys.exit(1)
+    
+    print(f"📦 Arquivando eventos com mais de {days} dias em {settings.event_archive_dir}...")
+    try:
+        archiver = EventArchiver(retention_days=days, directory=settings.event_archive_dir)
+        count = asyncio.run(archiver.archive(AsyncSessionLocal))
+        print(f"✅ {count} eventos arquivados")
+    except Exception as e:
+        print(f"❌ Erro ao arquivar eventos: {e}")
+        sys.exit(1)
+
+def dump_snapshot(path=None):
+    """Gerar o snapshot NDJSON servido por /v1.3/dump?snapshot=true"""
+    import asyncio
+    from src.models.database import AsyncSessionLocal
+    from src.services.dump import write_snapshot
+    
+    path = path or settings.dump_snapshot_file
+    if not path:
+        print("❌ Informe o arquivo de destino ou defina DUMP_SNAPSHOT_FILE")
+        sys.exit(1)
+    
+    print(f"📦 Gerando snapshot do dump em {path}...")
+    try:
+        count, cursor = asyncio.run(write_snapshot(AsyncSessionLocal, path, settings.dump_chunk_size))
+        print(f"✅ {count} registros gravados (cursor final: {cursor})")
+    except Exception as e:
+        print(f"❌ Erro ao gerar snapshot: {e}")
+        sys.exit(1)
+
 def reset_db():
     """Resetar banco de dados (apagar todas as tabelas e recriar)"""
     print("⚠️  Resetando banco de dados...")
@@ -63,10 +134,19 @@ if __name__ == "__main__":
             init_db()
         elif command == "reset":
             reset_db()
+        elif command == "migrate":
+            migrate_db()
+        elif command == "archive-events":
+            archive_events(sys.argv[2] if len(sys.argv) > 2 else None)
+        elif command == "dump":
+            dump_snapshot(sys.argv[2] if len(sys.argv) > 2 else None)
         else:
             print("Comandos disponíveis:")
             print("  python manage.py init   - Inicializar banco")
             print("  python manage.py reset  - Resetar banco")
+            print("  python manage.py migrate - Criar tabelas e índices que faltam e alargar colunas")
+            print("  python manage.py archive-events [dias] - Arquivar eventos antigos")
+            print("  python manage.py dump [arquivo] - Gerar snapshot do dump")
     else:
         # Comando padrão: inicializar
         init_db() 
\ No newline at end of file
@@ -10,6 +10,9 @@ import sys
 # Adicionar o diretório src ao path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
+# Um único processo: o estado em memória não depende de replicação pelo Redis
+os.environ.setdefault("WORKERS", "1")
+
 from src.config.settings import settings
 
 if __name__ == "__main__":
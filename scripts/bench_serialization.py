@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark da serialização das respostas: caminho padrão do FastAPI (modelo
+Pydantic por resposta + jsonable_encoder + json.dumps) contra o caminho
+rápido (dict simples + FastJSONResponse/orjson), com os formatos reais das
+respostas de registration, grant, lotes, get_cbsd e get_grants.
+
+Uso: python scripts/bench_serialization.py [--iterations N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from src.services.dump import cbsd_record, grant_record
+from src.services.serialization import FastJSONResponse, orjson
+
+
+# Modelos de resposta usados antes do caminho rápido (por item)
+class RegistrationResponse(BaseModel):
+    responseCode: int = 0
+    cbsdId: str
+    registrationResponse: Dict[str, Any]
+
+
+class GrantResponse(BaseModel):
+    responseCode: int = 0
+    cbsdId: str
+    grantResponse: Dict[str, Any]
+
+
+def legacy_cbsd_record(cbsd) -> Dict[str, Any]:
+    record = cbsd_record(cbsd)
+    record["measCapability"] = json.loads(cbsd.meas_capability)
+    return record
+
+
+def make_cbsd(i: int):
+    return SimpleNamespace(
+        fcc_id=f"FCC{i:06d}", user_id="user", cbsd_serial_number=f"SN{i:06d}", call_sign="CALL",
+        cbsd_category="A", air_interface="NR", meas_capability=json.dumps(["RECEIVED_POWER_WITHOUT_GRANT"]),
+        eirp_capability=30, latitude=37000000 + i, longitude=-122000000 - i, height=10, height_type="AGL",
+        indoor_deployment=False, antenna_gain=5, antenna_beamwidth=60, antenna_azimuth=0, grouping_param="",
+        cbsd_address="0xabc", sas_origin="0xSAS", registration_timestamp=1700000000
+    )
+
+
+def make_grant(i: int):
+    return SimpleNamespace(
+        grant_id=f"grant_FCC{i:06d}_SN{i:06d}_{i:08x}", channel_type="GAA", grant_expire_time=4102444800,
+        terminated=False, max_eirp=20, low_frequency=3550000000, high_frequency=3560000000,
+        requested_max_eirp=20, requested_low_frequency=3550000000, requested_high_frequency=3560000000,
+        sas_origin="0xSAS", grant_timestamp=1700000000
+    )
+
+
+def grant_body(i: int) -> Dict[str, Any]:
+    return {
+        "cbsdId": f"SN{i:06d}",
+        "grantId": f"grant_FCC{i:06d}_SN{i:06d}_{i:08x}",
+        "grant": "SUCCESS",
+        "channelType": "GAA",
+        "maxEirp": 20,
+        "lowFrequency": 3550000000,
+        "highFrequency": 3560000000,
+        "grantExpireTime": 4102444800
+    }
+
+
+def legacy_render(content) -> bytes:
+    """O que o FastAPI faz com o retorno de um handler sem response_model"""
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def fast_render(content) -> bytes:
+    return FastJSONResponse(content).body
+
+
+def scenarios():
+    cbsd = make_cbsd(1)
+    grants = [make_grant(i) for i in range(10)]
+    return {
+        "registration": (
+            lambda: legacy_render(RegistrationResponse(
+                cbsdId="SN000001", registrationResponse={"cbsdId": "SN000001", "registration": "SUCCESS"}
+            )),
+            lambda: fast_render({
+                "responseCode": 0, "cbsdId": "SN000001",
+                "registrationResponse": {"cbsdId": "SN000001", "registration": "SUCCESS"}
+            }),
+        ),
+        "grant": (
+            lambda: legacy_render(GrantResponse(cbsdId="SN000001", grantResponse=grant_body(1))),
+            lambda: fast_render({"responseCode": 0, "cbsdId": "SN000001", "grantResponse": grant_body(1)}),
+        ),
+        "grant/batch (100)": (
+            lambda: legacy_render({"grantResponse": [
+                GrantResponse(cbsdId=f"SN{i:06d}", grantResponse=grant_body(i)) for i in range(100)
+            ]}),
+            lambda: fast_render({"grantResponse": [
+                {"responseCode": 0, "cbsdId": f"SN{i:06d}", "grantResponse": grant_body(i)} for i in range(100)
+            ]}),
+        ),
+        "get_cbsd": (
+            lambda: legacy_render(legacy_cbsd_record(cbsd)),
+            lambda: fast_render(cbsd_record(cbsd)),
+        ),
+        "get_grants (10)": (
+            lambda: legacy_render({"grants": [grant_record(grant) for grant in grants]}),
+            lambda: fast_render({"grants": [grant_record(grant) for grant in grants]}),
+        ),
+    }
+
+
+def cpu_per_call(func, iterations: int) -> float:
+    """Tempo de CPU médio por chamada em microssegundos"""
+    for _ in range(min(iterations, 200)):
+        func()
+    start = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da serialização das respostas da API")
+    parser.add_argument("--iterations", type=int, default=20000, help="Chamadas por cenário (padrão: 20000)")
+    args = parser.parse_args()
+
+    print(f"Serializador rápido: {'orjson ' + orjson.__version__ if orjson else 'json (orjson não instalado)'}")
+    print(f"{'cenário':<20} {'padrão (µs)':>12} {'rápido (µs)':>12} {'economia':>10}")
+    for name, (legacy, fast) in scenarios().items():
+        assert json.loads(legacy()) == json.loads(fast()), f"Respostas diferentes em {name}"
+        iterations = args.iterations if "batch" not in name else max(args.iterations // 50, 10)
+        legacy_us = cpu_per_call(legacy, iterations)
+        fast_us = cpu_per_call(fast, iterations)
+        print(f"{name:<20} {legacy_us:>12.1f} {fast_us:>12.1f} {1 - fast_us / legacy_us:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
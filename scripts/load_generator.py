@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Gerador de carga em Python (asyncio + httpx) para o fluxo completo do SAS,
+equivalente aos planos JMeter em plans/*.jmx:
+
+    Authorize → Registration → Grant → Relinquishment → Deregistration → Revoke
+
+O grantId da resposta do Grant ($.grantResponse.grantId, NOT_FOUND se ausente)
+é usado no Relinquishment, como no JSON Extractor dos planos. Os parâmetros de
+cada cenário (usuários, ramp-up, iterações, SAS e corpos das requisições) são
+lidos do próprio .jmx.
+
+Modos:
+  closed  Como o JMeter: N usuários virtuais iniciados ao longo do ramp-up, cada
+          um repetindo o fluxo `loops` vezes; a próxima requisição só sai após a
+          resposta da anterior.
+  open    Taxa de chegada constante: um novo fluxo inicia a cada 1/rate segundos,
+          independente de quantos ainda estão em andamento (sem omissão
+          coordenada quando o servidor fica lento).
+
+A saída é um .jtl CSV com as mesmas colunas do JMeter, então
+analyze_results.py e os demais scripts de resultados funcionam sem mudanças.
+Cada amostra leva um X-Request-ID novo, gravado na coluna requestId (como o
+JMeter faz com -Jsample_variables=requestId), para cruzar com o log de traces
+do servidor.
+
+Uso:
+    python scripts/load_generator.py                      # todos os cenários, 2 runs, em results/
+    python scripts/load_generator.py --scenario low --runs 1
+    python scripts/load_generator.py --scenario high --mode open --rate 50
+    python scripts/load_generator.py --plan plans/sas_full_flow_low.jmx --output /tmp/low.jtl
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+PLANS_DIR = Path(__file__).resolve().parent.parent / "plans"
+SCENARIOS = ["low", "medium", "high", "stress"]
+
+JTL_FIELDS = [
+    "timeStamp", "elapsed", "label", "responseCode", "responseMessage", "threadName", "dataType",
+    "success", "failureMessage", "bytes", "sentBytes", "grpThreads", "allThreads", "URL",
+    "Latency", "IdleTime", "Connect", "requestId",
+]
+
+
+@dataclass
+class Step:
+    label: str
+    method: str
+    path: str
+    body: str  # template com ${variável} do JMeter
+    headers: Dict[str, str]
+
+
+@dataclass
+class Plan:
+    name: str
+    thread_group: str
+    threads: int
+    ramp_time: float
+    loops: int
+    variables: Dict[str, str]
+    steps: List[Step] = field(default_factory=list)
+
+
+def _props(element) -> Dict[str, str]:
+    return {prop.get("name"): (prop.text or "") for prop in element if prop.tag in ("stringProp", "boolProp")}
+
+
+def load_plan(path: Path) -> Plan:
+    """Lê usuários, ramp-up, iterações, variáveis e samplers HTTP de um plano .jmx"""
+    root = ET.parse(path).getroot()
+    variables = {}
+    for arg in root.find(".//TestPlan").iter("elementProp"):
+        props = _props(arg)
+        if "Argument.name" in props:
+            variables[props["Argument.name"]] = props.get("Argument.value", "")
+
+    thread_group = root.find(".//ThreadGroup")
+    group_props = _props(thread_group)
+    loops = _props(thread_group.find("elementProp[@name='ThreadGroup.main_controller']"))["LoopController.loops"]
+    plan = Plan(
+        name=path.stem,
+        thread_group=thread_group.get("testname"),
+        threads=int(group_props["ThreadGroup.num_threads"]),
+        ramp_time=float(group_props["ThreadGroup.ramp_time"] or 0),
+        loops=int(loops),
+        variables=variables,
+    )
+
+    # Cada sampler é seguido por um hashTree com os seus filhos (HeaderManager, extratores)
+    samplers_tree = root.find(".//ThreadGroup/../hashTree")
+    children = list(samplers_tree)
+    for i, sampler in enumerate(children):
+        if sampler.tag != "HTTPSamplerProxy" or sampler.get("enabled") == "false":
+            continue
+        props = _props(sampler)
+        body = ""
+        for arg in sampler.iter("elementProp"):
+            arg_props = _props(arg)
+            if "Argument.value" in arg_props:
+                body = arg_props["Argument.value"]
+        headers = {}
+        if i + 1 < len(children) and children[i + 1].tag == "hashTree":
+            for header in children[i + 1].iter("elementProp"):
+                header_props = _props(header)
+                if "Header.name" in header_props:
+                    headers[header_props["Header.name"]] = header_props["Header.value"]
+        plan.steps.append(Step(
+            label=sampler.get("testname"),
+            method=props.get("HTTPSampler.method", "GET"),
+            path=props["HTTPSampler.path"],
+            body=body,
+            headers=headers,
+        ))
+    return plan
+
+
+def substitute(template: str, variables: Dict[str, str]) -> str:
+    for name, value in variables.items():
+        template = template.replace("${" + name + "}", value)
+    return template
+
+
+def flow_variables(plan: Plan, shared: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Variáveis de uma iteração do fluxo.
+
+    ${__UUID} gera identificadores novos por iteração. Com `shared`, usa os
+    valores calculados uma vez para o teste todo, como o JMeter faz com as
+    User Defined Variables (todas as threads registram o mesmo CBSD).
+    """
+    if shared is not None:
+        return dict(shared)
+    return {name: value.replace("${__UUID}", str(uuid.uuid4())) for name, value in plan.variables.items()}
+
+
+class JTLWriter:
+    """Grava amostras no formato CSV do JMeter à medida que as respostas chegam"""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "w", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=JTL_FIELDS)
+        self._writer.writeheader()
+        self.samples = 0
+        self.errors = 0
+
+    def write(self, sample: Dict[str, Any]):
+        self._writer.writerow(sample)
+        self.samples += 1
+        if sample["success"] != "true":
+            self.errors += 1
+
+    def close(self):
+        self._file.close()
+
+
+class Runner:
+    def __init__(self, client: httpx.AsyncClient, plan: Plan, writer: JTLWriter, shared_ids: bool = False):
+        self.client = client
+        self.plan = plan
+        self.writer = writer
+        self.shared = flow_variables(plan, None) if shared_ids else None
+        self.active = 0
+
+    async def sample(self, step: Step, variables: Dict[str, str], thread_name: str) -> Optional[bytes]:
+        """Executa um sampler e grava a linha do JTL; retorna o corpo da resposta"""
+        body = substitute(step.body, variables).encode()
+        headers = {name: substitute(value, variables) for name, value in step.headers.items()}
+        # O X-Request-ID dos planos usa uma função do JMeter; aqui o ID é gerado por amostra
+        request_id = uuid.uuid4().hex
+        headers["X-Request-ID"] = request_id
+        request = self.client.build_request(step.method, step.path, content=body or None, headers=headers)
+        sent_bytes = len(body) + sum(len(k) + len(v) + 4 for k, v in request.headers.items())
+        timestamp = int(time.time() * 1000)
+        start = time.perf_counter()
+        content = None
+        try:
+            response = await self.client.send(request, stream=True)
+            latency = time.perf_counter() - start
+            try:
+                content = await response.aread()
+            finally:
+                await response.aclose()
+            elapsed = time.perf_counter() - start
+            success = 200 <= response.status_code < 400
+            received = len(content) + sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+            code, message, failure = response.status_code, response.reason_phrase, ""
+        except httpx.HTTPError as e:
+            elapsed = latency = time.perf_counter() - start
+            success, received = False, 0
+            code, message, failure = f"Non HTTP response code: {type(e).__name__}", str(e), str(e)
+        self.writer.write({
+            "timeStamp": timestamp,
+            "elapsed": round(elapsed * 1000),
+            "label": step.label,
+            "responseCode": code,
+            "responseMessage": message,
+            "threadName": thread_name,
+            "dataType": "text",
+            "success": "true" if success else "false",
+            "failureMessage": failure,
+            "bytes": received,
+            "sentBytes": sent_bytes,
+            "grpThreads": self.active,
+            "allThreads": self.active,
+            "URL": str(request.url),
+            "Latency": round(latency * 1000),
+            "IdleTime": 0,
+            "Connect": 0,
+            "requestId": request_id,
+        })
+        return content
+
+    async def flow(self, thread_name: str):
+        """Uma iteração do fluxo completo, extraindo o grantId da resposta do Grant"""
+        variables = flow_variables(self.plan, self.shared)
+        variables["grantId"] = "NOT_FOUND"
+        for step in self.plan.steps:
+            content = await self.sample(step, variables, thread_name)
+            if step.label == "Grant":
+                try:
+                    variables["grantId"] = json.loads(content)["grantResponse"]["grantId"]
+                except (TypeError, ValueError, KeyError):
+                    variables["grantId"] = "NOT_FOUND"
+
+    async def closed_loop(self):
+        """Usuários virtuais iniciados linearmente no ramp-up, cada um com `loops` iterações"""
+        delay = self.plan.ramp_time / self.plan.threads if self.plan.threads else 0
+
+        async def user(number: int):
+            await asyncio.sleep(number * delay)
+            self.active += 1
+            try:
+                for _ in range(self.plan.loops):
+                    await self.flow(f"{self.plan.thread_group} 1-{number + 1}")
+            finally:
+                self.active -= 1
+
+        await asyncio.gather(*(user(i) for i in range(self.plan.threads)))
+
+    async def open_loop(self, rate: float, flows: int):
+        """Inicia `flows` fluxos a `rate` por segundo, em horários fixos a partir do início"""
+        async def arrival(number: int):
+            self.active += 1
+            try:
+                await self.flow(f"{self.plan.thread_group} open-{number + 1}")
+            finally:
+                self.active -= 1
+
+        tasks = []
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        for i in range(flows):
+            wait = start + i / rate - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            tasks.append(loop.create_task(arrival(i)))
+        await asyncio.gather(*tasks)
+
+
+async def run_plan(
+    plan: Plan,
+    output: Path,
+    base_url: str,
+    mode: str = "closed",
+    rate: Optional[float] = None,
+    flows: Optional[int] = None,
+    shared_ids: bool = False,
+    timeout: float = 30.0,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> JTLWriter:
+    """Executa um plano e grava o .jtl em `output`.
+
+    Por padrão `open` inicia threads × loops fluxos, distribuídos ao longo do
+    ramp-up do plano. `transport` permite rodar contra um app ASGI no mesmo
+    processo (httpx.ASGITransport).
+    """
+    writer = JTLWriter(output)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits, transport=transport) as client:
+            runner = Runner(client, plan, writer, shared_ids=shared_ids)
+            if mode == "open":
+                flows = flows or plan.threads * plan.loops
+                rate = rate or flows / max(plan.ramp_time, 1.0)
+                await runner.open_loop(rate, flows)
+            else:
+                await runner.closed_loop()
+    finally:
+        writer.close()
+    return writer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de carga do fluxo completo do SAS (saída .jtl)")
+    parser.add_argument("--scenario", choices=SCENARIOS + ["all"], default="all", help="Cenário de plans/ (padrão: all)")
+    parser.add_argument("--plan", type=Path, help="Plano .jmx específico (substitui --scenario)")
+    parser.add_argument("--runs", type=int, default=2, help="Execuções por cenário (padrão: 2)")
+    parser.add_argument("--base-url", default="http://localhost:9000", help="URL do servidor (padrão: http://localhost:9000)")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed", help="closed (usuários, como o JMeter) ou open (taxa de chegada constante)")
+    parser.add_argument("--rate", type=float, help="Fluxos iniciados por segundo no modo open (padrão: fluxos / ramp-up do plano)")
+    parser.add_argument("--flows", type=int, help="Total de fluxos no modo open (padrão: usuários × iterações do plano)")
+    parser.add_argument("--shared-ids", action="store_true", help="Mesmos fccId/cbsdSerialNumber em todas as iterações, como as variáveis do plano JMeter")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por requisição em segundos (padrão: 30)")
+    parser.add_argument("--results-dir", type=Path, default=Path("results"), help="Diretório dos resultados (padrão: results)")
+    parser.add_argument("--output", type=Path, help="Arquivo .jtl de saída (apenas com um plano e um run)")
+    args = parser.parse_args()
+
+    if args.plan:
+        plans = [args.plan]
+    elif args.scenario == "all":
+        plans = [PLANS_DIR / f"sas_full_flow_{name}.jmx" for name in SCENARIOS]
+    else:
+        plans = [PLANS_DIR / f"sas_full_flow_{args.scenario}.jmx"]
+    if args.output and (len(plans) > 1 or args.runs > 1):
+        parser.error("--output exige um único plano e --runs 1")
+
+    for plan_path in plans:
+        plan = load_plan(plan_path)
+        for run in range(1, args.runs + 1):
+            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output = args.output or args.results_dir / plan.name / f"run_{run}_{ts}.jtl"
+            print(f"[RUN] {plan.name} ({args.mode}, run {run}/{args.runs}) -> {output}")
+            started = time.perf_counter()
+            writer = asyncio.run(run_plan(
+                plan, output, args.base_url, mode=args.mode, rate=args.rate, flows=args.flows,
+                shared_ids=args.shared_ids, timeout=args.timeout
+            ))
+            duration = time.perf_counter() - started
+            print(f"[OK] {writer.samples} amostras, {writer.errors} erros, {writer.samples / duration:.1f} req/s em {duration:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,32 @@
 import os
 import csv
-from collections import defaultdict
 
 RESULTS_DIR = os.path.join(os.path.dirname(__file__), '..', 'results')
 
 # Função para processar um arquivo .jtl
 def process_jtl_file(jtl_path, output_dir):
-    with open(jtl_path, 'r', newline='') as infile:
-        reader = csv.DictReader(infile)
-        header = reader.fieldnames
-        if header is None:
-            print(f"Arquivo {jtl_path} sem cabeçalho, pulando.")
-            return
-        rows_by_label = defaultdict(list)
-        for row in reader:
-            label = row['label']
-            rows_by_label[label].append(row)
-
-    for label, rows in rows_by_label.items():
-        label_dir = os.path.join(output_dir, label)
-        os.makedirs(label_dir, exist_ok=True)
-        out_path = os.path.join(label_dir, os.path.basename(jtl_path))
-        with open(out_path, 'w', newline='') as outfile:
-            writer = csv.DictWriter(outfile, fieldnames=header)
-            writer.writeheader()
-            writer.writerows(rows)
-
+    """Separa as linhas por label gravando cada uma assim que é lida (memória constante, mesmo com .jtl de vários GB)."""
+    outputs = {}
+    try:
+        with open(jtl_path, 'r', newline='') as infile:
+            reader = csv.DictReader(infile)
+            header = reader.fieldnames
+            if header is None:
+                print(f"Arquivo {jtl_path} sem cabeçalho, pulando.")
+                return
+            for row in reader:
+                label = row['label']
+                if label not in outputs:
+                    label_dir = os.path.join(output_dir, label)
+                    os.makedirs(label_dir, exist_ok=True)
+                    outfile = open(os.path.join(label_dir, os.path.basename(jtl_path)), 'w', newline='')
+                    writer = csv.DictWriter(outfile, fieldnames=header)
+                    writer.writeheader()
+                    outputs[label] = (outfile, writer)
+                outputs[label][1].writerow(row)
+    finally:
+        for outfile, _ in outputs.values():
+            outfile.close()
 
 def main():
     for root, dirs, files in os.walk(RESULTS_DIR):
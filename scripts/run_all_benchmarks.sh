@@ -5,6 +5,8 @@ set -e
 PLANS_DIR="plans"
 RESULTS_DIR="results"
 RUNS=2
+# jmeter (padrão) ou python (scripts/load_generator.py, sem instalar o JMeter)
+LOAD_GENERATOR="${LOAD_GENERATOR:-jmeter}"
 
 # Backup dos resultados anteriores, se existirem
 if [ -d "$RESULTS_DIR" ]; then
@@ -23,7 +25,12 @@ for plan in "$PLANS_DIR"/sas_full_flow_*.jmx; do
         ts=$(date +%Y%m%d_%H%M%S)
         result_file="$plan_result_dir/run_${i}_$ts.jtl"
         echo "[RUN] Executando $plan_name (run $i/$RUNS) -> $result_file"
-        jmeter -n -t "$plan" -l "$result_file"
+        if [ "$LOAD_GENERATOR" = "python" ]; then
+            python scripts/load_generator.py --plan "$plan" --runs 1 --output "$result_file"
+        else
+            # requestId (X-Request-ID de cada amostra) como coluna extra do .jtl
+            jmeter -n -t "$plan" -l "$result_file" -Jsample_variables=requestId
+        fi
     done
     echo "[OK] $plan_name finalizado. Resultados em $plan_result_dir/"
 done
@@ -1,11 +1,16 @@
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Query
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Dict, List, Optional, Any
+from typing import Awaitable, Callable, Dict, List, Literal, Optional, Any, Tuple
 import logging
+import base64
 import json
+import os
 from datetime import datetime, timezone
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, bindparam, delete, insert, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
 import time
 
@@ -14,7 +19,27 @@ from src.models.cbsd import CBSD
 from src.models.grant import Grant
 from src.models.sas_auth import SASAuthorization
 from src.models.event import Event
+from src.models.ledger import LedgerBlock
 from src.config.settings import settings
+from src.models.database import AsyncSessionLocal, async_engine
+from src.services.pubsub import create_redis_client, connect_redis
+from src.services.auth_cache import create_auth_cache
+from src.services.spectrum_index import create_spectrum_index
+from src.services.spectrum_locks import Allocation, create_spectrum_locks
+from src.services.geo_index import GeoIndex, Region, create_geo_index
+from src.services.cbsd_registry import RegisteredCBSD, create_cbsd_registry, generate_cbsd_key
+from src.services.expiry import GRANT_EXPIRY, TRANSMIT_EXPIRY, create_expiry_scheduler
+from src.services.heartbeat import HeartbeatState, create_heartbeat_store
+from src.services.ledger import create_event_ledger
+from src.services.write_queue import create_write_queue, run_in_session
+from src.services.event_archive import create_event_archiver
+from src.services.stats import (
+    CBSDS, EVENTS, GRANTS_ACTIVE, GRANTS_TERMINATED, SAS_AUTHORIZED, UPSERT_DIALECTS, create_stats_counters
+)
+from src.services.metrics import MetricsMiddleware, instrument_engine, render_metrics
+from src.services.serialization import FastJSONResponse
+from src.services.tracing import TracingMiddleware, create_trace_logger, mark_validated, trace_phase
+from src.services.dump import cbsd_record, dump_grant_record, grant_record, iter_json, iter_ndjson, parse_cursor
 
 # Configurar logging
 logging.basicConfig(level=getattr(logging, settings.log_level))
@@ -24,9 +49,79 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="SAS (Spectrum Access System) - WINNF SAS-SAS",
     description="API REST compatível com WINNF TS-0096/3003 (SAS-SAS) - Alinhada com contrato Solidity",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
+# Redis compartilhado entre workers (pub/sub e cache), None se não configurado
+redis_client = create_redis_client(settings)
+
+# Cache de autorização SAS (LRU local + Redis), None se enable_cache=False
+auth_cache = create_auth_cache(settings)
+
+# Índice em memória dos grants ativos para detecção de conflitos de espectro
+spectrum_index = create_spectrum_index(settings)
+
+# Locks de alocação no PostgreSQL para o modo cluster, None se cluster_mode=False
+spectrum_locks = create_spectrum_locks(settings, spectrum_index)
+
+# Índice espacial em memória da localização dos CBSDs
+geo_index = create_geo_index(settings)
+
+# Registro em memória dos CBSDs por (fccId, cbsdSerialNumber) para verificações de existência
+cbsd_registry = create_cbsd_registry(settings)
+
+# Contadores do /stats mantidos incrementalmente (sem COUNT(*) por chamada)
+stats_counters = create_stats_counters(settings)
+
+# Ledger de eventos encadeado por hash, gravado em blocos
+event_ledger = create_event_ledger(settings, on_written=lambda count: stats_counters.add(EVENTS, count))
+
+# Escritor único com commit em grupo (None se write_queue_enabled=False)
+write_queue = create_write_queue(settings)
+
+# Retenção da tabela events (arquiva blocos antigos em arquivos comprimidos)
+event_archiver = create_event_archiver(settings)
+
+@app.on_event("startup")
+async def start_services():
+    redis = await connect_redis(redis_client)
+    if redis is None and settings.workers > 1 and not settings.cluster_mode:
+        # Sem replicação cada worker veria só os próprios grants e CBSDs (espectro sobreposto, 404 indevidos)
+        raise RuntimeError("WORKERS > 1 exige o Redis de REDIS_URL acessível (use WORKERS=1 com um único processo)")
+    if write_queue:
+        write_queue.start(async_engine)
+    # Ledger, contadores e arquivamento gravam pela fila de escrita quando ativa
+    event_ledger.start(AsyncSessionLocal, run_write)
+    await stats_counters.start(AsyncSessionLocal, run_write)
+    event_archiver.start(AsyncSessionLocal, run_write)
+    if auth_cache:
+        await auth_cache.start(redis)
+    await spectrum_index.start(redis, AsyncSessionLocal)
+    await geo_index.start(redis, AsyncSessionLocal)
+    await cbsd_registry.start(redis, AsyncSessionLocal)
+    await expiry_scheduler.start(AsyncSessionLocal)
+    heartbeat_store.start()
+
+@app.on_event("shutdown")
+async def stop_services():
+    await event_archiver.stop()
+    await heartbeat_store.stop()
+    await expiry_scheduler.stop()
+    await spectrum_index.stop()
+    await geo_index.stop()
+    await cbsd_registry.stop()
+    if auth_cache:
+        await auth_cache.stop()
+    if redis_client is not None:
+        await redis_client.close()
+    if write_queue:
+        await write_queue.stop()
+    await event_ledger.stop()
+    await stats_counters.stop()
+    # Fecha as conexões do pool (as do aiosqlite mantêm uma thread cada)
+    await async_engine.dispose()
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -36,6 +131,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas Prometheus (latência por rota, uso do banco por requisição, pool)
+if settings.enable_metrics:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(async_engine)
+
+# Tempo por fase das requisições (Server-Timing e log amostrado de traces); por
+# último para envolver os demais middlewares e ter o total visto pelo servidor
+if settings.enable_server_timing or settings.trace_sample_rate > 0:
+    app.add_middleware(
+        TracingMiddleware,
+        server_timing=settings.enable_server_timing,
+        sample_rate=settings.trace_sample_rate,
+        trace_logger=create_trace_logger(settings)
+    )
+
 # Modelos Pydantic alinhados com contrato Solidity
 class RegistrationRequest(BaseModel):
     fccId: str
@@ -78,46 +188,199 @@ class DeregistrationRequest(BaseModel):
     fccId: str
     cbsdSerialNumber: str
 
+# Requisições em lote (arrays WINNF)
+class RegistrationBatchRequest(BaseModel):
+    registrationRequest: List[RegistrationRequest]
+
+class GrantBatchRequest(BaseModel):
+    grantRequest: List[GrantRequest]
+
+class RelinquishmentBatchRequest(BaseModel):
+    relinquishmentRequest: List[RelinquishmentRequest]
+
+class DeregistrationBatchRequest(BaseModel):
+    deregistrationRequest: List[DeregistrationRequest]
+
+class HeartbeatRequest(BaseModel):
+    fccId: str
+    cbsdSerialNumber: str
+    grantId: str
+    # GRANTED: pede autorização para transmitir; AUTHORIZED: o CBSD já está transmitindo
+    operationState: Literal["GRANTED", "AUTHORIZED"] = "GRANTED"
+
+class HeartbeatBatchRequest(BaseModel):
+    heartbeatRequest: List[HeartbeatRequest]
+
 class SASAuthorizeRequest(BaseModel):
     sas_address: str
 
 class SASRevokeRequest(BaseModel):
     sas_address: str
 
-# Modelos de resposta alinhados com contrato Solidity
-class RegistrationResponse(BaseModel):
-    responseCode: int = 0
-    cbsdId: str
-    registrationResponse: Dict[str, Any]
+# Respostas alinhadas com contrato Solidity: montadas como dicts simples
+# {"responseCode", "cbsdId", "<operação>Response"} e serializadas por
+# FastJSONResponse, sem construir nem validar modelos Pydantic por requisição
 
-class GrantResponse(BaseModel):
-    responseCode: int = 0
-    cbsdId: str
-    grantResponse: Dict[str, Any]
+# Códigos de resposta WINNF usados nas respostas por item dos lotes
+class ResponseCode:
+    SUCCESS = 0
+    INVALID_VALUE = 103
+    GRANT_CONFLICT = 401
+    TERMINATED_GRANT = 500
+    UNSYNC_OP_PARAM = 502
 
-class RelinquishmentResponse(BaseModel):
-    responseCode: int = 0
-    cbsdId: str
-    relinquishmentResponse: Dict[str, Any]
-
-class DeregistrationResponse(BaseModel):
-    responseCode: int = 0
-    cbsdId: str
-    deregistrationResponse: Dict[str, Any]
+# Máximo de parâmetros por cláusula IN nas consultas dos lotes
+BATCH_QUERY_CHUNK = 500
 
 # Função para verificar autorização SAS
-async def verify_sas_authorization(sas_address: str, db: Session) -> bool:
-    """Verifica se o SAS está autorizado"""
-    auth = db.query(SASAuthorization).filter(
-        SASAuthorization.sas_address == sas_address,
-        SASAuthorization.is_authorized == True
-    ).first()
-    return auth is not None
-
-# Função para gerar chave CBSD (equivalente ao keccak256 do Solidity)
-def generate_cbsd_key(fcc_id: str, cbsd_serial_number: str) -> str:
-    """Gera chave única para CBSD (equivalente ao keccak256 do Solidity)"""
-    return f"{fcc_id}_{cbsd_serial_number}"
+async def verify_sas_authorization(sas_address: str, db: AsyncSession) -> bool:
+    """Verifica se o SAS está autorizado (consulta o cache antes do banco)"""
+    with trace_phase("auth"):
+        if auth_cache:
+            version = auth_cache.version
+            cached = await auth_cache.get(sas_address)
+            if cached is not None:
+                return cached
+        result = await db.execute(
+            select(SASAuthorization.id).where(
+                SASAuthorization.sas_address == sas_address,
+                SASAuthorization.is_authorized == True
+            )
+        )
+        authorized = result.first() is not None
+        if auth_cache:
+            await auth_cache.set(sas_address, authorized, version)
+        return authorized
+
+def local_state_complete(state) -> bool:
+    """O estado em memória inclui as mudanças de todos os processos: processo único ou replicação ativa"""
+    return (settings.workers <= 1 and not settings.cluster_mode) or state.replicated
+
+def cbsd_registry_authoritative() -> bool:
+    """Uma ausência no registro de CBSDs dispensa o banco.
+
+    Só com o registro carregado e completo (local_state_complete). Em
+    cluster_mode nunca: a replicação entre instâncias é assíncrona e um CBSD
+    recém-registrado em outra instância pode ainda não ter chegado.
+    """
+    return cbsd_registry.ready and not settings.cluster_mode and local_state_complete(cbsd_registry)
+
+async def find_cbsd(db: AsyncSession, fcc_id: str, cbsd_serial_number: str) -> Optional[RegisteredCBSD]:
+    """CBSD registrado com a chave (fccId, cbsdSerialNumber), ou None.
+
+    Consulta o registro em memória; o banco só é lido se o CBSD saiu da LRU
+    ou se a ausência no registro não é conclusiva (cbsd_registry_authoritative).
+    """
+    with trace_phase("lookup"):
+        if cbsd_registry.ready:
+            if not cbsd_registry.contains(fcc_id, cbsd_serial_number) and cbsd_registry_authoritative():
+                return None
+            record = cbsd_registry.get(fcc_id, cbsd_serial_number)
+            if record is not None:
+                return record
+        result = await db.execute(
+            select(CBSD.fcc_id, CBSD.cbsd_serial_number, CBSD.latitude, CBSD.longitude, CBSD.sas_origin).where(
+                CBSD.fcc_id == fcc_id,
+                CBSD.cbsd_serial_number == cbsd_serial_number
+            )
+        )
+        row = result.first()
+        if row is None:
+            return None
+        record = RegisteredCBSD(row.fcc_id, row.cbsd_serial_number, row.latitude, row.longitude, row.sas_origin)
+        cbsd_registry.add(record)
+        return record
+
+def check_spectrum_replication():
+    """Com vários workers, o índice de espectro só é completo com a replicação ativa.
+
+    Em cluster_mode o banco decide os conflitos e a replicação não é exigida.
+    """
+    if not spectrum_locks and not local_state_complete(spectrum_index):
+        raise HTTPException(status_code=503, detail="Replicação do índice de espectro indisponível")
+
+def generate_grant_id(fcc_id: str, cbsd_serial_number: str) -> str:
+    """Gera ID único para o grant (equivalente ao contrato Solidity)"""
+    return f"grant_{fcc_id}_{cbsd_serial_number}_{uuid.uuid4().hex[:8]}"
+
+def build_cbsd_row(request: RegistrationRequest, sas_address: str, timestamp: int) -> Dict[str, Any]:
+    """Colunas de um CBSD a partir da requisição de registro"""
+    return {
+        "fcc_id": request.fccId,
+        "user_id": request.userId,
+        "cbsd_serial_number": request.cbsdSerialNumber,
+        "call_sign": request.callSign,
+        "cbsd_category": request.cbsdCategory,
+        "air_interface": request.airInterface,
+        "meas_capability": json.dumps(request.measCapability),
+        "eirp_capability": request.eirpCapability,
+        "latitude": request.latitude,
+        "longitude": request.longitude,
+        "height": request.height,
+        "height_type": request.heightType,
+        "indoor_deployment": request.indoorDeployment,
+        "antenna_gain": request.antennaGain,
+        "antenna_beamwidth": request.antennaBeamwidth,
+        "antenna_azimuth": request.antennaAzimuth,
+        "grouping_param": request.groupingParam,
+        "cbsd_address": request.cbsdAddress,
+        "sas_origin": sas_address,
+        "registration_timestamp": timestamp
+    }
+
+def build_grant_row(request: GrantRequest, grant_id: str, sas_address: str, timestamp: int) -> Dict[str, Any]:
+    """Colunas de um Grant a partir da requisição de grant"""
+    return {
+        "grant_id": grant_id,
+        "fcc_id": request.fccId,
+        "cbsd_serial_number": request.cbsdSerialNumber,
+        "channel_type": request.channelType,
+        "max_eirp": request.maxEirp,
+        "low_frequency": request.lowFrequency,
+        "high_frequency": request.highFrequency,
+        "requested_max_eirp": request.requestedMaxEirp,
+        "requested_low_frequency": request.requestedLowFrequency,
+        "requested_high_frequency": request.requestedHighFrequency,
+        "grant_expire_time": request.grantExpireTime,
+        "state": "GRANTED",
+        "sas_origin": sas_address,
+        "grant_timestamp": timestamp,
+        "terminated": False
+    }
+
+def count_removed_grants(rows: List[Any]):
+    """Desconta dos contadores do /stats os grants removidos (linhas com sas_origin e terminated)"""
+    for row in rows:
+        stats_counters.add(GRANTS_TERMINATED if row.terminated else GRANTS_ACTIVE, -1, row.sas_origin)
+
+async def run_write(operation: Callable[[AsyncSession], Awaitable[Any]], db: Optional[AsyncSession] = None) -> Any:
+    """Executa operation(session) e confirma a transação.
+
+    Com a fila de escrita ativa, a operação roda no escritor único e é
+    confirmada em grupo com as de outras requisições; senão roda na sessão
+    informada (ou em uma nova) seguida de commit. Verificações que dependem do
+    estado atual devem ficar dentro da operação para serem atômicas.
+    """
+    with trace_phase("commit"):
+        if write_queue and write_queue.running:
+            return await write_queue.submit(operation)
+        if db is not None:
+            result = await operation(db)
+            await db.commit()
+            return result
+        return await run_in_session(AsyncSessionLocal, operation)
+
+async def emit_events(events: List[Tuple[str, Dict[str, Any]]]):
+    """Envia ao ledger eventos de alterações já confirmadas (equivalente ao emit do Solidity).
+
+    Com ledger_sync_writes a resposta só sai depois que o bloco com os eventos
+    foi gravado: uma alteração confirmada ao cliente nunca fica sem evento.
+    """
+    with trace_phase("ledger"):
+        block = event_ledger.extend(events)
+        if settings.ledger_sync_writes:
+            event_ledger.request_flush()
+            await block
 
 # --- Interface Pública SAS-SAS (WINNF TS-0096/3003) - Alinhada com contrato Solidity ---
 
@@ -134,9 +397,10 @@ async def health_check():
 async def registration(
     request: RegistrationRequest, 
     sas_address: str = Header(..., alias="X-SAS-Address"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Registro de CBSD - Alinhado com contrato Solidity"""
+    mark_validated()
     try:
         # Verificar se SAS está autorizado
         if not await verify_sas_authorization(sas_address, db):
@@ -145,133 +409,126 @@ async def registration(
         # Gerar chave CBSD
         cbsd_key = generate_cbsd_key(request.fccId, request.cbsdSerialNumber)
         
-        # Verificar se CBSD já existe
-        existing_cbsd = db.query(CBSD).filter(
-            CBSD.fcc_id == request.fccId,
-            CBSD.cbsd_serial_number == request.cbsdSerialNumber
-        ).first()
-        
-        if existing_cbsd:
-            raise HTTPException(status_code=400, detail="CBSD já existe")
-        
-        # Criar novo CBSD
         current_timestamp = int(time.time())
-        cbsd = CBSD(
-            fcc_id=request.fccId,
-            user_id=request.userId,
-            cbsd_serial_number=request.cbsdSerialNumber,
-            call_sign=request.callSign,
-            cbsd_category=request.cbsdCategory,
-            air_interface=request.airInterface,
-            meas_capability=json.dumps(request.measCapability),
-            eirp_capability=request.eirpCapability,
-            latitude=request.latitude,
-            longitude=request.longitude,
-            height=request.height,
-            height_type=request.heightType,
-            indoor_deployment=request.indoorDeployment,
-            antenna_gain=request.antennaGain,
-            antenna_beamwidth=request.antennaBeamwidth,
-            antenna_azimuth=request.antennaAzimuth,
-            grouping_param=request.groupingParam,
-            cbsd_address=request.cbsdAddress,
-            sas_origin=sas_address,
-            registration_timestamp=current_timestamp
-        )
-        db.add(cbsd)
-        
-        # Registrar evento (equivalente ao emit do Solidity)
-        event = Event(
-            event_type="CBSD_REGISTERED",
-            payload=json.dumps({
-                "fccId": request.fccId,
-                "serialNumber": request.cbsdSerialNumber,
-                "sasOrigin": sas_address
-            }),
-            transaction_hash=f"0x{uuid.uuid4().hex}",
-            block_number=1
+
+        async def register(session: AsyncSession):
+            # Verificar se CBSD já existe
+            if await find_cbsd(session, request.fccId, request.cbsdSerialNumber) is not None:
+                raise HTTPException(status_code=400, detail="CBSD já existe")
+
+            # Criar novo CBSD
+            session.add(CBSD(**build_cbsd_row(request, sas_address, current_timestamp)))
+
+        try:
+            await run_write(register, db)
+        except IntegrityError:
+            # Registrado em paralelo por outra requisição ou worker (fcc_id/serial únicos)
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="CBSD já existe")
+
+        record = RegisteredCBSD(
+            request.fccId, request.cbsdSerialNumber, request.latitude, request.longitude, sas_address
         )
-        db.add(event)
-        db.commit()
+        cbsd_registry.add(record)
+        await cbsd_registry.publish_added([record])
+        stats_counters.add(CBSDS, 1, sas_address)
+        
+        # Registrar evento no ledger (equivalente ao emit do Solidity)
+        await emit_events([("CBSD_REGISTERED", {
+            "fccId": request.fccId,
+            "serialNumber": request.cbsdSerialNumber,
+            "sasOrigin": sas_address
+        })])
+        
+        geo_index.add(request.fccId, request.cbsdSerialNumber, request.latitude, request.longitude)
+        await geo_index.publish_added([geo_index.get(request.fccId)])
         
-        return RegistrationResponse(
-            cbsdId=request.cbsdSerialNumber,
-            registrationResponse={
+        return FastJSONResponse({
+            "responseCode": ResponseCode.SUCCESS,
+            "cbsdId": request.cbsdSerialNumber,
+            "registrationResponse": {
                 "cbsdId": request.cbsdSerialNumber,
                 "registration": "SUCCESS"
             }
-        )
+        })
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Erro no registro: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Erro interno no registro")
 
 @app.post("/v1.3/grant")
 async def grant(
     request: GrantRequest, 
     sas_address: str = Header(..., alias="X-SAS-Address"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Solicitação de grant - Alinhado com contrato Solidity"""
+    mark_validated()
+    check_spectrum_replication()
     try:
         # Verificar se SAS está autorizado
         if not await verify_sas_authorization(sas_address, db):
             raise HTTPException(status_code=403, detail="SAS não autorizado")
         
-        # Verificar se CBSD existe
-        cbsd = db.query(CBSD).filter(
-            CBSD.fcc_id == request.fccId,
-            CBSD.cbsd_serial_number == request.cbsdSerialNumber
-        ).first()
-        
-        if not cbsd:
-            raise HTTPException(status_code=404, detail="CBSD não registrado")
-        
         # Gerar ID único para o grant (equivalente ao contrato Solidity)
-        grant_id = f"grant_{request.fccId}_{request.cbsdSerialNumber}_{uuid.uuid4().hex[:8]}"
+        grant_id = generate_grant_id(request.fccId, request.cbsdSerialNumber)
         current_timestamp = int(time.time())
+
+        async def create_grant(session: AsyncSession):
+            # Verificar se CBSD existe
+            cbsd = await find_cbsd(session, request.fccId, request.cbsdSerialNumber)
+
+            if not cbsd:
+                raise HTTPException(status_code=404, detail="CBSD não registrado")
+
+            # Verificar conflito de espectro no índice em memória (e, em cluster, no banco sob lock)
+            with trace_phase("conflict"):
+                cell = spectrum_index.cell_for(cbsd.latitude, cbsd.longitude)
+                conflicts = False
+                if spectrum_locks:
+                    allocation = Allocation(
+                        request.fccId, request.channelType, request.lowFrequency, request.highFrequency, cell
+                    )
+                    conflicts = (await spectrum_locks.lock_and_check(session, [allocation]))[0]
+                conflicts = conflicts or spectrum_index.find_conflicts(
+                    request.fccId, request.lowFrequency, request.highFrequency, cell
+                )
+            if conflicts:
+                raise HTTPException(status_code=409, detail="Conflito de espectro com grant existente")
+
+            # Reservar o espectro no índice antes do commit (sem await entre checagem e reserva)
+            spectrum_index.add(
+                grant_id, request.fccId, request.channelType,
+                request.lowFrequency, request.highFrequency, cell
+            )
+
+            # Criar grant
+            session.add(Grant(**build_grant_row(request, grant_id, sas_address, current_timestamp)))
+
+        try:
+            await run_write(create_grant, db)
+        except Exception:
+            spectrum_index.remove(grant_id)
+            raise
+        stats_counters.add(GRANTS_ACTIVE, 1, sas_address)
         
-        # Criar grant
-        grant = Grant(
-            grant_id=grant_id,
-            fcc_id=request.fccId,
-            cbsd_serial_number=request.cbsdSerialNumber,
-            channel_type=request.channelType,
-            max_eirp=request.maxEirp,
-            low_frequency=request.lowFrequency,
-            high_frequency=request.highFrequency,
-            requested_max_eirp=request.requestedMaxEirp,
-            requested_low_frequency=request.requestedLowFrequency,
-            requested_high_frequency=request.requestedHighFrequency,
-            grant_expire_time=request.grantExpireTime,
-            state="GRANTED",
-            sas_origin=sas_address,
-            grant_timestamp=current_timestamp,
-            terminated=False
-        )
-        db.add(grant)
-        
-        # Registrar evento (equivalente ao emit do Solidity)
-        event = Event(
-            event_type="GRANT_CREATED",
-            payload=json.dumps({
-                "fccId": request.fccId,
-                "serialNumber": request.cbsdSerialNumber,
-                "grantId": grant_id,
-                "sasOrigin": sas_address
-            }),
-            transaction_hash=f"0x{uuid.uuid4().hex}",
-            block_number=1
-        )
-        db.add(event)
-        db.commit()
+        # Registrar evento no ledger (equivalente ao emit do Solidity)
+        await emit_events([("GRANT_CREATED", {
+            "fccId": request.fccId,
+            "serialNumber": request.cbsdSerialNumber,
+            "grantId": grant_id,
+            "sasOrigin": sas_address
+        })])
+        await spectrum_index.publish_added([spectrum_index.get(grant_id)])
+        expiry_scheduler.schedule(grant_id, request.grantExpireTime)
         
-        return GrantResponse(
-            cbsdId=request.cbsdSerialNumber,
-            grantResponse={
+        return FastJSONResponse({
+            "responseCode": ResponseCode.SUCCESS,
+            "cbsdId": request.cbsdSerialNumber,
+            "grantResponse": {
                 "cbsdId": request.cbsdSerialNumber,
                 "grantId": grant_id,
                 "grant": "SUCCESS",
@@ -281,305 +538,1315 @@ async def grant(
                 "highFrequency": request.highFrequency,
                 "grantExpireTime": request.grantExpireTime
             }
-        )
+        })
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Erro na solicitação de grant: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Erro interno na solicitação de grant")
 
 @app.post("/v1.3/relinquishment")
 async def relinquishment(
     request: RelinquishmentRequest, 
     sas_address: str = Header(..., alias="X-SAS-Address"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Terminar grant - Alinhado com contrato Solidity"""
+    mark_validated()
     try:
         # Verificar se SAS está autorizado
         if not await verify_sas_authorization(sas_address, db):
             raise HTTPException(status_code=403, detail="SAS não autorizado")
         
-        # Verificar se CBSD existe
-        cbsd = db.query(CBSD).filter(
-            CBSD.fcc_id == request.fccId,
-            CBSD.cbsd_serial_number == request.cbsdSerialNumber
-        ).first()
-        
-        if not cbsd:
-            raise HTTPException(status_code=404, detail="CBSD não registrado")
-        
-        # Encontrar e terminar o grant
-        grant = db.query(Grant).filter(
-            Grant.grant_id == request.grantId,
-            Grant.fcc_id == request.fccId,
-            Grant.cbsd_serial_number == request.cbsdSerialNumber
-        ).first()
-        
-        if not grant:
-            raise HTTPException(status_code=404, detail="Grant não encontrado")
-        
-        if grant.terminated:
-            raise HTTPException(status_code=400, detail="Grant já foi terminado")
+        async def terminate_grant(session: AsyncSession) -> str:
+            # Verificar se CBSD existe
+            if await find_cbsd(session, request.fccId, request.cbsdSerialNumber) is None:
+                raise HTTPException(status_code=404, detail="CBSD não registrado")
+
+            # Encontrar e terminar o grant
+            result = await session.execute(
+                select(Grant).where(
+                    Grant.grant_id == request.grantId,
+                    Grant.fcc_id == request.fccId,
+                    Grant.cbsd_serial_number == request.cbsdSerialNumber
+                )
+            )
+            grant = result.scalars().first()
+
+            if not grant:
+                raise HTTPException(status_code=404, detail="Grant não encontrado")
+
+            if grant.terminated:
+                raise HTTPException(status_code=400, detail="Grant já foi terminado")
+
+            grant.terminated = True
+            grant.state = "TERMINATED"
+            return grant.sas_origin
+
+        grant_origin = await run_write(terminate_grant, db)
+        stats_counters.add(GRANTS_ACTIVE, -1, grant_origin)
+        stats_counters.add(GRANTS_TERMINATED, 1, grant_origin)
         
-        grant.terminated = True
-        grant.state = "TERMINATED"
+        # Registrar evento no ledger (equivalente ao emit do Solidity)
+        await emit_events([("GRANT_TERMINATED", {
+            "fccId": request.fccId,
+            "serialNumber": request.cbsdSerialNumber,
+            "grantId": request.grantId,
+            "sasOrigin": sas_address
+        })])
         
-        # Registrar evento (equivalente ao emit do Solidity)
-        event = Event(
-            event_type="GRANT_TERMINATED",
-            payload=json.dumps({
-                "fccId": request.fccId,
-                "serialNumber": request.cbsdSerialNumber,
-                "grantId": request.grantId,
-                "sasOrigin": sas_address
-            }),
-            transaction_hash=f"0x{uuid.uuid4().hex}",
-            block_number=1
-        )
-        db.add(event)
-        db.commit()
+        # Liberar o espectro no índice
+        if spectrum_index.remove(request.grantId):
+            await spectrum_index.publish_removed([request.grantId])
+        expiry_scheduler.cancel(request.grantId)
+        heartbeat_store.remove(request.grantId)
         
-        return RelinquishmentResponse(
-            cbsdId=request.cbsdSerialNumber,
-            relinquishmentResponse={
+        return FastJSONResponse({
+            "responseCode": ResponseCode.SUCCESS,
+            "cbsdId": request.cbsdSerialNumber,
+            "relinquishmentResponse": {
                 "cbsdId": request.cbsdSerialNumber,
                 "grantId": request.grantId,
                 "relinquishment": "SUCCESS"
             }
-        )
+        })
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Erro no relinquishment: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Erro interno no relinquishment")
 
 @app.post("/v1.3/deregistration")
 async def deregistration(
     request: DeregistrationRequest, 
     sas_address: str = Header(..., alias="X-SAS-Address"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Remover CBSD - Alinhado com contrato Solidity"""
+    mark_validated()
     try:
         # Verificar se SAS está autorizado
         if not await verify_sas_authorization(sas_address, db):
             raise HTTPException(status_code=403, detail="SAS não autorizado")
         
-        # Verificar se CBSD existe
-        cbsd = db.query(CBSD).filter(
-            CBSD.fcc_id == request.fccId,
-            CBSD.cbsd_serial_number == request.cbsdSerialNumber
-        ).first()
-        
-        if not cbsd:
-            raise HTTPException(status_code=404, detail="CBSD não registrado")
+        async def deregister(session: AsyncSession):
+            # Verificar se CBSD existe
+            cbsd = await find_cbsd(session, request.fccId, request.cbsdSerialNumber)
+
+            if not cbsd:
+                raise HTTPException(status_code=404, detail="CBSD não registrado")
+
+            # Remover CBSD e todos os seus grants (equivalente ao cascade do relacionamento)
+            result = await session.execute(
+                delete(Grant)
+                .where(Grant.fcc_id == request.fccId)
+                .returning(Grant.sas_origin, Grant.terminated)
+                .execution_options(synchronize_session=False)
+            )
+            removed_grants = result.all()
+            await session.execute(
+                delete(CBSD)
+                .where(CBSD.fcc_id == request.fccId, CBSD.cbsd_serial_number == request.cbsdSerialNumber)
+                .execution_options(synchronize_session=False)
+            )
+            return cbsd, removed_grants
+
+        cbsd, removed_grants = await run_write(deregister, db)
+        stats_counters.add(CBSDS, -1, cbsd.sas_origin)
+        count_removed_grants(removed_grants)
         
-        # Remover CBSD e todos os seus grants
-        db.delete(cbsd)
+        # Registrar evento no ledger (equivalente ao emit do Solidity)
+        await emit_events([("CBSD_DEREGISTERED", {
+            "fccId": request.fccId,
+            "serialNumber": request.cbsdSerialNumber,
+            "sasOrigin": sas_address
+        })])
         
-        # Registrar evento
-        event = Event(
-            event_type="CBSD_DEREGISTERED",
-            payload=json.dumps({
-                "fccId": request.fccId,
-                "serialNumber": request.cbsdSerialNumber,
-                "sasOrigin": sas_address
-            }),
-            transaction_hash=f"0x{uuid.uuid4().hex}",
-            block_number=1
-        )
-        db.add(event)
-        db.commit()
+        # Liberar o espectro dos grants removidos em cascata
+        removed_grant_ids = spectrum_index.remove_cbsd(request.fccId)
+        if removed_grant_ids:
+            await spectrum_index.publish_removed(removed_grant_ids)
+        for grant_id in removed_grant_ids:
+            expiry_scheduler.cancel(grant_id)
+            heartbeat_store.remove(grant_id)
+        if geo_index.remove(request.fccId):
+            await geo_index.publish_removed([request.fccId])
+        if cbsd_registry.remove(request.fccId, request.cbsdSerialNumber):
+            await cbsd_registry.publish_removed([(request.fccId, request.cbsdSerialNumber)])
         
-        return DeregistrationResponse(
-            cbsdId=request.cbsdSerialNumber,
-            deregistrationResponse={
+        return FastJSONResponse({
+            "responseCode": ResponseCode.SUCCESS,
+            "cbsdId": request.cbsdSerialNumber,
+            "deregistrationResponse": {
                 "cbsdId": request.cbsdSerialNumber,
                 "deregistration": "SUCCESS"
             }
-        )
+        })
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Erro no deregistration: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Erro interno no deregistration")
 
+# --- Requisições em lote (arrays WINNF) ---
+
+def chunked(items: List[Any], size: int = BATCH_QUERY_CHUNK):
+    """Divide uma lista em blocos (limita o número de parâmetros por IN)"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def check_batch_size(items: List[Any]):
+    """Rejeita lotes vazios ou maiores que settings.max_batch_size"""
+    if not items:
+        raise HTTPException(status_code=400, detail="Lote vazio")
+    if len(items) > settings.max_batch_size:
+        raise HTTPException(status_code=400, detail=f"Lote excede o máximo de {settings.max_batch_size} itens")
+
+async def fetch_registered_cbsds(db: AsyncSession, fcc_ids: List[str]) -> Dict[str, Any]:
+    """Mapeia fcc_id -> (cbsd_serial_number, latitude, longitude) dos CBSDs já registrados"""
+    with trace_phase("lookup"):
+        registered = {}
+        for chunk in chunked(list(set(fcc_ids))):
+            result = await db.execute(
+                select(CBSD.fcc_id, CBSD.cbsd_serial_number, CBSD.latitude, CBSD.longitude)
+                .where(CBSD.fcc_id.in_(chunk))
+            )
+            registered.update((row.fcc_id, row) for row in result)
+        return registered
+
+@app.post("/v1.3/registration/batch")
+async def registration_batch(
+    request: RegistrationBatchRequest,
+    sas_address: str = Header(..., alias="X-SAS-Address"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Registro de CBSDs em lote - uma transação e inserts em massa"""
+    mark_validated()
+    check_batch_size(request.registrationRequest)
+    try:
+        if not await verify_sas_authorization(sas_address, db):
+            raise HTTPException(status_code=403, detail="SAS não autorizado")
+        
+        items = request.registrationRequest
+        
+        # Repetições dentro do lote (fcc_id e cbsd_serial_number são únicos individualmente)
+        batch_fcc_ids = set()
+        batch_serials = set()
+        current_timestamp = int(time.time())
+        cbsd_rows = []
+        for item in items:
+            if item.fccId in batch_fcc_ids or item.cbsdSerialNumber in batch_serials:
+                continue
+            batch_fcc_ids.add(item.fccId)
+            batch_serials.add(item.cbsdSerialNumber)
+            cbsd_rows.append(build_cbsd_row(item, sas_address, current_timestamp))
+        
+        async def insert_cbsds(session: AsyncSession):
+            # CBSDs já registrados (inclusive por lotes concorrentes) são ignorados pelo banco
+            statement = UPSERT_DIALECTS[session.bind.dialect.name](CBSD.__table__).on_conflict_do_nothing()
+            result = await session.execute(
+                statement.returning(CBSD.__table__.c.fcc_id, CBSD.__table__.c.cbsd_serial_number), cbsd_rows
+            )
+            return set(result.all())
+        written = await run_write(insert_cbsds, db)
+        
+        # Respostas a partir das linhas efetivamente gravadas
+        cbsd_rows = [row for row in cbsd_rows if (row["fcc_id"], row["cbsd_serial_number"]) in written]
+        events = []
+        responses = []
+        for item in items:
+            if (item.fccId, item.cbsdSerialNumber) not in written:
+                responses.append({
+                    "responseCode": ResponseCode.INVALID_VALUE,
+                    "cbsdId": item.cbsdSerialNumber,
+                    "registrationResponse": {
+                        "cbsdId": item.cbsdSerialNumber,
+                        "registration": "FAILURE",
+                        "responseMessage": "CBSD já existe"
+                    }
+                })
+                continue
+            # Cada chave gravada responde sucesso uma única vez
+            written.discard((item.fccId, item.cbsdSerialNumber))
+            events.append(("CBSD_REGISTERED", {
+                "fccId": item.fccId,
+                "serialNumber": item.cbsdSerialNumber,
+                "sasOrigin": sas_address
+            }))
+            responses.append({
+                "responseCode": ResponseCode.SUCCESS,
+                "cbsdId": item.cbsdSerialNumber,
+                "registrationResponse": {
+                    "cbsdId": item.cbsdSerialNumber,
+                    "registration": "SUCCESS"
+                }
+            })
+        
+        if cbsd_rows:
+            stats_counters.add(CBSDS, len(cbsd_rows), sas_address)
+            await emit_events(events)
+            
+            for row in cbsd_rows:
+                geo_index.add(row["fcc_id"], row["cbsd_serial_number"], row["latitude"], row["longitude"])
+            await geo_index.publish_added([geo_index.get(row["fcc_id"]) for row in cbsd_rows])
+            
+            records = [
+                RegisteredCBSD(row["fcc_id"], row["cbsd_serial_number"], row["latitude"], row["longitude"], sas_address)
+                for row in cbsd_rows
+            ]
+            for record in records:
+                cbsd_registry.add(record)
+            await cbsd_registry.publish_added(records)
+        
+        return FastJSONResponse({"registrationResponse": responses})
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro no registro em lote: {str(e)}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Erro interno no registro em lote")
+
+@app.post("/v1.3/grant/batch")
+async def grant_batch(
+    request: GrantBatchRequest,
+    sas_address: str = Header(..., alias="X-SAS-Address"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Solicitação de grants em lote - uma transação e inserts em massa"""
+    mark_validated()
+    check_batch_size(request.grantRequest)
+    check_spectrum_replication()
+    reserved = []
+    try:
+        if not await verify_sas_authorization(sas_address, db):
+            raise HTTPException(status_code=403, detail="SAS não autorizado")
+        
+        items = request.grantRequest
+        registered = await fetch_registered_cbsds(db, [item.fccId for item in items])
+        
+        current_timestamp = int(time.time())
+        grant_rows = []
+        events = []
+        responses = []
+        allocations = []  # alocações de grant_rows, verificadas no banco em cluster_mode
+        accepted = []  # posição em responses de cada linha de grant_rows
+        for item in items:
+            cbsd = registered.get(item.fccId)
+            error = None
+            if cbsd is None or cbsd.cbsd_serial_number != item.cbsdSerialNumber:
+                error = (ResponseCode.INVALID_VALUE, "CBSD não registrado")
+            else:
+                cell = spectrum_index.cell_for(cbsd.latitude, cbsd.longitude)
+                if spectrum_index.find_conflicts(item.fccId, item.lowFrequency, item.highFrequency, cell):
+                    error = (ResponseCode.GRANT_CONFLICT, "Conflito de espectro com grant existente")
+            if error:
+                responses.append({
+                    "responseCode": error[0],
+                    "cbsdId": item.cbsdSerialNumber,
+                    "grantResponse": {
+                        "cbsdId": item.cbsdSerialNumber,
+                        "grant": "FAILURE",
+                        "responseMessage": error[1]
+                    }
+                })
+                continue
+            grant_id = generate_grant_id(item.fccId, item.cbsdSerialNumber)
+            # Reservar no índice para que itens seguintes do lote vejam este grant
+            spectrum_index.add(grant_id, item.fccId, item.channelType, item.lowFrequency, item.highFrequency, cell)
+            reserved.append(grant_id)
+            allocations.append(Allocation(item.fccId, item.channelType, item.lowFrequency, item.highFrequency, cell))
+            accepted.append(len(responses))
+            grant_rows.append(build_grant_row(item, grant_id, sas_address, current_timestamp))
+            events.append(("GRANT_CREATED", {
+                "fccId": item.fccId,
+                "serialNumber": item.cbsdSerialNumber,
+                "grantId": grant_id,
+                "sasOrigin": sas_address
+            }))
+            responses.append({
+                "responseCode": ResponseCode.SUCCESS,
+                "cbsdId": item.cbsdSerialNumber,
+                "grantResponse": {
+                    "cbsdId": item.cbsdSerialNumber,
+                    "grantId": grant_id,
+                    "grant": "SUCCESS",
+                    "channelType": item.channelType,
+                    "maxEirp": item.maxEirp,
+                    "lowFrequency": item.lowFrequency,
+                    "highFrequency": item.highFrequency,
+                    "grantExpireTime": item.grantExpireTime
+                }
+            })
+        
+        if grant_rows:
+            async def insert_grants(session: AsyncSession):
+                """Posição em grant_rows -> erro (código, mensagem) das linhas não gravadas"""
+                # CBSDs removidos desde a validação (deregistration concorrente); no
+                # PostgreSQL FOR SHARE impede a remoção dos demais até o commit
+                present = set()
+                for chunk in chunked(list({(row["fcc_id"], row["cbsd_serial_number"]) for row in grant_rows})):
+                    result = await session.execute(
+                        select(CBSD.fcc_id, CBSD.cbsd_serial_number)
+                        .where(tuple_(CBSD.fcc_id, CBSD.cbsd_serial_number).in_(chunk))
+                        .with_for_update(read=True)
+                    )
+                    present.update((row.fcc_id, row.cbsd_serial_number) for row in result)
+                rejected = {
+                    position: (ResponseCode.INVALID_VALUE, "CBSD não registrado")
+                    for position, row in enumerate(grant_rows)
+                    if (row["fcc_id"], row["cbsd_serial_number"]) not in present
+                }
+                if spectrum_locks:
+                    # Grants confirmados por outras instâncias que o índice local ainda não recebeu
+                    with trace_phase("conflict"):
+                        conflicts = await spectrum_locks.lock_and_check(session, allocations)
+                    for position, conflict in enumerate(conflicts):
+                        if conflict:
+                            rejected.setdefault(
+                                position, (ResponseCode.GRANT_CONFLICT, "Conflito de espectro com grant existente")
+                            )
+                rows = [row for position, row in enumerate(grant_rows) if position not in rejected]
+                if rows:
+                    await session.execute(insert(Grant), rows)
+                return rejected
+            rejected = await run_write(insert_grants, db)
+            for position, (code, message) in rejected.items():
+                spectrum_index.remove(reserved[position])
+                responses[accepted[position]] = {
+                    "responseCode": code,
+                    "cbsdId": grant_rows[position]["cbsd_serial_number"],
+                    "grantResponse": {
+                        "cbsdId": grant_rows[position]["cbsd_serial_number"],
+                        "grant": "FAILURE",
+                        "responseMessage": message
+                    }
+                }
+            if rejected:
+                reserved = [grant_id for position, grant_id in enumerate(reserved) if position not in rejected]
+                events = [event for position, event in enumerate(events) if position not in rejected]
+                grant_rows = [row for position, row in enumerate(grant_rows) if position not in rejected]
+            stats_counters.add(GRANTS_ACTIVE, len(grant_rows), sas_address)
+            await emit_events(events)
+            await spectrum_index.publish_added([spectrum_index.get(grant_id) for grant_id in reserved])
+            for row in grant_rows:
+                expiry_scheduler.schedule(row["grant_id"], row["grant_expire_time"])
+        
+        return FastJSONResponse({"grantResponse": responses})
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro na solicitação de grant em lote: {str(e)}")
+        await db.rollback()
+        for grant_id in reserved:
+            spectrum_index.remove(grant_id)
+        raise HTTPException(status_code=500, detail="Erro interno na solicitação de grant em lote")
+
+@app.post("/v1.3/relinquishment/batch")
+async def relinquishment_batch(
+    request: RelinquishmentBatchRequest,
+    sas_address: str = Header(..., alias="X-SAS-Address"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Terminar grants em lote - uma transação e updates em massa"""
+    mark_validated()
+    check_batch_size(request.relinquishmentRequest)
+    try:
+        if not await verify_sas_authorization(sas_address, db):
+            raise HTTPException(status_code=403, detail="SAS não autorizado")
+        
+        items = request.relinquishmentRequest
+        keys = list({(item.grantId, item.fccId, item.cbsdSerialNumber) for item in items})
+        
+        async def terminate_grants(session: AsyncSession):
+            """Termina os grants ainda ativos; retorna (terminados, estado atual dos demais)"""
+            terminated = {}
+            for chunk in chunked(keys):
+                result = await session.execute(
+                    update(Grant)
+                    .where(
+                        tuple_(Grant.grant_id, Grant.fcc_id, Grant.cbsd_serial_number).in_(chunk),
+                        Grant.terminated == False
+                    )
+                    .values(terminated=True, state="TERMINATED")
+                    .returning(Grant.grant_id, Grant.fcc_id, Grant.cbsd_serial_number, Grant.sas_origin)
+                    .execution_options(synchronize_session=False)
+                )
+                terminated.update((row.grant_id, row) for row in result)
+            # Motivo da falha dos demais: inexistente (ou de outro CBSD) ou já terminado
+            existing = {}
+            for chunk in chunked([grant_id for grant_id, _, _ in keys if grant_id not in terminated]):
+                result = await session.execute(
+                    select(Grant.grant_id, Grant.fcc_id, Grant.cbsd_serial_number).where(Grant.grant_id.in_(chunk))
+                )
+                existing.update((row.grant_id, row) for row in result)
+            return terminated, existing
+        
+        terminated, existing = await run_write(terminate_grants, db)
+        
+        # Respostas, contadores e eventos a partir das linhas efetivamente atualizadas
+        terminated_ids = set()
+        events = []
+        responses = []
+        for item in items:
+            grant = terminated.get(item.grantId) or existing.get(item.grantId)
+            error = None
+            if grant is None or grant.fcc_id != item.fccId or grant.cbsd_serial_number != item.cbsdSerialNumber:
+                error = (ResponseCode.INVALID_VALUE, "Grant não encontrado")
+            elif item.grantId not in terminated or item.grantId in terminated_ids:
+                error = (ResponseCode.TERMINATED_GRANT, "Grant já foi terminado")
+            if error:
+                responses.append({
+                    "responseCode": error[0],
+                    "cbsdId": item.cbsdSerialNumber,
+                    "relinquishmentResponse": {
+                        "cbsdId": item.cbsdSerialNumber,
+                        "grantId": item.grantId,
+                        "relinquishment": "FAILURE",
+                        "responseMessage": error[1]
+                    }
+                })
+                continue
+            terminated_ids.add(item.grantId)
+            events.append(("GRANT_TERMINATED", {
+                "fccId": item.fccId,
+                "serialNumber": item.cbsdSerialNumber,
+                "grantId": item.grantId,
+                "sasOrigin": sas_address
+            }))
+            responses.append({
+                "responseCode": ResponseCode.SUCCESS,
+                "cbsdId": item.cbsdSerialNumber,
+                "relinquishmentResponse": {
+                    "cbsdId": item.cbsdSerialNumber,
+                    "grantId": item.grantId,
+                    "relinquishment": "SUCCESS"
+                }
+            })
+        
+        if terminated:
+            for row in terminated.values():
+                stats_counters.add(GRANTS_ACTIVE, -1, row.sas_origin)
+                stats_counters.add(GRANTS_TERMINATED, 1, row.sas_origin)
+            await emit_events(events)
+            
+            for grant_id in terminated:
+                spectrum_index.remove(grant_id)
+                expiry_scheduler.cancel(grant_id)
+                heartbeat_store.remove(grant_id)
+            await spectrum_index.publish_removed(list(terminated))
+        
+        return FastJSONResponse({"relinquishmentResponse": responses})
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro no relinquishment em lote: {str(e)}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Erro interno no relinquishment em lote")
+
+@app.post("/v1.3/deregistration/batch")
+async def deregistration_batch(
+    request: DeregistrationBatchRequest,
+    sas_address: str = Header(..., alias="X-SAS-Address"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Remover CBSDs em lote - uma transação e deletes em massa"""
+    mark_validated()
+    check_batch_size(request.deregistrationRequest)
+    try:
+        if not await verify_sas_authorization(sas_address, db):
+            raise HTTPException(status_code=403, detail="SAS não autorizado")
+        
+        items = request.deregistrationRequest
+        keys = list({(item.fccId, item.cbsdSerialNumber) for item in items})
+        
+        # Remover grants e CBSDs (equivalente ao cascade do relacionamento)
+        async def deregister_cbsds(session: AsyncSession):
+            removed_grants = []
+            removed_cbsds = {}
+            for chunk in chunked(keys):
+                matches = tuple_(CBSD.fcc_id, CBSD.cbsd_serial_number).in_(chunk)
+                result = await session.execute(
+                    delete(Grant)
+                    .where(Grant.fcc_id.in_(select(CBSD.fcc_id).where(matches)))
+                    .returning(Grant.sas_origin, Grant.terminated)
+                    .execution_options(synchronize_session=False)
+                )
+                removed_grants.extend(result.all())
+                result = await session.execute(
+                    delete(CBSD)
+                    .where(matches)
+                    .returning(CBSD.fcc_id, CBSD.cbsd_serial_number, CBSD.sas_origin)
+                    .execution_options(synchronize_session=False)
+                )
+                removed_cbsds.update(((row.fcc_id, row.cbsd_serial_number), row) for row in result)
+            return removed_grants, removed_cbsds
+        removed_grants, removed_cbsds = await run_write(deregister_cbsds, db)
+        
+        # Respostas e eventos a partir dos CBSDs efetivamente removidos
+        answered = set()
+        events = []
+        responses = []
+        for item in items:
+            key = (item.fccId, item.cbsdSerialNumber)
+            if key not in removed_cbsds or key in answered:
+                responses.append({
+                    "responseCode": ResponseCode.INVALID_VALUE,
+                    "cbsdId": item.cbsdSerialNumber,
+                    "deregistrationResponse": {
+                        "cbsdId": item.cbsdSerialNumber,
+                        "deregistration": "FAILURE",
+                        "responseMessage": "CBSD não registrado"
+                    }
+                })
+                continue
+            answered.add(key)
+            events.append(("CBSD_DEREGISTERED", {
+                "fccId": item.fccId,
+                "serialNumber": item.cbsdSerialNumber,
+                "sasOrigin": sas_address
+            }))
+            responses.append({
+                "responseCode": ResponseCode.SUCCESS,
+                "cbsdId": item.cbsdSerialNumber,
+                "deregistrationResponse": {
+                    "cbsdId": item.cbsdSerialNumber,
+                    "deregistration": "SUCCESS"
+                }
+            })
+        
+        if removed_cbsds:
+            for row in removed_cbsds.values():
+                stats_counters.add(CBSDS, -1, row.sas_origin)
+            count_removed_grants(removed_grants)
+            await emit_events(events)
+            
+            removed_fcc_ids = [fcc_id for fcc_id, _ in removed_cbsds]
+            removed_grant_ids = []
+            for fcc_id in removed_fcc_ids:
+                removed_grant_ids.extend(spectrum_index.remove_cbsd(fcc_id))
+            if removed_grant_ids:
+                await spectrum_index.publish_removed(removed_grant_ids)
+            for grant_id in removed_grant_ids:
+                expiry_scheduler.cancel(grant_id)
+                heartbeat_store.remove(grant_id)
+            for fcc_id in removed_fcc_ids:
+                geo_index.remove(fcc_id)
+            await geo_index.publish_removed(removed_fcc_ids)
+            
+            for fcc_id, cbsd_serial_number in removed_cbsds:
+                cbsd_registry.remove(fcc_id, cbsd_serial_number)
+            await cbsd_registry.publish_removed(list(removed_cbsds))
+        
+        return FastJSONResponse({"deregistrationResponse": responses})
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro no deregistration em lote: {str(e)}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Erro interno no deregistration em lote")
+
+# --- Expiração de grants (grantExpireTime / transmitExpireTime) ---
+
+async def expire_due_grants(kind: str, grant_ids: List[str], now: int):
+    """Aplica em lote as expirações vencidas entregues pelo ExpiryScheduler.
+
+    O UPDATE é condicionado ao estado atual, então grants já terminados ou com
+    vencimento renovado são ignorados e cada expiração gera um único evento,
+    mesmo com vários workers processando o mesmo grant.
+    """
+    if kind == GRANT_EXPIRY:
+        statement = (
+            update(Grant)
+            .where(Grant.grant_id.in_(grant_ids), Grant.terminated == False, Grant.grant_expire_time <= now)
+            .values(state="EXPIRED", terminated=True)
+        )
+        event_type = "GRANT_EXPIRED"
+    else:
+        statement = (
+            update(Grant)
+            .where(Grant.grant_id.in_(grant_ids), Grant.state == "AUTHORIZED", Grant.transmit_expire_time <= now)
+            .values(state="GRANTED")
+        )
+        event_type = "TRANSMIT_EXPIRED"
+    
+    async def apply_expiry(session: AsyncSession):
+        result = await session.execute(
+            statement
+            .returning(Grant.grant_id, Grant.fcc_id, Grant.cbsd_serial_number, Grant.sas_origin)
+            .execution_options(synchronize_session=False)
+        )
+        return result.all()
+    
+    expired = await run_write(apply_expiry)
+    
+    if kind == GRANT_EXPIRY:
+        for row in expired:
+            stats_counters.add(GRANTS_ACTIVE, -1, row.sas_origin)
+            stats_counters.add(GRANTS_TERMINATED, 1, row.sas_origin)
+    if expired:
+        await emit_events([
+            (event_type, {
+                "fccId": row.fcc_id,
+                "serialNumber": row.cbsd_serial_number,
+                "grantId": row.grant_id,
+                "sasOrigin": row.sas_origin
+            })
+            for row in expired
+        ])
+    
+    # O estado de heartbeat desses grants mudou no banco: recarregar no próximo heartbeat
+    for grant_id in grant_ids:
+        heartbeat_store.remove(grant_id)
+    if kind == GRANT_EXPIRY:
+        # Liberar o espectro dos grants expirados
+        freed = [grant_id for grant_id in grant_ids if spectrum_index.remove(grant_id)]
+        if freed:
+            await spectrum_index.publish_removed(freed)
+    if expired:
+        logger.info(f"{len(expired)} grants processados ({event_type})")
+
+# Agendador de expiração (min-heap em memória, sem varredura periódica da tabela)
+expiry_scheduler = create_expiry_scheduler(settings, expire_due_grants)
+
+# --- Heartbeat (estado em memória com gravação agrupada) ---
+
+async def flush_heartbeats(states: List[HeartbeatState]):
+    """Grava em um único UPDATE (executemany) o estado de heartbeat acumulado"""
+    grants_table = Grant.__table__
+    
+    async def update_grants(session: AsyncSession):
+        await session.execute(
+            update(grants_table)
+            .where(
+                grants_table.c.grant_id == bindparam("b_grant_id"),
+                grants_table.c.terminated == False,
+                or_(
+                    grants_table.c.transmit_expire_time.is_(None),
+                    grants_table.c.transmit_expire_time < bindparam("b_transmit_expire_time")
+                )
+            )
+            .values(state="AUTHORIZED", transmit_expire_time=bindparam("b_transmit_expire_time")),
+            [
+                {"b_grant_id": state.grant_id, "b_transmit_expire_time": state.transmit_expire_time}
+                for state in states
+            ]
+        )
+    
+    await run_write(update_grants)
+    
+    authorized = [state for state in states if state.newly_authorized]
+    if authorized:
+        await emit_events([
+            ("GRANT_AUTHORIZED", {
+                "fccId": state.fcc_id,
+                "serialNumber": state.cbsd_serial_number,
+                "grantId": state.grant_id,
+                "sasOrigin": state.sas_origin
+            })
+            for state in authorized
+        ])
+
+# Store de heartbeat (flush periódico em lote para a tabela grants)
+heartbeat_store = create_heartbeat_store(settings, flush_heartbeats)
+
+async def resolve_heartbeats(db: AsyncSession, items: List[HeartbeatRequest], now: int) -> List[Any]:
+    """Resolve o estado de cada heartbeat: (código WINNF, HeartbeatState ou None).
+
+    Grants ativos e já conhecidos são resolvidos em memória (índice de espectro +
+    store); apenas os demais são consultados no banco, em uma consulta por bloco.
+    """
+    lookup = set()
+    for item in items:
+        indexed = spectrum_index.get(item.grantId)
+        if indexed is None or indexed.fcc_id != item.fccId:
+            heartbeat_store.remove(item.grantId)
+            lookup.add(item.grantId)
+        elif heartbeat_store.get(item.grantId) is None:
+            lookup.add(item.grantId)
+    
+    rows = {}
+    for chunk in chunked(list(lookup)):
+        result = await db.execute(
+            select(
+                Grant.grant_id, Grant.fcc_id, Grant.cbsd_serial_number, Grant.grant_expire_time,
+                Grant.state, Grant.transmit_expire_time, Grant.terminated
+            ).where(Grant.grant_id.in_(chunk))
+        )
+        rows.update((row.grant_id, row) for row in result)
+    
+    outcomes = []
+    for item in items:
+        state = heartbeat_store.get(item.grantId)
+        if state is None:
+            row = rows.get(item.grantId)
+            if row is None or row.fcc_id != item.fccId or row.cbsd_serial_number != item.cbsdSerialNumber:
+                outcomes.append((ResponseCode.INVALID_VALUE, None))
+                continue
+            if row.terminated:
+                outcomes.append((ResponseCode.TERMINATED_GRANT, None))
+                continue
+            state = HeartbeatState(
+                grant_id=row.grant_id,
+                fcc_id=row.fcc_id,
+                cbsd_serial_number=row.cbsd_serial_number,
+                grant_expire_time=row.grant_expire_time,
+                state=row.state,
+                transmit_expire_time=row.transmit_expire_time
+            )
+            heartbeat_store.put(state)
+        if state.cbsd_serial_number != item.cbsdSerialNumber:
+            outcomes.append((ResponseCode.INVALID_VALUE, None))
+        elif state.grant_expire_time <= now:
+            outcomes.append((ResponseCode.TERMINATED_GRANT, None))
+        elif item.operationState == "AUTHORIZED" and not state.authorized(now):
+            # O CBSD transmite sem autorização válida (nunca autorizado ou transmitExpireTime vencido)
+            outcomes.append((ResponseCode.UNSYNC_OP_PARAM, None))
+        else:
+            outcomes.append((ResponseCode.SUCCESS, state))
+    return outcomes
+
+HEARTBEAT_FAILURES = {
+    ResponseCode.INVALID_VALUE: "Grant não encontrado",
+    ResponseCode.TERMINATED_GRANT: "Grant terminado",
+    ResponseCode.UNSYNC_OP_PARAM: "Grant não autorizado: pare a transmissão e envie operationState GRANTED"
+}
+
+def apply_heartbeat(item: HeartbeatRequest, code: int, state: Optional[HeartbeatState], now: int, sas_address: str) -> Dict[str, Any]:
+    """Registra o heartbeat no store e monta a resposta WINNF"""
+    body = {"cbsdId": item.cbsdSerialNumber, "grantId": item.grantId}
+    if code != ResponseCode.SUCCESS:
+        body["heartbeat"] = "FAILURE"
+        body["responseMessage"] = HEARTBEAT_FAILURES[code]
+        return {"responseCode": code, "cbsdId": item.cbsdSerialNumber, "heartbeatResponse": body}
+    transmit_expire_time = heartbeat_store.record(state, now, sas_address)
+    expiry_scheduler.schedule(item.grantId, transmit_expire_time, TRANSMIT_EXPIRY)
+    body.update({
+        "heartbeat": "SUCCESS",
+        "transmitExpireTime": transmit_expire_time,
+        "heartbeatInterval": settings.heartbeat_interval
+    })
+    return {"responseCode": ResponseCode.SUCCESS, "cbsdId": item.cbsdSerialNumber, "heartbeatResponse": body}
+
+@app.post("/v1.3/heartbeat")
+async def heartbeat(
+    request: HeartbeatRequest,
+    sas_address: str = Header(..., alias="X-SAS-Address"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Heartbeat de grant - renova transmitExpireTime sem commit por mensagem"""
+    mark_validated()
+    try:
+        if not await verify_sas_authorization(sas_address, db):
+            raise HTTPException(status_code=403, detail="SAS não autorizado")
+        
+        now = int(time.time())
+        [(code, state)] = await resolve_heartbeats(db, [request], now)
+        if code == ResponseCode.INVALID_VALUE:
+            raise HTTPException(status_code=404, detail="Grant não encontrado")
+        if code == ResponseCode.TERMINATED_GRANT:
+            raise HTTPException(status_code=400, detail="Grant já foi terminado")
+        if code == ResponseCode.UNSYNC_OP_PARAM:
+            raise HTTPException(status_code=409, detail=HEARTBEAT_FAILURES[code])
+        
+        return FastJSONResponse(apply_heartbeat(request, code, state, now, sas_address))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro no heartbeat: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro interno no heartbeat")
+
+@app.post("/v1.3/heartbeat/batch")
+async def heartbeat_batch(
+    request: HeartbeatBatchRequest,
+    sas_address: str = Header(..., alias="X-SAS-Address"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Heartbeats em lote - respostas por item na ordem da requisição"""
+    mark_validated()
+    check_batch_size(request.heartbeatRequest)
+    try:
+        if not await verify_sas_authorization(sas_address, db):
+            raise HTTPException(status_code=403, detail="SAS não autorizado")
+        
+        now = int(time.time())
+        outcomes = await resolve_heartbeats(db, request.heartbeatRequest, now)
+        responses = [
+            apply_heartbeat(item, code, state, now, sas_address)
+            for item, (code, state) in zip(request.heartbeatRequest, outcomes)
+        ]
+        return FastJSONResponse({"heartbeatResponse": responses})
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro no heartbeat em lote: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro interno no heartbeat em lote")
+
 # --- Interface Administrativa (equivalente ao onlyOwner do contrato) ---
 
 @app.post("/sas/authorize")
-async def authorize_sas(request: SASAuthorizeRequest, db: Session = Depends(get_db)):
+async def authorize_sas(request: SASAuthorizeRequest, db: AsyncSession = Depends(get_db)):
     """Autorizar SAS - Equivalente ao authorizeSAS do contrato"""
+    mark_validated()
     try:
-        existing_auth = db.query(SASAuthorization).filter(
-            SASAuthorization.sas_address == request.sas_address
-        ).first()
-        
-        if existing_auth:
-            existing_auth.is_authorized = True
-        else:
-            auth = SASAuthorization(
-                sas_address=request.sas_address,
-                is_authorized=True
+        async def authorize(session: AsyncSession) -> bool:
+            result = await session.execute(
+                select(SASAuthorization).where(
+                    SASAuthorization.sas_address == request.sas_address
+                )
             )
-            db.add(auth)
-        
-        # Registrar evento
-        event = Event(
-            event_type="SAS_AUTHORIZED",
-            payload=json.dumps({"sas_address": request.sas_address}),
-            transaction_hash=f"0x{uuid.uuid4().hex}",
-            block_number=1
-        )
-        db.add(event)
-        db.commit()
+            existing_auth = result.scalars().first()
+            newly_authorized = not (existing_auth and existing_auth.is_authorized)
+            
+            if existing_auth:
+                existing_auth.is_authorized = True
+            else:
+                auth = SASAuthorization(
+                    sas_address=request.sas_address,
+                    is_authorized=True
+                )
+                session.add(auth)
+            return newly_authorized
+        
+        newly_authorized = await run_write(authorize, db)
+        if newly_authorized:
+            stats_counters.add(SAS_AUTHORIZED, 1)
+        
+        # Registrar evento no ledger
+        await emit_events([("SAS_AUTHORIZED", {"sas_address": request.sas_address})])
+        
+        if auth_cache:
+            await auth_cache.invalidate(request.sas_address, True)
         
         return {"success": True, "message": f"SAS {request.sas_address} autorizado"}
         
     except Exception as e:
         logger.error(f"Erro na autorização SAS: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Erro interno na autorização")
 
 @app.post("/sas/revoke")
-async def revoke_sas(request: SASRevokeRequest, db: Session = Depends(get_db)):
+async def revoke_sas(request: SASRevokeRequest, db: AsyncSession = Depends(get_db)):
     """Revogar SAS - Equivalente ao revokeSAS do contrato"""
+    mark_validated()
     try:
-        auth = db.query(SASAuthorization).filter(
-            SASAuthorization.sas_address == request.sas_address
-        ).first()
-        
-        if auth:
+        async def revoke(session: AsyncSession) -> Optional[bool]:
+            """None se o SAS não existe; senão se estava autorizado"""
+            result = await session.execute(
+                select(SASAuthorization).where(
+                    SASAuthorization.sas_address == request.sas_address
+                )
+            )
+            auth = result.scalars().first()
+            if not auth:
+                return None
+            was_authorized = auth.is_authorized
             auth.is_authorized = False
+            return was_authorized
+        
+        was_authorized = await run_write(revoke, db)
+        if was_authorized is not None:
+            if was_authorized:
+                stats_counters.add(SAS_AUTHORIZED, -1)
             
-            # Registrar evento
-            event = Event(
-                event_type="SAS_REVOKED",
-                payload=json.dumps({"sas_address": request.sas_address}),
-                transaction_hash=f"0x{uuid.uuid4().hex}",
-                block_number=1
-            )
-            db.add(event)
-            db.commit()
+            # Registrar evento no ledger
+            await emit_events([("SAS_REVOKED", {"sas_address": request.sas_address})])
+        
+        if auth_cache:
+            await auth_cache.invalidate(request.sas_address, False)
         
         return {"success": True, "message": f"SAS {request.sas_address} revogado"}
         
     except Exception as e:
         logger.error(f"Erro na revogação SAS: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Erro interno na revogação")
 
 @app.get("/sas/{sas_address}/authorized")
-async def check_sas_authorization(sas_address: str, db: Session = Depends(get_db)):
+async def check_sas_authorization(sas_address: str, db: AsyncSession = Depends(get_db)):
     """Verificar se SAS está autorizado"""
-    auth = db.query(SASAuthorization).filter(
-        SASAuthorization.sas_address == sas_address
-    ).first()
-    return {"sas_address": sas_address, "authorized": auth.is_authorized if auth else False}
+    authorized = await verify_sas_authorization(sas_address, db)
+    return {"sas_address": sas_address, "authorized": authorized}
 
 # --- Endpoints de consulta (equivalente às funções view do contrato) ---
 
 @app.get("/v1.3/cbsd/{fcc_id}/{cbsd_serial_number}")
-async def get_cbsd(fcc_id: str, cbsd_serial_number: str, db: Session = Depends(get_db)):
+async def get_cbsd(fcc_id: str, cbsd_serial_number: str, db: AsyncSession = Depends(get_db)):
     """Obter CBSD - Equivalente ao mapping cbsds do contrato"""
-    cbsd = db.query(CBSD).filter(
-        CBSD.fcc_id == fcc_id,
-        CBSD.cbsd_serial_number == cbsd_serial_number
-    ).first()
+    # Negativas respondidas pelo registro em memória, sem consultar o banco, quando ele é completo
+    if cbsd_registry_authoritative() and not cbsd_registry.contains(fcc_id, cbsd_serial_number):
+        raise HTTPException(status_code=404, detail="CBSD não encontrado")
+    
+    # Colunas em vez da entidade ORM: linha simples, sem identity map
+    result = await db.execute(
+        select(CBSD.__table__).where(
+            CBSD.fcc_id == fcc_id,
+            CBSD.cbsd_serial_number == cbsd_serial_number
+        )
+    )
+    cbsd = result.first()
     
     if not cbsd:
         raise HTTPException(status_code=404, detail="CBSD não encontrado")
     
-    return {
-        "fccId": cbsd.fcc_id,
-        "userId": cbsd.user_id,
-        "cbsdSerialNumber": cbsd.cbsd_serial_number,
-        "callSign": cbsd.call_sign,
-        "cbsdCategory": cbsd.cbsd_category,
-        "airInterface": cbsd.air_interface,
-        "measCapability": json.loads(cbsd.meas_capability),
-        "eirpCapability": cbsd.eirp_capability,
-        "latitude": cbsd.latitude,
-        "longitude": cbsd.longitude,
-        "height": cbsd.height,
-        "heightType": cbsd.height_type,
-        "indoorDeployment": cbsd.indoor_deployment,
-        "antennaGain": cbsd.antenna_gain,
-        "antennaBeamwidth": cbsd.antenna_beamwidth,
-        "antennaAzimuth": cbsd.antenna_azimuth,
-        "groupingParam": cbsd.grouping_param,
-        "cbsdAddress": cbsd.cbsd_address,
-        "sasOrigin": cbsd.sas_origin,
-        "registrationTimestamp": cbsd.registration_timestamp
-    }
+    return FastJSONResponse(cbsd_record(cbsd))
 
 @app.get("/v1.3/grants/{fcc_id}/{cbsd_serial_number}")
-async def get_grants(fcc_id: str, cbsd_serial_number: str, db: Session = Depends(get_db)):
-    """Obter grants de um CBSD - Equivalente ao mapping grants do contrato"""
-    grants = db.query(Grant).filter(
+async def get_grants(
+    fcc_id: str,
+    cbsd_serial_number: str,
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(settings.max_page_size, ge=1, le=settings.max_page_size),
+    cursor: Optional[str] = None
+):
+    """Obter grants de um CBSD - Equivalente ao mapping grants do contrato.
+
+    Limitado a `limit` grants por resposta; `nextCursor` continua a listagem.
+    """
+    # CBSD não registrado não tem grants (o deregistration remove todos)
+    if cbsd_registry_authoritative() and not cbsd_registry.contains(fcc_id, cbsd_serial_number):
+        return FastJSONResponse({"grants": [], "nextCursor": None})
+    
+    query = select(Grant.__table__).where(
         Grant.fcc_id == fcc_id,
         Grant.cbsd_serial_number == cbsd_serial_number
-    ).all()
+    )
+    grants, next_cursor = await fetch_page(db, query, Grant.id, limit, cursor)
     
-    return {
-        "grants": [
-            {
-                "grantId": grant.grant_id,
-                "channelType": grant.channel_type,
-                "grantExpireTime": grant.grant_expire_time,
-                "terminated": grant.terminated,
-                "maxEirp": grant.max_eirp,
-                "lowFrequency": grant.low_frequency,
-                "highFrequency": grant.high_frequency,
-                "requestedMaxEirp": grant.requested_max_eirp,
-                "requestedLowFrequency": grant.requested_low_frequency,
-                "requestedHighFrequency": grant.requested_high_frequency,
-                "sasOrigin": grant.sas_origin,
-                "grantTimestamp": grant.grant_timestamp
-            }
-            for grant in grants
-        ]
+    return FastJSONResponse({"grants": [grant_record(grant) for grant in grants], "nextCursor": next_cursor})
+
+def encode_id_cursor(row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id|{row_id}".encode()).decode()
+
+def decode_id_cursor(cursor: str) -> int:
+    try:
+        prefix, _, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().partition("|")
+        if prefix != "id":
+            raise ValueError(cursor)
+        return int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+async def fetch_page(db: AsyncSession, query, id_column, limit: int, cursor: Optional[str]) -> Tuple[List[Any], Optional[str]]:
+    """Uma página de linhas em ordem de id após o cursor (paginação por chave, sem OFFSET)"""
+    if cursor:
+        query = query.where(id_column > decode_id_cursor(cursor))
+    result = await db.execute(query.order_by(id_column).limit(limit))
+    rows = result.all()
+    next_cursor = encode_id_cursor(rows[-1].id) if len(rows) == limit else None
+    return rows, next_cursor
+
+@app.get("/v1.3/grants")
+async def list_grants(
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(100, ge=1, le=settings.max_page_size),
+    cursor: Optional[str] = None,
+    sasOrigin: Optional[str] = None,
+    state: Optional[str] = None,
+    channelType: Optional[str] = None,
+    fccId: Optional[str] = None,
+    minFrequency: Optional[int] = None,
+    maxFrequency: Optional[int] = None
+):
+    """Lista grants com filtros, em ordem de criação.
+
+    `minFrequency`/`maxFrequency` (Hz) selecionam grants que se sobrepõem à
+    faixa. Os filtros por SAS e por estado usam índices compostos terminados
+    em id, então cada página é uma leitura de intervalo do índice.
+    """
+    query = select(Grant.__table__)
+    if sasOrigin:
+        query = query.where(Grant.sas_origin == sasOrigin)
+    if state:
+        query = query.where(Grant.state == state)
+    if channelType:
+        query = query.where(Grant.channel_type == channelType)
+    if fccId:
+        query = query.where(Grant.fcc_id == fccId)
+    if minFrequency is not None:
+        query = query.where(Grant.high_frequency > minFrequency)
+    if maxFrequency is not None:
+        query = query.where(Grant.low_frequency < maxFrequency)
+    grants, next_cursor = await fetch_page(db, query, Grant.id, limit, cursor)
+    return FastJSONResponse({
+        "grants": [dump_grant_record(grant) for grant in grants],
+        "count": len(grants),
+        "nextCursor": next_cursor
+    })
+
+@app.get("/v1.3/cbsds")
+async def list_cbsds(
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(100, ge=1, le=settings.max_page_size),
+    cursor: Optional[str] = None,
+    sasOrigin: Optional[str] = None,
+    cbsdCategory: Optional[str] = None,
+    minLatitude: Optional[int] = None,
+    maxLatitude: Optional[int] = None,
+    minLongitude: Optional[int] = None,
+    maxLongitude: Optional[int] = None
+):
+    """Lista CBSDs com filtros por SAS de origem, categoria e região, em ordem de registro.
+
+    A região é um retângulo em coordenadas inteiras (graus × coordinate_scale),
+    com limites inclusivos; para consultas por raio use /v1.3/cbsds/nearby.
+    """
+    query = select(CBSD.__table__)
+    if sasOrigin:
+        query = query.where(CBSD.sas_origin == sasOrigin)
+    if cbsdCategory:
+        query = query.where(CBSD.cbsd_category == cbsdCategory)
+    if minLatitude is not None:
+        query = query.where(CBSD.latitude >= minLatitude)
+    if maxLatitude is not None:
+        query = query.where(CBSD.latitude <= maxLatitude)
+    if minLongitude is not None:
+        query = query.where(CBSD.longitude >= minLongitude)
+    if maxLongitude is not None:
+        query = query.where(CBSD.longitude <= maxLongitude)
+    cbsds, next_cursor = await fetch_page(db, query, CBSD.id, limit, cursor)
+    return FastJSONResponse({
+        "cbsds": [cbsd_record(cbsd) for cbsd in cbsds],
+        "count": len(cbsds),
+        "nextCursor": next_cursor
+    })
+
+@app.get("/v1.3/dump")
+async def full_activity_dump(
+    cursor: Optional[str] = None,
+    format: str = Query("ndjson", pattern="^(ndjson|json)$"),
+    snapshot: bool = False
+):
+    """Full activity dump (CBSDs e grants) em streaming.
+
+    `cursor` retoma um download interrompido a partir do cursor do último
+    registro recebido (só registros com id maior: alterações e remoções de
+    registros já entregues não aparecem). Com `snapshot=true` o dump
+    pré-calculado (manage.py dump) é servido do arquivo.
+    """
+    if snapshot:
+        path = settings.dump_snapshot_file
+        if not path or not os.path.exists(path):
+            raise HTTPException(status_code=404, detail="Snapshot do dump não disponível")
+        return FileResponse(path, media_type="application/x-ndjson")
+    try:
+        parse_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if format == "json":
+        return StreamingResponse(
+            iter_json(AsyncSessionLocal, cursor, settings.dump_chunk_size),
+            media_type="application/json"
+        )
+    return StreamingResponse(
+        iter_ndjson(AsyncSessionLocal, cursor, settings.dump_chunk_size),
+        media_type="application/x-ndjson"
+    )
+
+# --- Consultas geográficas (índice espacial em memória) ---
+
+def serialize_nearby(cbsd, distance_km: Optional[float] = None) -> Dict[str, Any]:
+    item = {
+        "fccId": cbsd.fcc_id,
+        "cbsdSerialNumber": cbsd.cbsd_serial_number,
+        "latitude": cbsd.latitude,
+        "longitude": cbsd.longitude
     }
+    if distance_km is not None:
+        item["distanceKm"] = round(distance_km, 6)
+    return item
+
+async def geo_region(db: AsyncSession, regions: List[Region]) -> GeoIndex:
+    """Índice a consultar: o em memória ou, se ele pode estar incompleto, o trecho lido do banco"""
+    if local_state_complete(geo_index):
+        return geo_index
+    return await geo_index.load_region(db, regions)
+
+@app.get("/v1.3/cbsds/nearby")
+async def get_nearby_cbsds(
+    latitude: int,
+    longitude: int,
+    radiusKm: float = Query(..., gt=0),
+    limit: int = Query(100, ge=1, le=settings.max_geo_results),
+    db: AsyncSession = Depends(get_db)
+):
+    """CBSDs a até radiusKm de um ponto, ordenados pela distância"""
+    region = await geo_region(db, geo_index.radius_bounds(latitude, longitude, radiusKm))
+    found = region.within_radius(latitude, longitude, radiusKm, limit=limit)
+    return FastJSONResponse({"cbsds": [serialize_nearby(cbsd, distance) for cbsd, distance in found], "count": len(found)})
+
+@app.get("/v1.3/cbsds/bbox")
+async def get_cbsds_in_bbox(
+    minLatitude: int,
+    minLongitude: int,
+    maxLatitude: int,
+    maxLongitude: int,
+    limit: int = Query(100, ge=1, le=settings.max_geo_results),
+    db: AsyncSession = Depends(get_db)
+):
+    """CBSDs dentro de um retângulo de coordenadas"""
+    if minLatitude > maxLatitude or minLongitude > maxLongitude:
+        raise HTTPException(status_code=400, detail="Limites do retângulo inválidos")
+    region = await geo_region(db, [(minLatitude, minLongitude, maxLatitude, maxLongitude)])
+    found = region.within_bbox(minLatitude, minLongitude, maxLatitude, maxLongitude, limit=limit)
+    return FastJSONResponse({"cbsds": [serialize_nearby(cbsd) for cbsd in found], "count": len(found)})
+
+@app.get("/v1.3/cbsd/{fcc_id}/{cbsd_serial_number}/neighbors")
+async def get_cbsd_neighbors(
+    fcc_id: str,
+    cbsd_serial_number: str,
+    radiusKm: float = Query(..., gt=0),
+    limit: int = Query(100, ge=1, le=settings.max_geo_results),
+    db: AsyncSession = Depends(get_db)
+):
+    """CBSDs vizinhos a até radiusKm de um CBSD registrado (exclui o próprio)"""
+    cbsd = geo_index.get(fcc_id)
+    if cbsd is None and not local_state_complete(geo_index):
+        cbsd = await find_cbsd(db, fcc_id, cbsd_serial_number)
+    if cbsd is None or cbsd.cbsd_serial_number != cbsd_serial_number:
+        raise HTTPException(status_code=404, detail="CBSD não encontrado")
+    region = await geo_region(db, geo_index.radius_bounds(cbsd.latitude, cbsd.longitude, radiusKm))
+    found = region.within_radius(cbsd.latitude, cbsd.longitude, radiusKm, limit=limit + 1)
+    neighbors = [(other, distance) for other, distance in found if other.fcc_id != fcc_id][:limit]
+    return FastJSONResponse({"cbsds": [serialize_nearby(other, distance) for other, distance in neighbors], "count": len(neighbors)})
 
 # --- Monitoramento ---
 
+@app.get("/metrics")
+async def metrics():
+    """Métricas no formato Prometheus"""
+    if not settings.enable_metrics:
+        raise HTTPException(status_code=404, detail="Métricas desabilitadas")
+    content, content_type = render_metrics()
+    return Response(content=content, headers={"Content-Type": content_type})
+
 @app.get("/stats")
-async def get_stats(db: Session = Depends(get_db)):
-    """Estatísticas do sistema - Equivalente aos contadores do contrato"""
-    cbsd_count = db.query(CBSD).count()
-    grant_count = db.query(Grant).count()
-    event_count = db.query(Event).count()
-    auth_count = db.query(SASAuthorization).filter(SASAuthorization.is_authorized == True).count()
+async def get_stats():
+    """Estatísticas do sistema - Equivalente aos contadores do contrato.
+
+    Lidas dos contadores mantidos em memória (stats_counters), sem varrer as
+    tabelas; podem atrasar até STATS_FLUSH_INTERVAL em relação a outros workers.
+    """
+    counters = stats_counters.snapshot()
+    totals = counters["totals"]
     
     return {
-        "totalCbsds": cbsd_count,
-        "totalGrants": grant_count,
-        "totalEvents": event_count,
-        "authorizedSAS": auth_count,
+        "totalCbsds": totals[CBSDS],
+        "totalGrants": totals[GRANTS_ACTIVE] + totals[GRANTS_TERMINATED],
+        "activeGrants": totals[GRANTS_ACTIVE],
+        "terminatedGrants": totals[GRANTS_TERMINATED],
+        "totalEvents": totals[EVENTS],
+        "pendingEvents": event_ledger.pending,
+        "authorizedSAS": totals[SAS_AUTHORIZED],
+        "perSas": {
+            sas_address: {
+                "cbsds": values.get(CBSDS, 0),
+                "activeGrants": values.get(GRANTS_ACTIVE, 0),
+                "terminatedGrants": values.get(GRANTS_TERMINATED, 0)
+            }
+            for sas_address, values in counters["perSas"].items()
+        },
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
-@app.get("/events/recent")
-async def get_recent_events(db: Session = Depends(get_db), limit: int = 10):
-    """Eventos recentes - Equivalente aos eventos do contrato"""
-    events = db.query(Event).order_by(Event.created_at.desc()).limit(limit).all()
+def serialize_event(event: Event) -> Dict[str, Any]:
     return {
-        "events": [
-            {
-                "id": event.id,
-                "type": event.event_type,
-                "payload": json.loads(event.payload),
-                "transaction_hash": event.transaction_hash,
-                "block_number": event.block_number,
-                "created_at": event.created_at.isoformat()
-            }
-            for event in events
-        ],
+        "id": event.id,
+        "type": event.event_type,
+        "payload": json.loads(event.payload),
+        "transaction_hash": event.transaction_hash,
+        "block_number": event.block_number,
+        "created_at": event.created_at.isoformat()
+    }
+
+def encode_event_cursor(event: Event) -> str:
+    return base64.urlsafe_b64encode(f"{event.created_at.isoformat()}|{event.id}".encode()).decode()
+
+def decode_event_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, _, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().partition("|")
+        return datetime.fromisoformat(created_at), int(event_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def as_utc(value: datetime) -> datetime:
+    """Datas sem fuso são tratadas como UTC (como created_at)"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+@app.get("/events/recent")
+async def get_recent_events(
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(10, ge=1, le=1000),
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None
+):
+    """Eventos recentes - Equivalente aos eventos do contrato.
+
+    Ordenados do mais novo para o mais antigo por (created_at, id), usando os
+    índices de created_at e (event_type, created_at). `cursor` recebe o
+    nextCursor da página anterior (paginação por chave, sem OFFSET).
+    """
+    query = select(Event)
+    if event_type:
+        query = query.where(Event.event_type == event_type)
+    if since:
+        query = query.where(Event.created_at >= as_utc(since))
+    if until:
+        query = query.where(Event.created_at < as_utc(until))
+    if cursor:
+        created_at, event_id = decode_event_cursor(cursor)
+        query = query.where(or_(
+            Event.created_at < created_at,
+            and_(Event.created_at == created_at, Event.id < event_id)
+        ))
+    result = await db.execute(
+        query.order_by(Event.created_at.desc(), Event.id.desc()).limit(limit)
+    )
+    events = result.scalars().all()
+    return FastJSONResponse({
+        "events": [serialize_event(event) for event in events],
+        "count": len(events),
+        "nextCursor": encode_event_cursor(events[-1]) if len(events) == limit else None
+    })
+
+@app.get("/events/block/{block_number}")
+async def get_block_events(block_number: int, db: AsyncSession = Depends(get_db)):
+    """Eventos de um bloco do ledger, na ordem do encadeamento"""
+    block = await db.get(LedgerBlock, block_number)
+    result = await db.execute(
+        select(Event).where(Event.block_number == block_number).order_by(Event.id)
+    )
+    events = result.scalars().all()
+    if block is None and not events:
+        raise HTTPException(status_code=404, detail="Bloco não encontrado")
+    return FastJSONResponse({
+        "blockNumber": block_number,
+        "blockHash": block.block_hash if block else None,
+        "previousHash": block.previous_hash if block else None,
+        # Blocos arquivados continuam em ledger_blocks, mas seus eventos estão nos arquivos
+        "archived": block is not None and not events,
+        "events": [serialize_event(event) for event in events],
         "count": len(events)
-    } 
\ No newline at end of file
+    })
+
+@app.get("/events/verify")
+async def verify_event_ledger(db: AsyncSession = Depends(get_db)):
+    """Recalcula a cadeia de hashes do ledger de eventos"""
+    result = await event_ledger.verify(db)
+    result["pendingEvents"] = event_ledger.pending
+    return result
\ No newline at end of file
@@ -14,10 +14,37 @@ class Settings(BaseSettings):
     
     # Banco de dados
     database_url: str = "sqlite:///./sas_service.db"
+    db_max_connections: int = 100  # Conexões ao PostgreSQL somando todos os workers
+    db_pool_size: int = 0  # Conexões persistentes por worker (0 = db_max_connections / workers - db_max_overflow)
+    db_max_overflow: int = 0  # Conexões extras temporárias por worker acima do pool
+    db_pool_timeout: float = 30  # Espera máxima (s) por uma conexão livre do pool
+    db_pool_recycle: int = 1800  # Reabre conexões mais antigas que isso (s, -1 = nunca)
+    db_pool_pre_ping: bool = True  # Testa a conexão no checkout (descarta conexões derrubadas pelo servidor)
+    db_statement_cache_size: int = 500  # Prepared statements em cache por conexão asyncpg (0 = desabilitado, ex: pgbouncer)
+    db_query_cache_size: int = 1000  # SQL compilado em cache pelo SQLAlchemy (por engine)
+    sqlite_pool_size: int = 8  # Conexões SQLite reaproveitadas por processo
+    sqlite_journal_mode: str = "WAL"  # WAL: leituras não bloqueiam a escrita
+    sqlite_synchronous: str = "NORMAL"  # NORMAL é seguro com WAL (pode perder só as últimas transações numa queda de energia)
+    sqlite_busy_timeout: int = 5000  # Espera (ms) pelo lock de escrita antes de "database is locked"
+    sqlite_cache_size: int = -65536  # Cache de páginas por conexão (negativo = KiB)
+    sqlite_mmap_size: int = 268435456  # Leitura do arquivo via mmap (bytes, 0 = desabilitado)
     
     # Cache
     redis_url: Optional[str] = "redis://localhost:6379"
     cache_ttl: int = 300
+    auth_cache_size: int = 10000  # Entradas na LRU local de autorização SAS (por worker)
+    cbsd_cache_size: int = 100000  # CBSDs com localização em memória (as chaves de todos os CBSDs ficam sempre em memória)
+    
+    # Espectro
+    coordinate_scale: int = 1000000  # latitude/longitude armazenadas como graus × coordinate_scale
+    spectrum_cell_degrees: float = 0.5  # Tamanho da célula geográfica do índice de espectro
+    protected_channel_types: str = "PAL"  # Tipos de canal que não admitem sobreposição (separados por vírgula)
+    geo_cell_degrees: float = 0.1  # Tamanho da célula do índice geográfico de CBSDs
+    max_geo_results: int = 1000  # Máximo de CBSDs por consulta geográfica
+    
+    # Cluster
+    cluster_mode: bool = False  # Várias instâncias num mesmo PostgreSQL: conflitos de espectro verificados no banco sob advisory locks
+    spectrum_lock_band_hz: int = 10000000  # Largura das faixas de frequência travadas em cluster_mode (Hz)
     
     # Logging
     log_level: str = "INFO"
@@ -26,6 +53,29 @@ class Settings(BaseSettings):
     # Performance
     enable_cache: bool = True
     enable_metrics: bool = True
+    enable_server_timing: bool = True  # Cabeçalho Server-Timing com o tempo de cada fase da requisição
+    trace_sample_rate: float = 0.0  # Fração das requisições gravadas no log de traces (0 = desabilitado, 1 = todas)
+    trace_log_file: str = "logs/traces.jsonl"  # Log de traces: uma linha JSON por requisição, com requestId e fases (ms)
+    max_batch_size: int = 1000  # Itens por requisição nos endpoints /batch
+    max_page_size: int = 1000  # Máximo de itens por página nas listagens (/v1.3/grants, /v1.3/cbsds)
+    expiry_batch_size: int = 500  # Grants expirados por transação
+    expiry_check_interval: float = 1.0  # Intervalo máximo (s) entre verificações de expiração
+    heartbeat_interval: int = 60  # heartbeatInterval informado ao CBSD (s)
+    transmit_expire_seconds: int = 240  # Validade do transmitExpireTime a partir do heartbeat (s)
+    heartbeat_flush_interval: float = 1.0  # Intervalo entre gravações agrupadas de heartbeat (s)
+    write_queue_enabled: bool = False  # Escritor único com commit em grupo para as alterações (recomendado com SQLite)
+    write_queue_max_batch: int = 128  # Máximo de operações por commit em grupo
+    write_queue_max_delay: float = 0.001  # Espera (s) por mais operações antes de fechar o grupo
+    ledger_block_size: int = 256  # Máximo de eventos por bloco do ledger
+    ledger_block_interval: float = 0.2  # Tempo máximo (s) de espera antes de fechar um bloco
+    ledger_sync_writes: bool = True  # Responder só depois que o bloco com os eventos for gravado (False: eventos em memória se perdem numa queda)
+    stats_flush_interval: float = 1.0  # Intervalo entre gravações agrupadas dos contadores do /stats (s)
+    stats_reconcile_interval: float = 3600  # Recontagem completa dos contadores (s, 0 = só na inicialização)
+    event_retention_days: int = 0  # Eventos mais antigos saem da tabela para arquivos comprimidos (0 = desabilitado)
+    event_archive_dir: str = "archive/events"  # Diretório dos arquivos de eventos
+    event_archive_interval: float = 3600  # Intervalo entre execuções do arquivamento (s)
+    dump_chunk_size: int = 1000  # Linhas lidas por lote do cursor no /v1.3/dump
+    dump_snapshot_file: str = ""  # Snapshot NDJSON do dump gerado por "manage.py dump" (vazio = desabilitado)
     
     class Config:
         env_file = ".env"
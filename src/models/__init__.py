@@ -1,10 +1,13 @@
-from .database import Base, engine, SessionLocal
+from .database import Base, engine, SessionLocal, async_engine, AsyncSessionLocal
 from .cbsd import CBSD
 from .grant import Grant
 from .sas_auth import SASAuthorization
 from .event import Event
+from .event_archive import EventArchive
+from .ledger import LedgerBlock
+from .stats import StatsCounter
 
 __all__ = [
-    "Base", "engine", "SessionLocal",
-    "CBSD", "Grant", "SASAuthorization", "Event"
+    "Base", "engine", "SessionLocal", "async_engine", "AsyncSessionLocal",
+    "CBSD", "Grant", "SASAuthorization", "Event", "EventArchive", "LedgerBlock", "StatsCounter"
 ] 
\ No newline at end of file
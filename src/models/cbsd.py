@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import Column, BigInteger, Integer, String, Boolean, DateTime, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -7,6 +7,12 @@ class CBSD(Base):
     """Modelo para CBSD (Citizen Broadband Radio Service Device) - Alinhado com contrato Solidity"""
     
     __tablename__ = "cbsds"
+    __table_args__ = (
+        # Listagem /v1.3/cbsds: filtro por igualdade seguido da ordem de paginação (id)
+        Index("ix_cbsds_sas_origin_id", "sas_origin", "id"),
+        Index("ix_cbsds_cbsd_category_id", "cbsd_category", "id"),
+        Index("ix_cbsds_latitude_longitude", "latitude", "longitude"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     fcc_id = Column(String(50), unique=True, index=True, nullable=False)
@@ -30,7 +36,7 @@ class CBSD(Base):
     
     # Campos adicionais alinhados com contrato Solidity
     sas_origin = Column(String(42), nullable=False)  # Ethereum address do SAS que registrou
-    registration_timestamp = Column(Integer, nullable=False)  # Unix timestamp
+    registration_timestamp = Column(BigInteger, nullable=False)  # Unix timestamp
     
     # Relacionamento com grants
     grants = relationship("Grant", back_populates="cbsd", cascade="all, delete-orphan")
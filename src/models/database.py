@@ -1,26 +1,128 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from src.config.settings import settings
 
-# Criar engine do banco de dados
+# Drivers assíncronos usados por backend quando a URL não informa um explicitamente
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+def get_async_database_url(database_url: str) -> str:
+    """Converte a URL síncrona (ex: sqlite:///...) para o driver assíncrono equivalente"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS and url.get_driver_name() != ASYNC_DRIVERS[backend]:
+        url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    return url.render_as_string(hide_password=False)
+
+def is_memory_database(url) -> bool:
+    """SQLite em memória (cada conexão é um banco separado)"""
+    return url.database in (None, "", ":memory:") or "mode=memory" in str(url)
+
+def get_pool_options(database_url: str, is_async: bool) -> dict:
+    """Parâmetros de pool e de conexão da engine conforme o backend.
+
+    SQLite: pool pequeno por processo (a escrita é serializada pelo próprio
+    SQLite) e PRAGMAs aplicados a cada conexão nova em configure_sqlite.
+    PostgreSQL: pool por worker dimensionado para que a soma dos workers caiba
+    em db_max_connections, pre-ping, reciclagem e cache de prepared statements.
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        if is_memory_database(url):
+            # Cada conexão seria um banco diferente; manter o comportamento padrão
+            return {}
+        options = {
+            "pool_size": settings.sqlite_pool_size,
+            "max_overflow": 0,
+            "pool_timeout": settings.db_pool_timeout,
+        }
+        if is_async:
+            # aiosqlite usa NullPool por padrão (reabre o arquivo e os PRAGMAs a cada sessão)
+            options["poolclass"] = AsyncAdaptedQueuePool
+        return options
+
+    options = {
+        "pool_size": get_worker_pool_size(),
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "query_cache_size": settings.db_query_cache_size,
+    }
+    if is_async and make_url(get_async_database_url(database_url)).get_driver_name() == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": settings.db_statement_cache_size}
+    return options
+
+def get_worker_pool_size() -> int:
+    """Conexões persistentes por worker (db_pool_size ou db_max_connections dividido entre os workers)"""
+    if settings.db_pool_size > 0:
+        return settings.db_pool_size
+    per_worker = settings.db_max_connections // max(settings.workers, 1) - settings.db_max_overflow
+    return max(per_worker, 1)
+
+def configure_sqlite(sync_engine, database_url: str):
+    """Aplica os PRAGMAs de desempenho a cada conexão SQLite aberta pela engine"""
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite":
+        return
+    pragmas = [
+        f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout)}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA cache_size={int(settings.sqlite_cache_size)}",
+        f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if not is_memory_database(url):
+        # journal_mode é persistido no arquivo, mas repetir é barato e garante o modo
+        pragmas.insert(0, f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+# Criar engine do banco de dados (síncrona: usada por manage.py e scripts)
 engine = create_engine(
     settings.database_url,
     echo=settings.debug,
-    pool_size=settings.max_connections,
-    max_overflow=0
+    **get_pool_options(settings.database_url, is_async=False)
 )
+configure_sqlite(engine, settings.database_url)
+
+# Criar engine assíncrona (usada pelos handlers da API)
+async_engine = create_async_engine(
+    get_async_database_url(settings.database_url),
+    echo=settings.debug,
+    **get_pool_options(settings.database_url, is_async=True)
+)
+configure_sqlite(async_engine.sync_engine, settings.database_url)
 
 # Criar sessão
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Criar sessão assíncrona (expire_on_commit=False evita lazy loads após o commit)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Base para modelos
 Base = declarative_base()
 
-def get_db():
-    """Dependency para obter sessão do banco"""
-    db = SessionLocal()
-    try:
+async def get_db():
+    """Dependency para obter sessão assíncrona do banco"""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -6,15 +6,19 @@ class Event(Base):
     """Modelo para eventos do sistema"""
     
     __tablename__ = "events"
+    __table_args__ = (
+        # /events/recent filtrado por tipo e janela de tempo
+        Index("ix_events_event_type_created_at", "event_type", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     event_type = Column(String(50), nullable=False)  # registration, grant, heartbeat, etc.
     payload = Column(Text, nullable=False)  # JSON payload
     transaction_hash = Column(String(66), nullable=True)  # Para compatibilidade com blockchain
-    block_number = Column(Integer, nullable=True)  # Para compatibilidade com blockchain
+    block_number = Column(Integer, nullable=True, index=True)  # Para compatibilidade com blockchain
     
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     def __repr__(self):
         return f"<Event(type='{self.event_type}', created_at='{self.created_at}')>" 
\ No newline at end of file
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from .database import Base
+
+class EventArchive(Base):
+    """Modelo para arquivos de eventos retirados da tabela events (retenção)"""
+    
+    __tablename__ = "event_archives"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # Intervalo de blocos arquivado; único para que dois workers não arquivem o mesmo trecho
+    first_block = Column(Integer, unique=True, nullable=False)
+    last_block = Column(Integer, nullable=False)
+    event_count = Column(Integer, nullable=False)
+    path = Column(String(500), nullable=False)  # Arquivo NDJSON comprimido (gzip)
+    
+    # Timestamps
+    oldest_event_at = Column(DateTime(timezone=True), nullable=True)
+    newest_event_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<EventArchive(blocks={self.first_block}-{self.last_block}, events={self.event_count})>"
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Text, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -7,6 +7,14 @@ class Grant(Base):
     """Modelo para Grants de espectro - Alinhado com contrato Solidity"""
     
     __tablename__ = "grants"
+    __table_args__ = (
+        # Grants de um CBSD (get_grants, deregistration)
+        Index("ix_grants_fcc_id_cbsd_serial_number", "fcc_id", "cbsd_serial_number"),
+        # Listagem /v1.3/grants: filtro por igualdade seguido da ordem de paginação (id)
+        Index("ix_grants_sas_origin_id", "sas_origin", "id"),
+        Index("ix_grants_state_id", "state", "id"),
+        Index("ix_grants_channel_type_low_frequency", "channel_type", "low_frequency"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     grant_id = Column(String(100), unique=True, index=True, nullable=False)
@@ -14,18 +22,19 @@ class Grant(Base):
     cbsd_serial_number = Column(String(100), nullable=False)
     channel_type = Column(String(10), nullable=False)  # GAA, PAL
     max_eirp = Column(Integer, nullable=False)
-    low_frequency = Column(Integer, nullable=False)
-    high_frequency = Column(Integer, nullable=False)
+    # Hz e Unix timestamps: 3550000000 não cabe em INTEGER (int4) no PostgreSQL
+    low_frequency = Column(BigInteger, nullable=False)
+    high_frequency = Column(BigInteger, nullable=False)
     requested_max_eirp = Column(Integer, nullable=False)
-    requested_low_frequency = Column(Integer, nullable=False)
-    requested_high_frequency = Column(Integer, nullable=False)
-    grant_expire_time = Column(Integer, nullable=False)
-    transmit_expire_time = Column(Integer, nullable=True)
-    state = Column(String(20), default="GRANTED")  # GRANTED, AUTHORIZED, TERMINATED
+    requested_low_frequency = Column(BigInteger, nullable=False)
+    requested_high_frequency = Column(BigInteger, nullable=False)
+    grant_expire_time = Column(BigInteger, nullable=False)
+    transmit_expire_time = Column(BigInteger, nullable=True)
+    state = Column(String(20), default="GRANTED")  # GRANTED, AUTHORIZED, TERMINATED, EXPIRED
     
     # Campos adicionais alinhados com contrato Solidity
     sas_origin = Column(String(42), nullable=False)  # Ethereum address do SAS que criou o grant
-    grant_timestamp = Column(Integer, nullable=False)  # Unix timestamp
+    grant_timestamp = Column(BigInteger, nullable=False)  # Unix timestamp
     terminated = Column(Boolean, default=False)  # Se o grant foi terminado
     
     # Relacionamento
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from .database import Base
+
+class LedgerBlock(Base):
+    """Modelo para blocos do ledger de eventos (cadeia de hashes)"""
+    
+    __tablename__ = "ledger_blocks"
+    
+    # Chave primária garante números de bloco únicos mesmo com vários workers gravando
+    block_number = Column(Integer, primary_key=True, autoincrement=False)
+    block_hash = Column(String(66), nullable=False)  # Hash do último evento do bloco
+    previous_hash = Column(String(66), nullable=False)  # block_hash do bloco anterior
+    event_count = Column(Integer, nullable=False)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<LedgerBlock(number={self.block_number}, hash='{self.block_hash}')>"
\ No newline at end of file
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, BigInteger, String, DateTime
+from sqlalchemy.sql import func
+from .database import Base
+
+class StatsCounter(Base):
+    """Modelo para contadores mantidos do /stats (evita COUNT(*) a cada chamada)"""
+    
+    __tablename__ = "stats_counters"
+    
+    # Ex: "cbsds", "grants_active", "cbsds:<sas_address>"
+    name = Column(String(100), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    
+    # Timestamps
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<StatsCounter(name='{self.name}', value={self.value})>"
\ No newline at end of file
@@ -0,0 +1,33 @@
+from .metrics import MetricsMiddleware, instrument_engine, render_metrics
+from .tracing import RequestTrace, TracingMiddleware, create_trace_logger, mark_validated, trace_phase
+from .pubsub import FakeRedis, ChannelSubscriber, ReplicatedState, create_redis_client, connect_redis
+from .auth_cache import SASAuthorizationCache, LocalLRUCache, create_auth_cache
+from .spectrum_index import IntervalTree, SpectrumIndex, create_spectrum_index
+from .spectrum_locks import Allocation, SpectrumLocks, create_spectrum_locks
+from .geo_index import GeoIndex, create_geo_index
+from .cbsd_registry import CBSDRegistry, RegisteredCBSD, create_cbsd_registry, generate_cbsd_key
+from .expiry import ExpiryScheduler, create_expiry_scheduler
+from .heartbeat import HeartbeatState, HeartbeatStore, create_heartbeat_store
+from .ledger import EventLedger, create_event_ledger
+from .write_queue import WriteQueue, create_write_queue
+from .dump import iter_dump, write_snapshot
+from .stats import StatsCounters, create_stats_counters
+from .event_archive import EventArchiver, create_event_archiver
+
+__all__ = [
+    "MetricsMiddleware", "instrument_engine", "render_metrics",
+    "RequestTrace", "TracingMiddleware", "create_trace_logger", "mark_validated", "trace_phase",
+    "FakeRedis", "ChannelSubscriber", "ReplicatedState", "create_redis_client", "connect_redis",
+    "SASAuthorizationCache", "LocalLRUCache", "create_auth_cache",
+    "IntervalTree", "SpectrumIndex", "create_spectrum_index",
+    "Allocation", "SpectrumLocks", "create_spectrum_locks",
+    "GeoIndex", "create_geo_index",
+    "CBSDRegistry", "RegisteredCBSD", "create_cbsd_registry", "generate_cbsd_key",
+    "ExpiryScheduler", "create_expiry_scheduler",
+    "HeartbeatState", "HeartbeatStore", "create_heartbeat_store",
+    "EventLedger", "create_event_ledger",
+    "WriteQueue", "create_write_queue",
+    "iter_dump", "write_snapshot",
+    "StatsCounters", "create_stats_counters",
+    "EventArchiver", "create_event_archiver"
+]
@@ -0,0 +1,158 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from src.config.settings import Settings
+from src.services.metrics import CACHE_LOOKUPS
+from src.services.pubsub import ChannelSubscriber
+
+logger = logging.getLogger(__name__)
+
+# Canal pub/sub usado para propagar authorize/revoke entre workers
+INVALIDATION_CHANNEL = "sas:auth:invalidate"
+KEY_PREFIX = "sas:auth:"
+
+LOCAL_HITS = CACHE_LOOKUPS.labels("sas_auth", "local_hit")
+REDIS_HITS = CACHE_LOOKUPS.labels("sas_auth", "redis_hit")
+MISSES = CACHE_LOOKUPS.labels("sas_auth", "miss")
+
+
+class LocalLRUCache:
+    """Cache LRU em memória (por worker) com TTL por entrada"""
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bool]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bool):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SASAuthorizationCache:
+    """Cache de dois níveis para autorização de SAS: LRU local + Redis compartilhado.
+
+    authorize/revoke gravam o novo valor no Redis e publicam no canal de
+    invalidação; cada worker atualiza sua LRU local ao receber a mensagem.
+    Sem Redis disponível o cache opera apenas localmente (a propagação entre
+    workers passa a depender do TTL).
+
+    `version` aumenta a cada invalidação (local ou recebida): um valor lido
+    antes dela (do Redis ou do banco) é descartado em vez de sobrescrever a
+    LRU com o estado anterior à mudança.
+    """
+
+    def __init__(self, ttl: int = 300, max_size: int = 10000):
+        self.local = LocalLRUCache(max_size=max_size, ttl=ttl)
+        self.redis = None
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.version = 0
+        self._subscriber: Optional[ChannelSubscriber] = None
+
+    async def start(self, redis=None):
+        """Associa o Redis compartilhado (None = apenas local) e assina o canal de invalidação"""
+        self.redis = redis
+        if redis is None:
+            return
+        self._subscriber = ChannelSubscriber(redis, INVALIDATION_CHANNEL, self._on_invalidation, self._on_reset)
+        self._subscriber.start()
+
+    async def stop(self):
+        if self._subscriber:
+            await self._subscriber.stop()
+            self._subscriber = None
+
+    async def get(self, sas_address: str) -> Optional[bool]:
+        """Retorna o status de autorização em cache ou None se ausente"""
+        value = self.local.get(sas_address)
+        if value is not None:
+            self.hits += 1
+            LOCAL_HITS.inc()
+            return value
+        if self.redis is not None:
+            version = self.version
+            try:
+                raw = await self.redis.get(KEY_PREFIX + sas_address)
+            except Exception as e:
+                logger.warning(f"Falha ao consultar Redis: {e}")
+                raw = None
+            if raw is not None:
+                value = raw == "1"
+                if version == self.version:
+                    self.local.set(sas_address, value)
+                self.hits += 1
+                REDIS_HITS.inc()
+                return value
+        self.misses += 1
+        MISSES.inc()
+        return None
+
+    async def set(self, sas_address: str, authorized: bool, version: Optional[int] = None):
+        """Armazena o valor lido do banco (não sobrescreve uma invalidação mais recente no Redis).
+
+        `version` é o valor de self.version antes da leitura: se houve uma
+        invalidação desde então, o valor lido pode estar velho e é descartado.
+        """
+        if version is not None and version != self.version:
+            return
+        self.local.set(sas_address, authorized)
+        if self.redis is not None:
+            try:
+                await self.redis.set(KEY_PREFIX + sas_address, "1" if authorized else "0", ex=self.ttl, nx=True)
+            except Exception as e:
+                logger.warning(f"Falha ao gravar no Redis: {e}")
+
+    async def invalidate(self, sas_address: str, authorized: bool):
+        """Propaga uma mudança de autorização (authorize/revoke) para todos os workers"""
+        self.version += 1
+        if self.redis is not None:
+            value = "1" if authorized else "0"
+            try:
+                await self.redis.set(KEY_PREFIX + sas_address, value, ex=self.ttl)
+                await self.redis.publish(INVALIDATION_CHANNEL, f"{value}:{sas_address}")
+            except Exception as e:
+                logger.warning(f"Falha ao propagar invalidação de {sas_address}: {e}")
+        # Só depois do Redis: uma leitura concorrente do valor antigo no Redis não sobrescreve este
+        self.local.set(sas_address, authorized)
+
+    def _on_invalidation(self, data: str):
+        value, _, sas_address = data.partition(":")
+        self.version += 1
+        self.local.set(sas_address, value == "1")
+
+    async def _on_reset(self):
+        # Invalidações podem ter sido perdidas durante a falha: descartar a LRU local
+        self.local.clear()
+
+
+def create_auth_cache(settings: Settings) -> Optional[SASAuthorizationCache]:
+    """Cria o cache de autorização conforme as configurações (None se desabilitado)"""
+    if not settings.enable_cache:
+        return None
+    return SASAuthorizationCache(ttl=settings.cache_ttl, max_size=settings.auth_cache_size)
@@ -0,0 +1,131 @@
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import Settings
+from src.models.cbsd import CBSD
+from src.services.metrics import CACHE_LOOKUPS
+from src.services.pubsub import ReplicatedState
+
+logger = logging.getLogger(__name__)
+
+HITS = CACHE_LOOKUPS.labels("cbsd", "hit")
+NEGATIVE_HITS = CACHE_LOOKUPS.labels("cbsd", "negative_hit")
+MISSES = CACHE_LOOKUPS.labels("cbsd", "miss")
+
+
+# (fccId, cbsdSerialNumber): uma string concatenada colidiria (ex: "A_B"+"C" e "A"+"B_C")
+CBSDKey = Tuple[str, str]
+
+
+def generate_cbsd_key(fcc_id: str, cbsd_serial_number: str) -> CBSDKey:
+    """Gera chave única para CBSD (equivalente ao keccak256 do Solidity)"""
+    return fcc_id, cbsd_serial_number
+
+
+@dataclass
+class RegisteredCBSD:
+    fcc_id: str
+    cbsd_serial_number: str
+    latitude: int
+    longitude: int
+    sas_origin: str
+
+
+class CBSDRegistry(ReplicatedState):
+    """Registro em memória dos CBSDs registrados, pela chave (fccId, cbsdSerialNumber).
+
+    O conjunto de chaves contém todos os CBSDs e responde às verificações de
+    existência, inclusive as negativas, sem consultar o banco quando o registro
+    é completo (processo único ou replicação ativa). Os campos usados
+    pelos handlers ficam em uma LRU limitada a max_records; um miss na LRU
+    (CBSD existente mas não carregado) ainda consulta o banco. Até o primeiro
+    load completo `ready` é falso e os handlers devem consultar o banco.
+    """
+
+    channel = "sas:cbsd"
+
+    def __init__(self, max_records: int = 100000):
+        super().__init__()
+        self.max_records = max_records
+        self.ready = False
+        self._keys: Set[CBSDKey] = set()
+        self._records: "OrderedDict[CBSDKey, RegisteredCBSD]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def contains(self, fcc_id: str, cbsd_serial_number: str) -> bool:
+        found = generate_cbsd_key(fcc_id, cbsd_serial_number) in self._keys
+        if not found:
+            NEGATIVE_HITS.inc()
+        return found
+
+    def get(self, fcc_id: str, cbsd_serial_number: str) -> Optional[RegisteredCBSD]:
+        """Campos do CBSD se estiverem na LRU (None não significa que o CBSD não existe)"""
+        key = generate_cbsd_key(fcc_id, cbsd_serial_number)
+        record = self._records.get(key)
+        if record is None:
+            MISSES.inc()
+            return None
+        self._records.move_to_end(key)
+        HITS.inc()
+        return record
+
+    def add(self, record: RegisteredCBSD):
+        key = generate_cbsd_key(record.fcc_id, record.cbsd_serial_number)
+        self._keys.add(key)
+        self._records[key] = record
+        self._records.move_to_end(key)
+        while len(self._records) > self.max_records:
+            self._records.popitem(last=False)
+
+    def remove(self, fcc_id: str, cbsd_serial_number: str) -> bool:
+        key = generate_cbsd_key(fcc_id, cbsd_serial_number)
+        self._records.pop(key, None)
+        if key not in self._keys:
+            return False
+        self._keys.discard(key)
+        return True
+
+    def clear(self):
+        self._keys.clear()
+        self._records.clear()
+
+    async def load(self, db: AsyncSession, chunk_size: int = 5000):
+        """Reconstrói o registro a partir da tabela cbsds"""
+        self.ready = False
+        self.clear()
+        result = await db.stream(
+            select(CBSD.fcc_id, CBSD.cbsd_serial_number, CBSD.latitude, CBSD.longitude, CBSD.sas_origin)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for row in result:
+            self.add(RegisteredCBSD(row.fcc_id, row.cbsd_serial_number, row.latitude, row.longitude, row.sas_origin))
+        self.ready = True
+        logger.info(f"Registro de CBSDs carregado com {len(self)} chaves")
+
+    # --- Replicação entre workers ---
+
+    async def publish_added(self, records: List[RegisteredCBSD]):
+        await self.publish({"op": "add", "cbsds": [record.__dict__ for record in records]})
+
+    async def publish_removed(self, keys: List[CBSDKey]):
+        await self.publish({"op": "remove", "keys": [list(key) for key in keys]})
+
+    def apply(self, message: dict):
+        if message["op"] == "add":
+            for record in message["cbsds"]:
+                self.add(RegisteredCBSD(**record))
+        elif message["op"] == "remove":
+            for fcc_id, cbsd_serial_number in message["keys"]:
+                self.remove(fcc_id, cbsd_serial_number)
+
+
+def create_cbsd_registry(settings: Settings) -> CBSDRegistry:
+    """Cria o registro de CBSDs conforme as configurações"""
+    return CBSDRegistry(max_records=settings.cbsd_cache_size)
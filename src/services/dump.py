@@ -0,0 +1,184 @@
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.cbsd import CBSD
+from src.models.grant import Grant
+from src.services.serialization import dumps, load_json_field
+
+logger = logging.getLogger(__name__)
+
+# Seções do dump, na ordem em que são emitidas
+DUMP_SECTIONS = ("cbsd", "grant")
+
+
+def cbsd_record(cbsd) -> Dict[str, Any]:
+    """Representação WINNF de um CBSD (usada por get_cbsd e pelo dump)"""
+    return {
+        "fccId": cbsd.fcc_id,
+        "userId": cbsd.user_id,
+        "cbsdSerialNumber": cbsd.cbsd_serial_number,
+        "callSign": cbsd.call_sign,
+        "cbsdCategory": cbsd.cbsd_category,
+        "airInterface": cbsd.air_interface,
+        "measCapability": load_json_field(cbsd.meas_capability),
+        "eirpCapability": cbsd.eirp_capability,
+        "latitude": cbsd.latitude,
+        "longitude": cbsd.longitude,
+        "height": cbsd.height,
+        "heightType": cbsd.height_type,
+        "indoorDeployment": cbsd.indoor_deployment,
+        "antennaGain": cbsd.antenna_gain,
+        "antennaBeamwidth": cbsd.antenna_beamwidth,
+        "antennaAzimuth": cbsd.antenna_azimuth,
+        "groupingParam": cbsd.grouping_param,
+        "cbsdAddress": cbsd.cbsd_address,
+        "sasOrigin": cbsd.sas_origin,
+        "registrationTimestamp": cbsd.registration_timestamp
+    }
+
+
+def grant_record(grant) -> Dict[str, Any]:
+    """Representação WINNF de um grant (usada por get_grants e pelo dump)"""
+    return {
+        "grantId": grant.grant_id,
+        "channelType": grant.channel_type,
+        "grantExpireTime": grant.grant_expire_time,
+        "terminated": grant.terminated,
+        "maxEirp": grant.max_eirp,
+        "lowFrequency": grant.low_frequency,
+        "highFrequency": grant.high_frequency,
+        "requestedMaxEirp": grant.requested_max_eirp,
+        "requestedLowFrequency": grant.requested_low_frequency,
+        "requestedHighFrequency": grant.requested_high_frequency,
+        "sasOrigin": grant.sas_origin,
+        "grantTimestamp": grant.grant_timestamp
+    }
+
+
+def dump_grant_record(grant) -> Dict[str, Any]:
+    record = grant_record(grant)
+    record["fccId"] = grant.fcc_id
+    record["cbsdSerialNumber"] = grant.cbsd_serial_number
+    record["state"] = grant.state
+    record["transmitExpireTime"] = grant.transmit_expire_time
+    return record
+
+
+def parse_cursor(cursor: Optional[str]) -> Dict[str, int]:
+    """Cursor "cbsd:<id>,grant:<id>": último id já entregue de cada seção"""
+    marks = {section: 0 for section in DUMP_SECTIONS}
+    if not cursor:
+        return marks
+    for part in cursor.split(","):
+        section, _, value = part.partition(":")
+        if section not in marks or not value.isdigit():
+            raise ValueError(f"Cursor inválido: {cursor}")
+        marks[section] = int(value)
+    return marks
+
+
+def format_cursor(marks: Dict[str, int]) -> str:
+    return ",".join(f"{section}:{marks[section]}" for section in DUMP_SECTIONS)
+
+
+async def begin_snapshot(db: AsyncSession):
+    """Abre uma transação de leitura com uma única visão do banco para todas as seções do dump"""
+    if db.bind.dialect.name == "sqlite":
+        # O pysqlite não abre transação para SELECT; com BEGIN a visão fica fixa a partir da primeira leitura
+        await db.execute(text("BEGIN"))
+    else:
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+
+async def iter_dump(session_factory, cursor: Optional[str] = None, chunk_size: int = 1000) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Percorre CBSDs e grants com id acima do cursor, em lotes de chunk_size.
+
+    As linhas vêm de um cursor no servidor (yield_per), então a memória usada
+    é proporcional a chunk_size e não ao tamanho das tabelas. As duas seções
+    são lidas na mesma transação (REPEATABLE READ), então o dump reflete um
+    único instante. Cada registro traz o cursor de retomada; o último item é
+    um registro "end".
+
+    O cursor marca o último id entregue de cada seção: ele retoma um download
+    interrompido (registros criados depois também aparecem), mas registros já
+    entregues que forem alterados ou removidos depois não voltam. Para o
+    estado atual é preciso um dump completo novo.
+    """
+    marks = parse_cursor(cursor)
+    sections = (
+        ("cbsd", CBSD, cbsd_record),
+        ("grant", Grant, dump_grant_record)
+    )
+    async with session_factory() as db:
+        await begin_snapshot(db)
+        for section, model, serialize in sections:
+            # Colunas em vez de entidades ORM: linhas simples, sem identity map
+            result = await db.stream(
+                select(*model.__table__.columns)
+                .where(model.id > marks[section])
+                .order_by(model.id)
+                .execution_options(yield_per=chunk_size)
+            )
+            async for partition in result.partitions():
+                records = []
+                for row in partition:
+                    marks[section] = row.id
+                    records.append({
+                        "recordType": section,
+                        "cursor": format_cursor(marks),
+                        "record": serialize(row)
+                    })
+                yield records
+    yield [{
+        "recordType": "end",
+        "cursor": format_cursor(marks),
+        "generatedAt": datetime.now(timezone.utc).isoformat()
+    }]
+
+
+async def iter_ndjson(session_factory, cursor: Optional[str] = None, chunk_size: int = 1000) -> AsyncIterator[bytes]:
+    """Dump em NDJSON: um registro por linha, um bloco de bytes por lote"""
+    async for records in iter_dump(session_factory, cursor, chunk_size):
+        yield b"".join(dumps(record) + b"\n" for record in records)
+
+
+async def iter_json(session_factory, cursor: Optional[str] = None, chunk_size: int = 1000) -> AsyncIterator[bytes]:
+    """Dump como um único documento JSON {"records": [...], "cursor": ...} enviado em partes"""
+    yield b'{"records": ['
+    first = True
+    end = None
+    async for records in iter_dump(session_factory, cursor, chunk_size):
+        if records[-1]["recordType"] == "end":
+            end = records.pop()
+        if not records:
+            continue
+        body = b", ".join(dumps(record) for record in records)
+        yield body if first else b", " + body
+        first = False
+    yield b'], "cursor": ' + dumps(end["cursor"]) + b', "generatedAt": ' + dumps(end["generatedAt"]) + b"}"
+
+
+async def write_snapshot(session_factory, path: str, chunk_size: int = 1000) -> Tuple[int, str]:
+    """Grava o dump completo em NDJSON; retorna (registros, cursor final).
+
+    O arquivo é escrito ao lado do destino e renomeado no fim, então quem está
+    servindo o snapshot anterior nunca vê um arquivo pela metade.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    count = 0
+    cursor = ""
+    with open(temp_path, "wb") as output:
+        async for records in iter_dump(session_factory, chunk_size=chunk_size):
+            output.write(b"".join(dumps(record) + b"\n" for record in records))
+            count += len(records) - (1 if records[-1]["recordType"] == "end" else 0)
+            cursor = records[-1]["cursor"]
+    os.replace(temp_path, path)
+    logger.info(f"Snapshot do dump gravado em {path} ({count} registros)")
+    return count, cursor
@@ -0,0 +1,177 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import Settings
+from src.models.event import Event
+from src.models.event_archive import EventArchive
+from src.services.write_queue import WriteOperation, Writer, run_in_session
+
+logger = logging.getLogger(__name__)
+
+
+class EventArchiver:
+    """Retenção da tabela events: move blocos antigos para arquivos NDJSON comprimidos.
+
+    Só blocos inteiros são arquivados (todos os eventos anteriores ao corte),
+    em trechos de até chunk_blocks blocos por arquivo e transação. Os blocos
+    continuam em ledger_blocks, então a cadeia de hashes segue verificável e
+    cada arquivo pode ser conferido contra o block_hash correspondente.
+    """
+
+    def __init__(
+        self,
+        retention_days: int = 0,
+        directory: str = "archive/events",
+        interval: float = 3600,
+        chunk_blocks: int = 500
+    ):
+        self.retention_days = retention_days
+        self.directory = directory
+        self.interval = interval
+        self.chunk_blocks = chunk_blocks
+        # Grava pelo escritor da API (fila de escrita); sem ele (ex: manage.py), em sessão própria
+        self.writer: Optional[Writer] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        now = now or datetime.now(timezone.utc)
+        return now - timedelta(days=self.retention_days)
+
+    async def next_range(self, db: AsyncSession, cutoff: datetime) -> Optional[Tuple[int, int]]:
+        """Próximo trecho de blocos cujos eventos são todos anteriores ao corte"""
+        first = await db.scalar(select(func.min(Event.block_number)))
+        if first is None:
+            return None
+        boundary = await db.scalar(select(func.min(Event.block_number)).where(Event.created_at >= cutoff))
+        last = boundary - 1 if boundary is not None else await db.scalar(select(func.max(Event.block_number)))
+        last = min(last, first + self.chunk_blocks - 1)
+        if last < first:
+            return None
+        return first, last
+
+    async def archive(self, session_factory, cutoff: Optional[datetime] = None) -> int:
+        """Arquiva todos os blocos anteriores ao corte; retorna quantos eventos saíram da tabela"""
+        cutoff = cutoff or self.cutoff()
+        archived = 0
+        while True:
+            async with session_factory() as db:
+                block_range = await self.next_range(db, cutoff)
+            if block_range is None:
+                return archived
+            count = await self.archive_range(session_factory, *block_range)
+            if count == 0:
+                return archived
+            archived += count
+
+    async def archive_range(self, session_factory, first_block: int, last_block: int) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        # Nome único por tentativa: outro worker pode estar arquivando o mesmo trecho
+        path = os.path.join(self.directory, f"events_{first_block:010d}_{last_block:010d}_{uuid.uuid4().hex[:8]}.ndjson.gz")
+        count = 0
+        oldest = newest = None
+        try:
+            async with session_factory() as db:
+                result = await db.stream(
+                    select(Event.id, Event.event_type, Event.payload, Event.transaction_hash, Event.block_number, Event.created_at)
+                    .where(Event.block_number.between(first_block, last_block))
+                    .order_by(Event.block_number, Event.id)
+                    .execution_options(yield_per=5000)
+                )
+                with gzip.open(path, "wb") as output:
+                    async for partition in result.partitions():
+                        lines = []
+                        for row in partition:
+                            created_at = row.created_at.isoformat() if row.created_at else None
+                            oldest = oldest or row.created_at
+                            newest = row.created_at or newest
+                            # payload mantido como texto: é o que entra no transaction_hash
+                            lines.append(json.dumps({
+                                "id": row.id,
+                                "eventType": row.event_type,
+                                "payload": row.payload,
+                                "transactionHash": row.transaction_hash,
+                                "blockNumber": row.block_number,
+                                "createdAt": created_at
+                            }) + "\n")
+                        count += len(lines)
+                        await asyncio.to_thread(output.write, "".join(lines).encode())
+                    await asyncio.to_thread(output.flush)
+                    await asyncio.to_thread(os.fsync, output.fileobj.fileno())
+
+            # Leitura feita: só o registro do arquivo e a remoção dos eventos são escrita
+            async def record(db: AsyncSession):
+                await db.execute(insert(EventArchive).values(
+                    first_block=first_block,
+                    last_block=last_block,
+                    event_count=count,
+                    path=path,
+                    oldest_event_at=oldest,
+                    newest_event_at=newest
+                ))
+                await db.execute(
+                    delete(Event)
+                    .where(Event.block_number.between(first_block, last_block))
+                    .execution_options(synchronize_session=False)
+                )
+
+            await self._write(session_factory, record)
+        except IntegrityError:
+            # Trecho já arquivado por outro worker
+            os.remove(path)
+            return 0
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        logger.info(f"{count} eventos dos blocos {first_block}-{last_block} arquivados em {path}")
+        return count
+
+    async def _write(self, session_factory, operation: WriteOperation):
+        if self.writer is not None:
+            return await self.writer(operation)
+        return await run_in_session(session_factory, operation)
+
+    def start(self, session_factory, writer: Optional[Writer] = None):
+        self.writer = writer
+        if self.retention_days <= 0:
+            return
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self):
+        if self._task:
+            # Não cancelar no meio de um arquivamento (a transação ficaria aberta)
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    async def _run(self, session_factory):
+        while not self._stopping.is_set():
+            try:
+                await self.archive(session_factory)
+            except Exception as e:
+                logger.error(f"Erro ao arquivar eventos: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def create_event_archiver(settings: Settings) -> EventArchiver:
+    """Cria o arquivador de eventos conforme as configurações (inativo se event_retention_days=0)"""
+    return EventArchiver(
+        retention_days=settings.event_retention_days,
+        directory=settings.event_archive_dir,
+        interval=settings.event_archive_interval
+    )
@@ -0,0 +1,167 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import Settings
+from src.models.grant import Grant
+
+logger = logging.getLogger(__name__)
+
+GRANT_EXPIRY = "grant"
+TRANSMIT_EXPIRY = "transmit"
+
+# handler(kind, grant_ids, now): aplica as expirações vencidas de um lote
+ExpiryHandler = Callable[[str, List[str], int], Awaitable[None]]
+
+
+class ExpiryScheduler:
+    """Agenda grantExpireTime e transmitExpireTime dos grants em um min-heap.
+
+    Reagendar ou cancelar apenas atualiza `_deadlines`; entradas antigas do heap
+    são descartadas quando chegam ao topo (remoção preguiçosa). O loop dorme até
+    o próximo vencimento e entrega os grants vencidos ao handler em lotes, sem
+    varrer a tabela de grants.
+    """
+
+    def __init__(self, handler: ExpiryHandler, batch_size: int = 500, max_interval: float = 1.0):
+        self.handler = handler
+        self.batch_size = batch_size
+        self.max_interval = max_interval
+        self._heap: List[Tuple[int, str, str]] = []
+        self._deadlines: Dict[Tuple[str, str], int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def schedule(self, grant_id: str, expire_time: Optional[int], kind: str = GRANT_EXPIRY):
+        """Agenda (ou reagenda) a expiração de um grant"""
+        if expire_time is None:
+            self._deadlines.pop((kind, grant_id), None)
+            return
+        if self._deadlines.get((kind, grant_id)) == expire_time:
+            return
+        self._deadlines[(kind, grant_id)] = expire_time
+        heapq.heappush(self._heap, (expire_time, kind, grant_id))
+        if len(self._heap) > 2 * len(self._deadlines) + 1024:
+            self._compact()
+
+    def cancel(self, grant_id: str):
+        """Cancela as expirações de um grant (relinquishment/deregistration)"""
+        self._deadlines.pop((GRANT_EXPIRY, grant_id), None)
+        self._deadlines.pop((TRANSMIT_EXPIRY, grant_id), None)
+
+    def next_deadline(self) -> Optional[int]:
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: int) -> Dict[str, List[str]]:
+        """Remove do heap até batch_size expirações vencidas, agrupadas por tipo"""
+        due: Dict[str, List[str]] = {GRANT_EXPIRY: [], TRANSMIT_EXPIRY: []}
+        count = 0
+        while self._heap and count < self.batch_size:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, kind, grant_id = heapq.heappop(self._heap)
+            del self._deadlines[(kind, grant_id)]
+            due[kind].append(grant_id)
+            count += 1
+        return due
+
+    def clear(self):
+        self._heap.clear()
+        self._deadlines.clear()
+
+    def _discard_stale(self):
+        while self._heap:
+            expire_time, kind, grant_id = self._heap[0]
+            if self._deadlines.get((kind, grant_id)) == expire_time:
+                return
+            heapq.heappop(self._heap)
+
+    def _compact(self):
+        self._heap = [(expire_time, kind, grant_id) for (kind, grant_id), expire_time in self._deadlines.items()]
+        heapq.heapify(self._heap)
+
+    async def load(self, db: AsyncSession, chunk_size: int = 5000):
+        """Carrega as expirações pendentes dos grants ativos"""
+        self.clear()
+        result = await db.stream(
+            select(Grant.grant_id, Grant.grant_expire_time, Grant.transmit_expire_time, Grant.state)
+            .where(Grant.terminated == False)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for row in result:
+            self.schedule(row.grant_id, row.grant_expire_time)
+            if row.state == "AUTHORIZED" and row.transmit_expire_time is not None:
+                self.schedule(row.grant_id, row.transmit_expire_time, TRANSMIT_EXPIRY)
+        logger.info(f"Agendador de expiração carregado com {len(self)} vencimentos pendentes")
+
+    async def run_once(self, now: Optional[int] = None) -> int:
+        """Processa todas as expirações vencidas; retorna quantas foram entregues ao handler"""
+        now = int(time.time()) if now is None else now
+        processed = 0
+        while True:
+            due = self.pop_due(now)
+            if not due[GRANT_EXPIRY] and not due[TRANSMIT_EXPIRY]:
+                return processed
+            pending = [(kind, grant_ids) for kind, grant_ids in due.items() if grant_ids]
+            for index, (kind, grant_ids) in enumerate(pending):
+                try:
+                    await self.handler(kind, grant_ids, now)
+                except Exception:
+                    # Reagendar o que não foi aplicado em vez de perder as expirações
+                    retry_at = now + max(int(self.max_interval), 1)
+                    for retry_kind, retry_ids in pending[index:]:
+                        for grant_id in retry_ids:
+                            self.schedule(grant_id, retry_at, retry_kind)
+                    raise
+                processed += len(grant_ids)
+
+    async def start(self, session_factory=None):
+        if session_factory is not None:
+            try:
+                async with session_factory() as db:
+                    await self.load(db)
+            except Exception as e:
+                logger.warning(f"Falha ao carregar expirações pendentes: {e}")
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            # Não cancelar no meio de um lote (a transação ficaria aberta)
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Erro ao processar expirações: {e}")
+            delay = self.max_interval
+            deadline = self.next_deadline()
+            if deadline is not None:
+                delay = min(delay, max(deadline - time.time(), 0.05))
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+def create_expiry_scheduler(settings: Settings, handler: ExpiryHandler) -> ExpiryScheduler:
+    """Cria o agendador de expiração conforme as configurações"""
+    return ExpiryScheduler(
+        handler,
+        batch_size=settings.expiry_batch_size,
+        max_interval=settings.expiry_check_interval
+    )
@@ -0,0 +1,224 @@
+import logging
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import Settings
+from src.models.cbsd import CBSD
+from src.services.pubsub import ReplicatedState
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+Cell = Tuple[int, int]
+# Retângulo (min_lat, min_lon, max_lat, max_lon) em coordenadas inteiras
+Region = Tuple[int, int, int, int]
+
+
+@dataclass
+class IndexedCBSD:
+    fcc_id: str
+    cbsd_serial_number: str
+    latitude: int
+    longitude: int
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Distância em km de um ponto a um vetor de pontos (graus), vetorizada com NumPy"""
+    lat_rad = np.radians(lat)
+    lats_rad = np.radians(lats)
+    d_lat = lats_rad - lat_rad
+    d_lon = np.radians(lons - lon)
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat_rad) * np.cos(lats_rad) * np.sin(d_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoIndex(ReplicatedState):
+    """Índice espacial em memória (grade regular) sobre a localização dos CBSDs.
+
+    Cada célula tem cell_degrees graus de lado. Uma consulta seleciona apenas as
+    células que cobrem a região e filtra os candidatos com cálculo vetorizado.
+    Coordenadas são inteiras (graus × coordinate_scale), como no modelo CBSD.
+    """
+
+    channel = "sas:geo"
+
+    def __init__(self, cell_degrees: float = 0.1, coordinate_scale: int = 1000000):
+        super().__init__()
+        self.cell_degrees = cell_degrees
+        self.coordinate_scale = coordinate_scale
+        self._cells: Dict[Cell, Dict[str, IndexedCBSD]] = {}
+        self._cbsds: Dict[str, Tuple[IndexedCBSD, Cell]] = {}
+
+    def __len__(self):
+        return len(self._cbsds)
+
+    def get(self, fcc_id: str) -> Optional[IndexedCBSD]:
+        entry = self._cbsds.get(fcc_id)
+        return entry[0] if entry else None
+
+    def _to_degrees(self, value: int) -> float:
+        return value / self.coordinate_scale
+
+    def _cell_for(self, lat_deg: float, lon_deg: float) -> Cell:
+        return (math.floor(lat_deg / self.cell_degrees), math.floor(lon_deg / self.cell_degrees))
+
+    def add(self, fcc_id: str, cbsd_serial_number: str, latitude: int, longitude: int):
+        self.remove(fcc_id)
+        cbsd = IndexedCBSD(fcc_id, cbsd_serial_number, latitude, longitude)
+        cell = self._cell_for(self._to_degrees(latitude), self._to_degrees(longitude))
+        self._cells.setdefault(cell, {})[fcc_id] = cbsd
+        self._cbsds[fcc_id] = (cbsd, cell)
+
+    def remove(self, fcc_id: str) -> bool:
+        entry = self._cbsds.pop(fcc_id, None)
+        if entry is None:
+            return False
+        cell = entry[1]
+        members = self._cells[cell]
+        del members[fcc_id]
+        if not members:
+            del self._cells[cell]
+        return True
+
+    def clear(self):
+        self._cells.clear()
+        self._cbsds.clear()
+
+    def _candidates(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[IndexedCBSD]:
+        min_row, min_col = self._cell_for(min_lat, min_lon)
+        max_row, max_col = self._cell_for(max_lat, max_lon)
+        n_cells = (max_row - min_row + 1) * (max_col - min_col + 1)
+        candidates: List[IndexedCBSD] = []
+        if n_cells > len(self._cells):
+            # Região maior que o número de células ocupadas: percorrer as ocupadas
+            for (row, col), members in self._cells.items():
+                if min_row <= row <= max_row and min_col <= col <= max_col:
+                    candidates.extend(members.values())
+        else:
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    members = self._cells.get((row, col))
+                    if members:
+                        candidates.extend(members.values())
+        return candidates
+
+    def _coordinates(self, candidates: List[IndexedCBSD]) -> Tuple[np.ndarray, np.ndarray]:
+        count = len(candidates)
+        lats = np.fromiter((c.latitude for c in candidates), dtype=np.float64, count=count) / self.coordinate_scale
+        lons = np.fromiter((c.longitude for c in candidates), dtype=np.float64, count=count) / self.coordinate_scale
+        return lats, lons
+
+    def radius_bounds(self, latitude: int, longitude: int, radius_km: float) -> List[Region]:
+        """Retângulos (min_lat, min_lon, max_lat, max_lon, coordenadas inteiras) que cobrem o círculo.
+
+        Se o intervalo de longitude passa de ±180° ele é dividido em dois
+        retângulos, um de cada lado do antimeridiano.
+        """
+        lat = self._to_degrees(latitude)
+        lon = self._to_degrees(longitude)
+        d_lat = radius_km / KM_PER_DEGREE
+        cos_lat = max(math.cos(math.radians(min(abs(lat) + d_lat, 90.0))), 1e-6)
+        d_lon = min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+        scale = self.coordinate_scale
+        min_lat, max_lat = math.floor((lat - d_lat) * scale), math.ceil((lat + d_lat) * scale)
+        min_lon, max_lon = math.floor((lon - d_lon) * scale), math.ceil((lon + d_lon) * scale)
+        half_turn = 180 * scale
+        if max_lon - min_lon >= 2 * half_turn:
+            return [(min_lat, -half_turn, max_lat, half_turn)]
+        if min_lon < -half_turn:
+            return [(min_lat, min_lon + 2 * half_turn, max_lat, half_turn), (min_lat, -half_turn, max_lat, max_lon)]
+        if max_lon > half_turn:
+            return [(min_lat, min_lon, max_lat, half_turn), (min_lat, -half_turn, max_lat, max_lon - 2 * half_turn)]
+        return [(min_lat, min_lon, max_lat, max_lon)]
+
+    def within_radius(self, latitude: int, longitude: int, radius_km: float, limit: Optional[int] = None) -> List[Tuple[IndexedCBSD, float]]:
+        """CBSDs a até radius_km do ponto, ordenados pela distância"""
+        lat = self._to_degrees(latitude)
+        lon = self._to_degrees(longitude)
+        candidates = []
+        for min_lat, min_lon, max_lat, max_lon in self.radius_bounds(latitude, longitude, radius_km):
+            candidates.extend(self._candidates(
+                self._to_degrees(min_lat), self._to_degrees(min_lon), self._to_degrees(max_lat), self._to_degrees(max_lon)
+            ))
+        if not candidates:
+            return []
+        lats, lons = self._coordinates(candidates)
+        distances = haversine_km(lat, lon, lats, lons)
+        selected = np.flatnonzero(distances <= radius_km)
+        selected = selected[np.argsort(distances[selected], kind="stable")]
+        if limit is not None:
+            selected = selected[:limit]
+        return [(candidates[i], float(distances[i])) for i in selected]
+
+    def within_bbox(self, min_latitude: int, min_longitude: int, max_latitude: int, max_longitude: int, limit: Optional[int] = None) -> List[IndexedCBSD]:
+        """CBSDs dentro do retângulo (limites inclusivos)"""
+        candidates = self._candidates(
+            self._to_degrees(min_latitude), self._to_degrees(min_longitude),
+            self._to_degrees(max_latitude), self._to_degrees(max_longitude)
+        )
+        if not candidates:
+            return []
+        count = len(candidates)
+        lats = np.fromiter((c.latitude for c in candidates), dtype=np.int64, count=count)
+        lons = np.fromiter((c.longitude for c in candidates), dtype=np.int64, count=count)
+        mask = (lats >= min_latitude) & (lats <= max_latitude) & (lons >= min_longitude) & (lons <= max_longitude)
+        selected = np.flatnonzero(mask)
+        if limit is not None:
+            selected = selected[:limit]
+        return [candidates[i] for i in selected]
+
+    async def load(self, db: AsyncSession, chunk_size: int = 5000):
+        """Reconstrói o índice a partir dos CBSDs registrados"""
+        self.clear()
+        result = await db.stream(
+            select(CBSD.fcc_id, CBSD.cbsd_serial_number, CBSD.latitude, CBSD.longitude)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for row in result:
+            self.add(row.fcc_id, row.cbsd_serial_number, row.latitude, row.longitude)
+        logger.info(f"Índice geográfico carregado com {len(self)} CBSDs")
+
+    async def load_region(self, db: AsyncSession, regions: List[Region]) -> "GeoIndex":
+        """Índice temporário com os CBSDs do banco dentro dos retângulos (limites inclusivos).
+
+        Usado no lugar deste índice quando ele pode estar incompleto (vários
+        workers sem replicação); a consulta usa o índice (latitude, longitude).
+        """
+        region = GeoIndex(cell_degrees=self.cell_degrees, coordinate_scale=self.coordinate_scale)
+        result = await db.execute(
+            select(CBSD.fcc_id, CBSD.cbsd_serial_number, CBSD.latitude, CBSD.longitude).where(or_(*(
+                and_(CBSD.latitude.between(min_lat, max_lat), CBSD.longitude.between(min_lon, max_lon))
+                for min_lat, min_lon, max_lat, max_lon in regions
+            )))
+        )
+        for row in result:
+            region.add(row.fcc_id, row.cbsd_serial_number, row.latitude, row.longitude)
+        return region
+
+    # --- Replicação entre workers ---
+
+    async def publish_added(self, cbsds: List[IndexedCBSD]):
+        await self.publish({"op": "add", "cbsds": [cbsd.__dict__ for cbsd in cbsds]})
+
+    async def publish_removed(self, fcc_ids: List[str]):
+        await self.publish({"op": "remove", "fccIds": fcc_ids})
+
+    def apply(self, message: dict):
+        if message["op"] == "add":
+            for cbsd in message["cbsds"]:
+                self.add(cbsd["fcc_id"], cbsd["cbsd_serial_number"], cbsd["latitude"], cbsd["longitude"])
+        elif message["op"] == "remove":
+            for fcc_id in message["fccIds"]:
+                self.remove(fcc_id)
+
+
+def create_geo_index(settings: Settings) -> GeoIndex:
+    """Cria o índice geográfico conforme as configurações"""
+    return GeoIndex(cell_degrees=settings.geo_cell_degrees, coordinate_scale=settings.coordinate_scale)
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from src.config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HeartbeatState:
+    grant_id: str
+    fcc_id: str
+    cbsd_serial_number: str
+    grant_expire_time: int
+    state: str = "GRANTED"
+    transmit_expire_time: Optional[int] = None
+    last_heartbeat: Optional[int] = None
+    sas_origin: Optional[str] = None
+    # Transição GRANTED -> AUTHORIZED ainda não gravada (gera evento no flush)
+    newly_authorized: bool = False
+
+    def authorized(self, now: int) -> bool:
+        """Autorizado a transmitir em `now` (AUTHORIZED e transmitExpireTime não vencido)"""
+        return self.state == "AUTHORIZED" and self.transmit_expire_time is not None and self.transmit_expire_time > now
+
+
+# flush_handler(states): grava no banco o estado de heartbeat de um lote de grants
+FlushHandler = Callable[[List[HeartbeatState]], Awaitable[None]]
+
+
+class HeartbeatStore:
+    """Estado de heartbeat por grant em memória, gravado no banco em lotes periódicos.
+
+    Cada heartbeat só altera a entrada em memória e a marca como suja; o flush
+    agrupa todas as entradas sujas em um único UPDATE a cada flush_interval, de
+    modo que várias mensagens do mesmo grant entre dois flushes custam uma escrita.
+    """
+
+    def __init__(
+        self,
+        flush_handler: FlushHandler,
+        flush_interval: float = 1.0,
+        transmit_expire_seconds: int = 240
+    ):
+        self.flush_handler = flush_handler
+        self.flush_interval = flush_interval
+        self.transmit_expire_seconds = transmit_expire_seconds
+        self._states: Dict[str, HeartbeatState] = {}
+        self._dirty: Dict[str, HeartbeatState] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def __len__(self):
+        return len(self._states)
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def get(self, grant_id: str) -> Optional[HeartbeatState]:
+        return self._states.get(grant_id)
+
+    def put(self, state: HeartbeatState):
+        self._states[state.grant_id] = state
+
+    def remove(self, grant_id: str):
+        """Descarta o estado de um grant terminado, expirado ou removido"""
+        self._states.pop(grant_id, None)
+        self._dirty.pop(grant_id, None)
+
+    def record(self, state: HeartbeatState, now: int, sas_origin: str) -> int:
+        """Registra um heartbeat e retorna o novo transmitExpireTime"""
+        if not state.authorized(now):
+            state.state = "AUTHORIZED"
+            state.newly_authorized = True
+            state.sas_origin = sas_origin
+        state.last_heartbeat = now
+        state.transmit_expire_time = min(now + self.transmit_expire_seconds, state.grant_expire_time)
+        self._dirty[state.grant_id] = state
+        return state.transmit_expire_time
+
+    async def flush(self) -> int:
+        """Grava as entradas sujas; em caso de falha elas voltam para o próximo flush"""
+        if not self._dirty:
+            return 0
+        batch = list(self._dirty.values())
+        self._dirty = {}
+        try:
+            await self.flush_handler(batch)
+        except Exception:
+            for state in batch:
+                if state.grant_id in self._states:
+                    self._dirty.setdefault(state.grant_id, state)
+            raise
+        for state in batch:
+            state.newly_authorized = False
+        return len(batch)
+
+    def start(self):
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            # Não cancelar no meio de um flush (a transação ficaria aberta)
+            self._stopping.set()
+            await self._task
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Falha no flush final de heartbeats: {e}")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Erro no flush de heartbeats: {e}")
+
+
+def create_heartbeat_store(settings: Settings, flush_handler: FlushHandler) -> HeartbeatStore:
+    """Cria o store de heartbeat conforme as configurações"""
+    return HeartbeatStore(
+        flush_handler,
+        flush_interval=settings.heartbeat_flush_interval,
+        transmit_expire_seconds=settings.transmit_expire_seconds
+    )
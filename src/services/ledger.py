@@ -0,0 +1,301 @@
+import asyncio
+import hashlib
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import Settings
+from src.models.event import Event
+from src.models.event_archive import EventArchive
+from src.models.ledger import LedgerBlock
+from src.services.metrics import EVENTS_WRITTEN, LEDGER_BLOCKS
+from src.services.write_queue import WriteOperation, Writer, run_in_session
+
+logger = logging.getLogger(__name__)
+
+GENESIS_HASH = "0x" + "0" * 64
+
+
+def event_hash(previous_hash: str, event_type: str, payload: str) -> str:
+    """Hash encadeado de um evento: sha3_256(hash anterior | tipo | payload)"""
+    digest = hashlib.sha3_256()
+    digest.update(previous_hash.encode())
+    digest.update(b"|")
+    digest.update(event_type.encode())
+    digest.update(b"|")
+    digest.update(payload.encode())
+    return "0x" + digest.hexdigest()
+
+
+class EventLedger:
+    """Ledger de eventos somente-anexação, encadeado por hash e gravado em blocos.
+
+    Os handlers chamam append() depois de confirmar suas alterações; os eventos
+    ficam em memória até somar block_size ou até block_interval segundos, e então
+    o bloco inteiro é gravado com um único INSERT em lote. Cada evento carrega o
+    hash do anterior, e o bloco registra o hash do último evento em ledger_blocks.
+    A chave primária de ledger_blocks mantém os números de bloco únicos e
+    crescentes entre workers: se outro worker gravou o mesmo número, o bloco é
+    recalculado sobre a nova ponta da cadeia.
+    """
+
+    def __init__(
+        self,
+        block_size: int = 256,
+        block_interval: float = 0.2,
+        max_retries: int = 5,
+        on_written: Optional[Callable[[int], None]] = None
+    ):
+        self.block_size = block_size
+        self.block_interval = block_interval
+        self.max_retries = max_retries
+        # Chamado com o número de eventos de cada bloco gravado
+        self.on_written = on_written
+        self._pending: List[Dict[str, Any]] = []
+        self._future: Optional[asyncio.Future] = None
+        self._tip: Optional[Tuple[int, str]] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._session_factory = None
+        # Grava pelo escritor da API (fila de escrita); sem ele, em sessão própria
+        self.writer: Optional[Writer] = None
+        self.blocks_written = 0
+        self.events_written = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def append(self, event_type: str, payload: Dict[str, Any]) -> asyncio.Future:
+        """Enfileira um evento; o future é resolvido com o número do bloco gravado"""
+        return self.extend([(event_type, payload)])
+
+    def request_flush(self):
+        """Fecha o bloco em andamento sem esperar block_interval (há quem aguarde a gravação).
+
+        Eventos que chegam enquanto um bloco é gravado vão juntos para o seguinte.
+        """
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def extend(self, events: List[Tuple[str, Dict[str, Any]]]) -> asyncio.Future:
+        """Enfileira vários eventos, mantendo a ordem"""
+        if self._future is None:
+            self._future = asyncio.get_running_loop().create_future()
+        created_at = datetime.now(timezone.utc)
+        for event_type, payload in events:
+            self._pending.append({
+                "event_type": event_type,
+                "payload": json.dumps(payload),
+                "created_at": created_at
+            })
+        if len(self._pending) >= self.block_size and self._wakeup is not None:
+            self._wakeup.set()
+        return self._future
+
+    async def flush(self) -> int:
+        """Grava todos os eventos pendentes em um ou mais blocos; retorna quantos foram gravados"""
+        if not self._pending:
+            return 0
+        pending, future = self._pending, self._future
+        self._pending, self._future = [], None
+        written = 0
+        block_number = None
+        try:
+            for start in range(0, len(pending), self.block_size):
+                block_number = await self._write_block(pending[start:start + self.block_size])
+                written = start + self.block_size
+        except BaseException:
+            # Devolver à fila o que não foi gravado, antes dos eventos novos
+            self._pending = pending[written:] + self._pending
+            if self._future is None:
+                self._future = future
+            elif future is not None:
+                self._future.add_done_callback(lambda f, target=future: _chain_future(f, target))
+            raise
+        if future is not None and not future.done():
+            future.set_result(block_number)
+        return len(pending)
+
+    async def _write_block(self, rows: List[Dict[str, Any]]) -> int:
+        for attempt in range(self.max_retries):
+            async def write(db: AsyncSession) -> Tuple[int, str, int]:
+                if self._tip is None:
+                    self._tip = await self.load_tip(db)
+                block_number, previous_hash = self._tip[0] + 1, self._tip[1]
+                current = previous_hash
+                events = []
+                for row in rows:
+                    current = event_hash(current, row["event_type"], row["payload"])
+                    events.append({**row, "transaction_hash": current, "block_number": block_number})
+                await db.execute(insert(LedgerBlock).values(
+                    block_number=block_number,
+                    block_hash=current,
+                    previous_hash=previous_hash,
+                    event_count=len(events)
+                ))
+                await db.execute(insert(Event), events)
+                return block_number, current, len(events)
+
+            try:
+                block_number, current, count = await self._write(write)
+            except IntegrityError:
+                # Outro worker gravou este número de bloco: recarregar a ponta e refazer
+                self._tip = None
+                continue
+            except Exception:
+                self._tip = None
+                raise
+            self._tip = (block_number, current)
+            self.blocks_written += 1
+            self.events_written += count
+            LEDGER_BLOCKS.inc()
+            if self.on_written is not None:
+                self.on_written(count)
+            for event_type, written in Counter(row["event_type"] for row in rows).items():
+                EVENTS_WRITTEN.labels(event_type).inc(written)
+            return block_number
+        raise RuntimeError(f"Não foi possível gravar o bloco após {self.max_retries} tentativas")
+
+    async def _write(self, operation: WriteOperation):
+        if self.writer is not None:
+            return await self.writer(operation)
+        return await run_in_session(self._session_factory, operation)
+
+    async def load_tip(self, db: AsyncSession) -> Tuple[int, str]:
+        """Último bloco da cadeia; sem blocos, começa após os eventos legados"""
+        result = await db.execute(
+            select(LedgerBlock.block_number, LedgerBlock.block_hash)
+            .order_by(LedgerBlock.block_number.desc())
+            .limit(1)
+        )
+        row = result.first()
+        if row is not None:
+            return row.block_number, row.block_hash
+        last_legacy = await db.scalar(select(func.max(Event.block_number)))
+        return last_legacy or 0, GENESIS_HASH
+
+    async def verify(self, db: AsyncSession, chunk_size: int = 5000) -> Dict[str, Any]:
+        """Recalcula a cadeia de hashes do ledger.
+
+        Em blocos já arquivados (event_archives) só o encadeamento entre blocos
+        é conferido; nos demais cada evento é recalculado.
+        """
+        archived_through = await db.scalar(select(func.max(EventArchive.last_block))) or 0
+        blocks = await db.stream(
+            select(LedgerBlock).order_by(LedgerBlock.block_number).execution_options(yield_per=chunk_size)
+        )
+        block_heads: Dict[int, LedgerBlock] = {}
+        total_blocks = 0
+        expected_previous = None
+        first_invalid = None
+        async for block in blocks.scalars():
+            if expected_previous is not None and block.previous_hash != expected_previous and first_invalid is None:
+                first_invalid = block.block_number
+            if block.block_number > archived_through:
+                block_heads[block.block_number] = block
+            total_blocks += 1
+            expected_previous = block.block_hash
+        if not block_heads:
+            return {
+                "valid": first_invalid is None,
+                "blocks": total_blocks,
+                "events": 0,
+                "firstInvalidBlock": first_invalid,
+                "archivedThrough": archived_through
+            }
+
+        first_block = min(block_heads)
+        events = await db.stream(
+            select(Event.block_number, Event.event_type, Event.payload, Event.transaction_hash)
+            .where(Event.block_number >= first_block)
+            .order_by(Event.block_number, Event.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        counts: Dict[int, int] = {}
+        current_block = None
+        current = None
+        async for row in events:
+            block = block_heads.get(row.block_number)
+            if block is None:
+                continue
+            if row.block_number != current_block:
+                current_block = row.block_number
+                current = block.previous_hash
+            current = event_hash(current, row.event_type, row.payload)
+            counts[current_block] = counts.get(current_block, 0) + 1
+            if current != row.transaction_hash and (first_invalid is None or current_block < first_invalid):
+                first_invalid = current_block
+            if counts[current_block] == block.event_count and current != block.block_hash:
+                if first_invalid is None or current_block < first_invalid:
+                    first_invalid = current_block
+        for number, block in block_heads.items():
+            if counts.get(number, 0) != block.event_count and (first_invalid is None or number < first_invalid):
+                first_invalid = number
+        return {
+            "valid": first_invalid is None,
+            "blocks": total_blocks,
+            "events": sum(counts.values()),
+            "firstInvalidBlock": first_invalid,
+            "archivedThrough": archived_through
+        }
+
+    def start(self, session_factory, writer: Optional[Writer] = None):
+        self._session_factory = session_factory
+        self.writer = writer
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            # Cancelar no meio da gravação de um bloco deixaria a transação aberta
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Falha ao gravar o último bloco do ledger ({self.pending} eventos pendentes): {e}")
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.block_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping:
+                return
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Erro ao gravar bloco do ledger: {e}")
+                await asyncio.sleep(self.block_interval)
+
+
+def _chain_future(source: asyncio.Future, target: asyncio.Future):
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+def create_event_ledger(settings: Settings, on_written: Optional[Callable[[int], None]] = None) -> EventLedger:
+    """Cria o ledger de eventos conforme as configurações"""
+    return EventLedger(
+        block_size=settings.ledger_block_size,
+        block_interval=settings.ledger_block_interval,
+        on_written=on_written
+    )
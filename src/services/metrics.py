@@ -0,0 +1,201 @@
+import os
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Dict, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event
+
+# Com vários workers (gunicorn), defina PROMETHEUS_MULTIPROC_DIR para um diretório
+# vazio antes de iniciar: cada processo grava seus valores em arquivos mmap e o
+# /metrics de qualquer worker agrega todos. Por isso só são usados Counter,
+# Histogram e Gauges com multiprocess_mode="livesum" (soma dos processos vivos).
+# Os hooks de gunicorn.conf.py limpam o diretório e marcam os workers que saem
+# (mark_process_dead), sem o que os gauges continuariam somando processos mortos.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 32, 64)
+
+REQUEST_LATENCY = Histogram(
+    "sas_request_duration_seconds",
+    "Latência das requisições HTTP por rota e código de resposta",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+REQUEST_DB_QUERIES = Histogram(
+    "sas_request_db_queries",
+    "Consultas ao banco executadas por requisição",
+    ["route"],
+    buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = Histogram(
+    "sas_request_db_duration_seconds",
+    "Tempo total de banco por requisição",
+    ["route"],
+    buckets=LATENCY_BUCKETS
+)
+DB_QUERY_SECONDS = Histogram(
+    "sas_db_query_duration_seconds",
+    "Duração de cada consulta ao banco (inclui tarefas em segundo plano)",
+    buckets=LATENCY_BUCKETS
+)
+POOL_CHECKOUT_SECONDS = Histogram(
+    "sas_db_pool_checkout_seconds",
+    "Espera para obter uma conexão do pool",
+    buckets=LATENCY_BUCKETS
+)
+POOL_SIZE = Gauge(
+    "sas_db_pool_size",
+    "Conexões persistentes configuradas no pool (soma dos workers)",
+    multiprocess_mode="livesum"
+)
+POOL_CHECKED_OUT = Gauge(
+    "sas_db_pool_checked_out",
+    "Conexões do pool em uso no momento",
+    multiprocess_mode="livesum"
+)
+POOL_CONNECTIONS_OPENED = Counter(
+    "sas_db_connections_opened_total",
+    "Conexões novas abertas com o banco"
+)
+POOL_CONNECTIONS_INVALIDATED = Counter(
+    "sas_db_connections_invalidated_total",
+    "Conexões descartadas (falha no pre-ping, erro de desconexão ou reciclagem)"
+)
+CACHE_LOOKUPS = Counter(
+    "sas_cache_lookups_total",
+    "Consultas ao cache por resultado (hit local, hit no Redis ou miss)",
+    ["cache", "result"]
+)
+EVENTS_WRITTEN = Counter(
+    "sas_events_written_total",
+    "Eventos gravados no ledger por tipo",
+    ["event_type"]
+)
+LEDGER_BLOCKS = Counter(
+    "sas_ledger_blocks_written_total",
+    "Blocos gravados pelo ledger de eventos"
+)
+
+# Contadores da requisição em andamento (consultas, segundos), preenchidos pelos eventos da engine
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db", default=None)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Conteúdo do /metrics (agregado entre processos no modo multiprocess)"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def instrument_engine(async_engine):
+    """Mede consultas e espera por conexões de uma engine assíncrona"""
+    sync_engine = async_engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info["query_start"].pop()
+        DB_QUERY_SECONDS.observe(elapsed)
+        stats = _request_db.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+
+    @event.listens_for(sync_engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        POOL_CONNECTIONS_OPENED.inc()
+
+    @event.listens_for(sync_engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(sync_engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        POOL_CHECKED_OUT.dec()
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _invalidate(dbapi_connection, connection_record, exception):
+        POOL_CONNECTIONS_INVALIDATED.inc()
+
+    pool = sync_engine.pool
+    if hasattr(pool, "size"):
+        POOL_SIZE.set(pool.size())
+
+    # O pool não tem evento antes do checkout: medir em volta de pool.connect()
+    connect = pool.connect
+
+    def timed_connect():
+        start = perf_counter()
+        try:
+            return connect()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(perf_counter() - start)
+
+    pool.connect = timed_connect
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que registra latência e uso do banco por rota.
+
+    A rota é o template do path (ex: /v1.3/cbsd/{fcc_id}/{cbsd_serial_number}),
+    obtido do endpoint resolvido pelo roteador, para manter a cardinalidade
+    dos rótulos limitada. Os filhos rotulados dos histogramas são guardados em
+    dicionários para evitar labels() a cada requisição.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Optional[Dict[Any, str]] = None
+        self._latency: Dict[Tuple[str, str, int], Any] = {}
+        self._db: Dict[str, Tuple[Any, Any]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = [0, 0.0]
+        token = _request_db.set(stats)
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            _request_db.reset(token)
+            route = self._route_for(scope)
+            key = (scope["method"], route, status)
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = REQUEST_LATENCY.labels(scope["method"], route, str(status))
+            latency.observe(elapsed)
+            db = self._db.get(route)
+            if db is None:
+                db = self._db[route] = (REQUEST_DB_QUERIES.labels(route), REQUEST_DB_SECONDS.labels(route))
+            db[0].observe(stats[0])
+            db[1].observe(stats[1])
+
+    def _route_for(self, scope) -> str:
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+        return self._routes.get(scope.get("endpoint"), "<unmatched>")
@@ -0,0 +1,245 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from src.config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class FakePubSub:
+    """PubSub em memória compatível com o subconjunto de redis.asyncio usado pelos serviços"""
+
+    def __init__(self, server: "FakeRedis"):
+        self._server = server
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._channels: List[str] = []
+
+    async def subscribe(self, *channels: str):
+        for channel in channels:
+            self._server._subscribers.setdefault(channel, []).append(self._queue)
+            self._channels.append(channel)
+
+    async def listen(self):
+        while True:
+            yield await self._queue.get()
+
+    async def close(self):
+        for channel in self._channels:
+            queues = self._server._subscribers.get(channel, [])
+            if self._queue in queues:
+                queues.remove(self._queue)
+        self._channels = []
+
+
+class FakeRedis:
+    """Substituto local do Redis (redis_url="memory://") para testes e desenvolvimento.
+
+    Uma mesma instância pode ser compartilhada por vários serviços para simular
+    múltiplos workers no mesmo processo.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+    async def ping(self):
+        return True
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None, nx: bool = False):
+        if nx and await self.get(key) is not None:
+            return None
+        self._data[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    async def delete(self, *keys: str):
+        return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    async def publish(self, channel: str, message: str):
+        queues = self._subscribers.get(channel, [])
+        for queue in queues:
+            queue.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(queues)
+
+    def pubsub(self) -> FakePubSub:
+        return FakePubSub(self)
+
+    async def close(self):
+        pass
+
+
+def create_redis_client(settings: Settings):
+    """Cria o cliente Redis compartilhado (FakeRedis para "memory://", None se não configurado)"""
+    if settings.redis_url == "memory://":
+        return FakeRedis()
+    if settings.redis_url:
+        import redis.asyncio as aioredis
+        return aioredis.from_url(settings.redis_url, decode_responses=True)
+    return None
+
+
+async def connect_redis(client):
+    """Verifica a conexão; retorna None (modo apenas local) se o Redis estiver indisponível"""
+    if client is None:
+        return None
+    try:
+        await client.ping()
+    except Exception as e:
+        logger.warning(f"Redis indisponível, estado compartilhado entre workers desabilitado: {e}")
+        return None
+    return client
+
+
+class ChannelSubscriber:
+    """Assina um canal pub/sub e entrega cada mensagem ao callback, reconectando em falhas.
+
+    Após uma falha mensagens podem ter sido perdidas, então on_reset é chamado
+    para que o serviço descarte ou reconstrua seu estado local: logo após a
+    falha e de novo depois de voltar a assinar o canal (o que foi publicado
+    entre as duas chamadas só é recuperado pela segunda). `connected` é falso
+    do início até a primeira assinatura e entre uma falha e a recuperação.
+    """
+
+    def __init__(
+        self,
+        redis,
+        channel: str,
+        on_message: Callable[[str], None],
+        on_reset: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        self.redis = redis
+        self.channel = channel
+        self.on_message = on_message
+        self.on_reset = on_reset
+        self._task: Optional[asyncio.Task] = None
+        self._connected: Optional[asyncio.Event] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._connected is not None and self._connected.is_set()
+
+    def start(self):
+        self._connected = asyncio.Event()
+        self._task = asyncio.create_task(self._listen())
+
+    async def wait_connected(self, timeout: float):
+        """Espera a primeira assinatura (até timeout segundos)"""
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self):
+        resync = False
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                if resync and self.on_reset:
+                    await self.on_reset()
+                resync = False
+                self._connected.set()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.on_message(message["data"])
+            except asyncio.CancelledError:
+                await pubsub.close()
+                raise
+            except Exception as e:
+                self._connected.clear()
+                logger.warning(f"Assinatura do canal {self.channel} interrompida: {e}")
+                await pubsub.close()
+                if self.on_reset:
+                    await self.on_reset()
+                resync = True
+                await asyncio.sleep(1)
+
+
+class ReplicatedState:
+    """Base para estruturas em memória carregadas do banco e replicadas entre workers.
+
+    Subclasses definem `channel`, `load(db)` (reconstrução completa) e
+    `apply(message)` (aplica uma mudança publicada por outro worker). As
+    operações devem ser idempotentes.
+    """
+
+    channel = ""
+
+    def __init__(self):
+        self._node_id = uuid.uuid4().hex
+        self._redis = None
+        self._subscriber: Optional[ChannelSubscriber] = None
+        self._session_factory = None
+
+    async def load(self, db):
+        raise NotImplementedError
+
+    def apply(self, message: dict):
+        raise NotImplementedError
+
+    @property
+    def replicated(self) -> bool:
+        """True se as mudanças dos outros workers estão chegando (canal de replicação assinado)"""
+        return self._subscriber is not None and self._subscriber.connected
+
+    async def start(self, redis=None, session_factory=None):
+        """Carrega o estado do banco e assina o canal de replicação (se houver Redis)"""
+        self._session_factory = session_factory
+        self._redis = redis
+        if redis is not None:
+            # Assina antes do load: uma mudança publicada durante a carga não se perde
+            self._subscriber = ChannelSubscriber(redis, self.channel, self._on_message, self.reload)
+            self._subscriber.start()
+            await self._subscriber.wait_connected(timeout=5)
+        if session_factory is not None:
+            await self.reload()
+
+    async def stop(self):
+        if self._subscriber:
+            await self._subscriber.stop()
+            self._subscriber = None
+
+    async def reload(self):
+        if self._session_factory is None:
+            return
+        try:
+            async with self._session_factory() as db:
+                await self.load(db)
+        except Exception as e:
+            logger.warning(f"Falha ao carregar {type(self).__name__}: {e}")
+
+    async def publish(self, message: dict):
+        if self._redis is None:
+            return
+        message["origin"] = self._node_id
+        try:
+            await self._redis.publish(self.channel, json.dumps(message))
+        except Exception as e:
+            logger.warning(f"Falha ao replicar {type(self).__name__}: {e}")
+
+    def _on_message(self, data: str):
+        message = json.loads(data)
+        if message.get("origin") != self._node_id:
+            self.apply(message)
@@ -0,0 +1,60 @@
+import json
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from src.services.tracing import trace_phase
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele usa o json da biblioteca padrão
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Tipos sem serialização nativa: modelos Pydantic (campos simples) e datas no fallback json"""
+    if isinstance(value, BaseModel):
+        return value.__dict__
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serializa para JSON compacto em UTF-8 (orjson quando disponível)"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@lru_cache(maxsize=4096)
+def load_json_field(text: str) -> Any:
+    """Decodifica uma coluna JSON imutável (ex: meas_capability) uma vez por valor distinto.
+
+    O objeto retornado é compartilhado entre chamadas e não deve ser alterado.
+    """
+    return loads(text)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializada com orjson.
+
+    Handlers que retornam FastJSONResponse(conteúdo) diretamente evitam o
+    jsonable_encoder do FastAPI: dicts, listas e modelos Pydantic de campos
+    simples vão direto para o serializador.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with trace_phase("serialize"):
+            return dumps(content)
@@ -0,0 +1,292 @@
+import logging
+import math
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import Settings
+from src.models.cbsd import CBSD
+from src.models.grant import Grant
+from src.services.pubsub import ReplicatedState
+
+logger = logging.getLogger(__name__)
+
+Cell = Tuple[int, int]
+
+
+class _Node:
+    __slots__ = ("low", "high", "key", "priority", "max_high", "left", "right")
+
+    def __init__(self, low: int, high: int, key: str):
+        self.low = low
+        self.high = high
+        self.key = key
+        self.priority = random.random()
+        self.max_high = high
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+    def update(self):
+        max_high = self.high
+        if self.left is not None and self.left.max_high > max_high:
+            max_high = self.left.max_high
+        if self.right is not None and self.right.max_high > max_high:
+            max_high = self.right.max_high
+        self.max_high = max_high
+
+
+def _rotate_right(node: _Node) -> _Node:
+    pivot = node.left
+    node.left = pivot.right
+    pivot.right = node
+    node.update()
+    pivot.update()
+    return pivot
+
+
+def _rotate_left(node: _Node) -> _Node:
+    pivot = node.right
+    node.right = pivot.left
+    pivot.left = node
+    node.update()
+    pivot.update()
+    return pivot
+
+
+class IntervalTree:
+    """Árvore de intervalos semiabertos [low, high) sobre uma treap aumentada com max_high.
+
+    Inserção e remoção em O(log n) esperado; consulta de sobreposição em O(log n + k).
+    """
+
+    def __init__(self):
+        self._root: Optional[_Node] = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, low: int, high: int, key: str):
+        self._root = self._insert(self._root, _Node(low, high, key))
+        self._size += 1
+
+    def remove(self, low: int, key: str) -> bool:
+        self._root, removed = self._remove(self._root, low, key)
+        if removed:
+            self._size -= 1
+        return removed
+
+    def overlapping(self, low: int, high: int) -> List[str]:
+        """Chaves dos intervalos que se sobrepõem a [low, high)"""
+        found: List[str] = []
+        self._query(self._root, low, high, found)
+        return found
+
+    def _insert(self, node: Optional[_Node], new: _Node) -> _Node:
+        if node is None:
+            return new
+        if (new.low, new.key) < (node.low, node.key):
+            node.left = self._insert(node.left, new)
+            if node.left.priority > node.priority:
+                node = _rotate_right(node)
+        else:
+            node.right = self._insert(node.right, new)
+            if node.right.priority > node.priority:
+                node = _rotate_left(node)
+        node.update()
+        return node
+
+    def _remove(self, node: Optional[_Node], low: int, key: str):
+        if node is None:
+            return None, False
+        if (low, key) == (node.low, node.key):
+            if node.left is None:
+                return node.right, True
+            if node.right is None:
+                return node.left, True
+            # Desce o nó pela rotação até virar folha
+            if node.left.priority > node.right.priority:
+                node = _rotate_right(node)
+                node.right, removed = self._remove(node.right, low, key)
+            else:
+                node = _rotate_left(node)
+                node.left, removed = self._remove(node.left, low, key)
+        elif (low, key) < (node.low, node.key):
+            node.left, removed = self._remove(node.left, low, key)
+        else:
+            node.right, removed = self._remove(node.right, low, key)
+        node.update()
+        return node, removed
+
+    def _query(self, node: Optional[_Node], low: int, high: int, found: List[str]):
+        if node is None or node.max_high <= low:
+            return
+        self._query(node.left, low, high, found)
+        if node.low >= high:
+            # Toda a subárvore direita começa depois do intervalo consultado
+            return
+        if node.high > low:
+            found.append(node.key)
+        self._query(node.right, low, high, found)
+
+
+@dataclass
+class IndexedGrant:
+    grant_id: str
+    fcc_id: str
+    channel_type: str
+    low_frequency: int
+    high_frequency: int
+    cell: Cell
+
+
+class SpectrumIndex(ReplicatedState):
+    """Índice em memória dos grants ativos, por (tipo de canal, célula geográfica).
+
+    A célula é uma grade de spectrum_cell_degrees graus sobre a localização do
+    CBSD; consultas examinam a célula do CBSD e as 8 vizinhas. Um grant conflita
+    com grants ativos de outros CBSDs que se sobrepõem em frequência e cujo tipo
+    de canal é protegido (PAL por padrão); GAA com GAA compartilham o espectro.
+    """
+
+    channel = "sas:spectrum"
+
+    def __init__(
+        self,
+        cell_degrees: float = 0.5,
+        coordinate_scale: int = 1000000,
+        protected_channel_types: Optional[Set[str]] = None
+    ):
+        super().__init__()
+        self.cell_degrees = cell_degrees
+        self.coordinate_scale = coordinate_scale
+        self.protected_channel_types = protected_channel_types if protected_channel_types is not None else {"PAL"}
+        self._trees: Dict[Tuple[str, Cell], IntervalTree] = {}
+        self._grants: Dict[str, IndexedGrant] = {}
+        self._by_cbsd: Dict[str, Set[str]] = {}
+
+    def __len__(self):
+        return len(self._grants)
+
+    def __contains__(self, grant_id: str):
+        return grant_id in self._grants
+
+    def get(self, grant_id: str) -> Optional[IndexedGrant]:
+        return self._grants.get(grant_id)
+
+    def cell_for(self, latitude: int, longitude: int) -> Cell:
+        """Célula da grade para coordenadas inteiras (graus × coordinate_scale)"""
+        size = self.cell_degrees * self.coordinate_scale
+        return (math.floor(latitude / size), math.floor(longitude / size))
+
+    def add(self, grant_id: str, fcc_id: str, channel_type: str, low: int, high: int, cell: Cell):
+        if grant_id in self._grants:
+            return
+        grant = IndexedGrant(grant_id, fcc_id, channel_type, low, high, tuple(cell))
+        self._grants[grant_id] = grant
+        self._by_cbsd.setdefault(fcc_id, set()).add(grant_id)
+        tree = self._trees.get((channel_type, grant.cell))
+        if tree is None:
+            tree = self._trees[(channel_type, grant.cell)] = IntervalTree()
+        tree.insert(low, high, grant_id)
+
+    def remove(self, grant_id: str) -> bool:
+        grant = self._grants.pop(grant_id, None)
+        if grant is None:
+            return False
+        grant_ids = self._by_cbsd.get(grant.fcc_id)
+        if grant_ids is not None:
+            grant_ids.discard(grant_id)
+            if not grant_ids:
+                del self._by_cbsd[grant.fcc_id]
+        key = (grant.channel_type, grant.cell)
+        tree = self._trees[key]
+        tree.remove(grant.low_frequency, grant_id)
+        if not len(tree):
+            del self._trees[key]
+        return True
+
+    def remove_cbsd(self, fcc_id: str) -> List[str]:
+        """Remove todos os grants de um CBSD (deregistration)"""
+        grant_ids = list(self._by_cbsd.get(fcc_id, ()))
+        for grant_id in grant_ids:
+            self.remove(grant_id)
+        return grant_ids
+
+    def overlapping(self, channel_type: str, low: int, high: int, cell: Cell) -> List[str]:
+        """Grants ativos do tipo de canal na vizinhança da célula que se sobrepõem a [low, high)"""
+        found: List[str] = []
+        row, col = cell
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                tree = self._trees.get((channel_type, (row + d_row, col + d_col)))
+                if tree is not None:
+                    found.extend(tree.overlapping(low, high))
+        return found
+
+    def find_conflicts(self, fcc_id: str, low: int, high: int, cell: Cell) -> List[str]:
+        """Grants de outros CBSDs, em tipos de canal protegidos, que conflitam com [low, high)"""
+        conflicts: List[str] = []
+        for channel_type in self.protected_channel_types:
+            for grant_id in self.overlapping(channel_type, low, high, cell):
+                if self._grants[grant_id].fcc_id != fcc_id:
+                    conflicts.append(grant_id)
+        return conflicts
+
+    def clear(self):
+        self._trees.clear()
+        self._grants.clear()
+        self._by_cbsd.clear()
+
+    async def load(self, db: AsyncSession, chunk_size: int = 5000):
+        """Reconstrói o índice a partir dos grants ativos no banco"""
+        self.clear()
+        result = await db.stream(
+            select(
+                Grant.grant_id, Grant.fcc_id, Grant.channel_type,
+                Grant.low_frequency, Grant.high_frequency,
+                CBSD.latitude, CBSD.longitude
+            )
+            .join(CBSD, CBSD.fcc_id == Grant.fcc_id)
+            .where(Grant.terminated == False)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for row in result:
+            self.add(
+                row.grant_id, row.fcc_id, row.channel_type,
+                row.low_frequency, row.high_frequency,
+                self.cell_for(row.latitude, row.longitude)
+            )
+        logger.info(f"Índice de espectro carregado com {len(self)} grants ativos")
+
+    # --- Replicação entre workers ---
+
+    async def publish_added(self, grants: List[IndexedGrant]):
+        await self.publish({"op": "add", "grants": [grant.__dict__ for grant in grants]})
+
+    async def publish_removed(self, grant_ids: List[str]):
+        await self.publish({"op": "remove", "grantIds": grant_ids})
+
+    def apply(self, message: dict):
+        if message["op"] == "add":
+            for grant in message["grants"]:
+                self.add(
+                    grant["grant_id"], grant["fcc_id"], grant["channel_type"],
+                    grant["low_frequency"], grant["high_frequency"], grant["cell"]
+                )
+        elif message["op"] == "remove":
+            for grant_id in message["grantIds"]:
+                self.remove(grant_id)
+
+
+def create_spectrum_index(settings: Settings) -> SpectrumIndex:
+    """Cria o índice de espectro conforme as configurações"""
+    protected = {value.strip() for value in settings.protected_channel_types.split(",") if value.strip()}
+    return SpectrumIndex(
+        cell_degrees=settings.spectrum_cell_degrees,
+        coordinate_scale=settings.coordinate_scale,
+        protected_channel_types=protected
+    )
@@ -0,0 +1,121 @@
+import math
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import BigInteger, Boolean, bindparam, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import Settings
+from src.models.cbsd import CBSD
+from src.models.grant import Grant
+from src.services.spectrum_index import Cell, SpectrumIndex
+
+# Prefixo (16 bits mais altos) das chaves de advisory lock deste serviço
+LOCK_NAMESPACE = 0x5A5
+
+# Um lock por chave, na ordem do array (unnest preserva a ordem): exclusivo ou compartilhado
+_ACQUIRE = text(
+    "SELECT CASE WHEN exclusive THEN pg_advisory_xact_lock(key) ELSE pg_advisory_xact_lock_shared(key) END "
+    "FROM unnest(:keys, :exclusive) AS locks(key, exclusive)"
+).bindparams(
+    bindparam("keys", type_=ARRAY(BigInteger)),
+    bindparam("exclusive", type_=ARRAY(Boolean))
+)
+
+
+class Allocation(NamedTuple):
+    fcc_id: str
+    channel_type: str
+    low_frequency: int
+    high_frequency: int
+    cell: Cell
+
+
+class SpectrumLocks:
+    """Alocação de espectro consistente entre instâncias (cluster_mode, PostgreSQL).
+
+    O índice de espectro de cada instância só vê os grants das outras depois
+    da replicação, então em cluster a verificação de conflito é repetida no
+    banco, dentro da transação que insere o grant e sob advisory locks por
+    (célula, faixa de band_hz Hz). Um grant trava as faixas que ocupa na
+    própria célula (exclusivo se o tipo de canal é protegido) e nas 8 vizinhas
+    (compartilhado): duas alocações que podem conflitar sempre disputam ao
+    menos uma chave, e GAA com GAA não se bloqueiam. Os locks são obtidos em
+    ordem crescente de chave (sem deadlock) e liberados no commit, quando o
+    grant já é visível para a próxima transação.
+    """
+
+    def __init__(self, spectrum_index: SpectrumIndex, band_hz: int = 10000000):
+        self.spectrum_index = spectrum_index
+        self.band_hz = band_hz
+
+    def lock_keys(self, allocations: List[Allocation]) -> Dict[int, bool]:
+        """Chave de advisory lock -> exclusivo, para um conjunto de alocações"""
+        protected = self.spectrum_index.protected_channel_types
+        keys: Dict[int, bool] = {}
+        for allocation in allocations:
+            row, col = allocation.cell
+            exclusive = allocation.channel_type in protected
+            first_band = allocation.low_frequency // self.band_hz
+            last_band = (allocation.high_frequency - 1) // self.band_hz
+            for d_row in (-1, 0, 1):
+                for d_col in (-1, 0, 1):
+                    own_cell = exclusive and d_row == 0 and d_col == 0
+                    for band in range(first_band, last_band + 1):
+                        key = (
+                            (LOCK_NAMESPACE << 48)
+                            | (((row + d_row) & 0xFFFF) << 32)
+                            | (((col + d_col) & 0xFFFF) << 16)
+                            | (band & 0xFFFF)
+                        )
+                        keys[key] = keys.get(key, False) or own_cell
+        return keys
+
+    async def acquire(self, session: AsyncSession, allocations: List[Allocation]):
+        """Obtém (até o fim da transação) os locks das alocações, em ordem crescente de chave"""
+        keys = sorted(self.lock_keys(allocations).items())
+        await session.execute(_ACQUIRE, {"keys": [key for key, _ in keys], "exclusive": [mode for _, mode in keys]})
+
+    def neighborhood_bounds(self, cell: Cell) -> Tuple[int, int, int, int]:
+        """Limites [min, max) de latitude e longitude das 9 células em volta de cell"""
+        size = self.spectrum_index.cell_degrees * self.spectrum_index.coordinate_scale
+        row, col = cell
+        return (
+            math.ceil((row - 1) * size), math.ceil((row + 2) * size),
+            math.ceil((col - 1) * size), math.ceil((col + 2) * size)
+        )
+
+    async def find_conflicts(self, session: AsyncSession, allocation: Allocation) -> List[str]:
+        """Grants ativos no banco que conflitam com a alocação (mesmo critério do índice em memória)"""
+        min_lat, max_lat, min_lon, max_lon = self.neighborhood_bounds(allocation.cell)
+        result = await session.execute(
+            select(Grant.grant_id)
+            .join(CBSD, CBSD.fcc_id == Grant.fcc_id)
+            .where(
+                Grant.channel_type.in_(self.spectrum_index.protected_channel_types),
+                Grant.terminated == False,
+                Grant.fcc_id != allocation.fcc_id,
+                Grant.low_frequency < allocation.high_frequency,
+                Grant.high_frequency > allocation.low_frequency,
+                CBSD.latitude >= min_lat,
+                CBSD.latitude < max_lat,
+                CBSD.longitude >= min_lon,
+                CBSD.longitude < max_lon
+            )
+        )
+        return list(result.scalars())
+
+    async def lock_and_check(self, session: AsyncSession, allocations: List[Allocation]) -> List[bool]:
+        """Trava as alocações e indica, para cada uma, se conflita com grants já confirmados"""
+        await self.acquire(session, allocations)
+        return [bool(await self.find_conflicts(session, allocation)) for allocation in allocations]
+
+
+def create_spectrum_locks(settings: Settings, spectrum_index: SpectrumIndex) -> Optional[SpectrumLocks]:
+    """Cria os locks de alocação de espectro (None se cluster_mode=False)"""
+    if not settings.cluster_mode:
+        return None
+    if make_url(settings.database_url).get_backend_name() != "postgresql":
+        raise RuntimeError("cluster_mode requer PostgreSQL em DATABASE_URL")
+    return SpectrumLocks(spectrum_index, band_hz=settings.spectrum_lock_band_hz)
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, literal, select, text, true, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import Settings
+from src.models.cbsd import CBSD
+from src.models.event import Event
+from src.models.event_archive import EventArchive
+from src.models.grant import Grant
+from src.models.sas_auth import SASAuthorization
+from src.models.stats import StatsCounter
+from src.services.write_queue import WriteOperation, Writer, run_in_session
+
+logger = logging.getLogger(__name__)
+
+CBSDS = "cbsds"
+GRANTS_ACTIVE = "grants_active"
+GRANTS_TERMINATED = "grants_terminated"
+EVENTS = "events"
+SAS_AUTHORIZED = "sas_authorized"
+
+# Contadores que também têm versão por SAS ("<contador>:<sas_address>")
+PER_SAS_COUNTERS = (CBSDS, GRANTS_ACTIVE, GRANTS_TERMINATED)
+
+UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+# Advisory lock (PostgreSQL) que serializa a reconciliação com os flushes de todos os workers
+STATS_LOCK_KEY = 0x5A6 << 48
+
+
+class StatsCounters:
+    """Contadores do /stats mantidos em stats_counters em vez de COUNT(*) por chamada.
+
+    Os handlers registram deltas em memória depois de cada commit; o flush
+    aplica os deltas acumulados com um único UPSERT (value = value + delta) e
+    relê a tabela, de modo que o /stats responde da memória sem consultar o
+    banco. A reconciliação recalcula tudo com COUNT/GROUP BY na inicialização
+    (tabela vazia) e a cada reconcile_interval, corrigindo deltas perdidos em
+    uma queda do processo.
+
+    A reconciliação conta e grava num único INSERT ... SELECT, sob um lock
+    exclusivo que os flushes (de qualquer worker) pegam compartilhado: um
+    flush concorrente espera e soma seus deltas depois, em vez de ser
+    sobrescrito. Deltas ainda não gravados de commits que entram na contagem
+    (de outros workers, ou deste quando o handler ainda não os registrou) são
+    somados de novo quando gravados (no máximo flush_interval de escritas),
+    até a próxima reconciliação. As duas gravações passam pelo writer da API
+    quando informado no start, como as demais escritas.
+    """
+
+    def __init__(self, flush_interval: float = 1.0, reconcile_interval: float = 3600):
+        self.flush_interval = flush_interval
+        self.reconcile_interval = reconcile_interval
+        self._values: Dict[str, int] = {}
+        self._pending: Dict[str, int] = {}
+        self._session_factory = None
+        # Grava pelo escritor da API (fila de escrita); sem ele, em sessão própria
+        self.writer: Optional[Writer] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._last_reconcile = 0.0
+
+    def add(self, counter: str, delta: int = 1, sas_address: Optional[str] = None):
+        """Registra uma variação já confirmada no banco"""
+        self._pending[counter] = self._pending.get(counter, 0) + delta
+        if sas_address is not None:
+            key = f"{counter}:{sas_address}"
+            self._pending[key] = self._pending.get(key, 0) + delta
+
+    def get(self, name: str) -> int:
+        return self._values.get(name, 0) + self._pending.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Totais e quebra por SAS (valores gravados + deltas ainda não gravados deste worker)"""
+        values = dict(self._values)
+        for name, delta in self._pending.items():
+            values[name] = values.get(name, 0) + delta
+        per_sas: Dict[str, Dict[str, int]] = {}
+        for name, value in values.items():
+            counter, _, sas_address = name.partition(":")
+            if sas_address and value:
+                per_sas.setdefault(sas_address, {})[counter] = value
+        totals = {name: values.get(name, 0) for name in (CBSDS, GRANTS_ACTIVE, GRANTS_TERMINATED, EVENTS, SAS_AUTHORIZED)}
+        return {"totals": totals, "perSas": per_sas}
+
+    async def flush(self):
+        """Aplica os deltas pendentes e relê os contadores; em falha os deltas voltam para o próximo flush"""
+        pending = {name: delta for name, delta in self._pending.items() if delta}
+        self._pending = {}
+        async def write(db: AsyncSession) -> Dict[str, int]:
+            await self.lock(db, exclusive=False)
+            if pending:
+                upsert = UPSERT_DIALECTS[db.bind.dialect.name](StatsCounter)
+                await db.execute(
+                    upsert.on_conflict_do_update(
+                        index_elements=[StatsCounter.name],
+                        set_={"value": StatsCounter.value + upsert.excluded.value, "updated_at": func.now()}
+                    ),
+                    [{"name": name, "value": delta} for name, delta in pending.items()]
+                )
+            result = await db.execute(select(StatsCounter.name, StatsCounter.value))
+            return {row.name: row.value for row in result}
+
+        try:
+            values = await self._write(write)
+        except BaseException:
+            for name, delta in pending.items():
+                self._pending[name] = self._pending.get(name, 0) + delta
+            raise
+        self._values = values
+
+    async def lock(self, db: AsyncSession, exclusive: bool):
+        """Lock dos contadores até o fim da transação (no SQLite a escrita já é serializada)"""
+        if db.bind.dialect.name == "postgresql":
+            function = "pg_advisory_xact_lock" if exclusive else "pg_advisory_xact_lock_shared"
+            await db.execute(text(f"SELECT {function}(:key)"), {"key": STATS_LOCK_KEY})
+
+    def count_query(self):
+        """SELECT (name, value) com a contagem completa a partir das tabelas (usado só na reconciliação)"""
+        def per_sas(counter: str, sas_origin):
+            return literal(f"{counter}:") + sas_origin
+
+        counts = union_all(
+            # Eventos arquivados continuam contando no total
+            select(
+                literal(EVENTS).label("name"),
+                (
+                    select(func.count()).select_from(Event).scalar_subquery()
+                    + select(func.coalesce(func.sum(EventArchive.event_count), 0)).scalar_subquery()
+                ).label("value")
+            ),
+            select(literal(SAS_AUTHORIZED), func.count()).where(SASAuthorization.is_authorized == True),
+            select(literal(CBSDS), func.count()).select_from(CBSD),
+            select(per_sas(CBSDS, CBSD.sas_origin), func.count()).group_by(CBSD.sas_origin),
+            select(literal(GRANTS_ACTIVE), func.count()).where(Grant.terminated == False),
+            select(per_sas(GRANTS_ACTIVE, Grant.sas_origin), func.count())
+            .where(Grant.terminated == False).group_by(Grant.sas_origin),
+            select(literal(GRANTS_TERMINATED), func.count()).where(Grant.terminated == True),
+            select(per_sas(GRANTS_TERMINATED, Grant.sas_origin), func.count())
+            .where(Grant.terminated == True).group_by(Grant.sas_origin)
+        ).subquery("counts")
+        # WHERE true: sem ele o SQLite confunde o ON do ON CONFLICT com um JOIN
+        return select(counts.c.name, counts.c.value).where(true())
+
+    async def reconcile(self):
+        """Recalcula todos os contadores a partir das tabelas"""
+        counted: Dict[str, int] = {}
+
+        async def write(db: AsyncSession) -> Dict[str, int]:
+            await self.lock(db, exclusive=True)
+            counts = self.count_query()
+            # Contadores que sumiram da contagem (ex: SAS sem CBSDs) voltam a zero
+            await db.execute(
+                update(StatsCounter)
+                .where(StatsCounter.name.not_in(select(counts.subquery().c.name)))
+                .values(value=0, updated_at=func.now())
+            )
+            # Deltas deste worker registrados até aqui são de commits que a contagem vai enxergar
+            counted.clear()
+            counted.update(self._pending)
+            upsert = UPSERT_DIALECTS[db.bind.dialect.name](StatsCounter).from_select(["name", "value"], counts)
+            await db.execute(
+                upsert.on_conflict_do_update(
+                    index_elements=[StatsCounter.name],
+                    set_={"value": upsert.excluded.value, "updated_at": func.now()}
+                )
+            )
+            result = await db.execute(select(StatsCounter.name, StatsCounter.value))
+            return {row.name: row.value for row in result}
+
+        values = await self._write(write)
+        for name, delta in counted.items():
+            self._pending[name] -= delta
+        self._pending = {name: delta for name, delta in self._pending.items() if delta}
+        self._values = values
+        self._last_reconcile = time.monotonic()
+        logger.info(f"Contadores do /stats reconciliados ({len(values)} contadores)")
+
+    async def _write(self, operation: WriteOperation):
+        if self.writer is not None:
+            return await self.writer(operation)
+        return await run_in_session(self._session_factory, operation)
+
+    async def start(self, session_factory, writer: Optional[Writer] = None):
+        self._session_factory = session_factory
+        self.writer = writer
+        try:
+            async with session_factory() as db:
+                has_counters = await db.scalar(select(func.count()).select_from(StatsCounter))
+            if has_counters:
+                await self.flush()
+                self._last_reconcile = time.monotonic()
+            else:
+                await self.reconcile()
+        except Exception as e:
+            logger.warning(f"Falha ao carregar contadores do /stats: {e}")
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            # Não cancelar no meio de uma transação: sinalizar e esperar o loop sair
+            self._stopping.set()
+            await self._task
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Falha no flush final dos contadores: {e}")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                if self.reconcile_interval and time.monotonic() - self._last_reconcile >= self.reconcile_interval:
+                    await self.reconcile()
+                else:
+                    await self.flush()
+            except Exception as e:
+                logger.error(f"Erro ao atualizar contadores do /stats: {e}")
+
+
+def create_stats_counters(settings: Settings) -> StatsCounters:
+    """Cria os contadores do /stats conforme as configurações"""
+    return StatsCounters(
+        flush_interval=settings.stats_flush_interval,
+        reconcile_interval=settings.stats_reconcile_interval
+    )
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Dict, Optional
+
+# Fases medidas nos handlers, na ordem do cabeçalho Server-Timing:
+#   validate   do início da requisição até o handler (roteamento, leitura e validação do corpo)
+#   auth       verificação de autorização do SAS
+#   lookup     busca de CBSDs (registro em memória ou banco)
+#   conflict   verificação de conflito de espectro
+#   commit     operação de escrita e commit (ou espera na fila de escrita)
+#   ledger     envio dos eventos ao ledger
+#   serialize  serialização da resposta
+# O tempo não coberto por nenhuma fase aparece como "app" e o total como "total".
+# As fases são exclusivas: uma fase aninhada (lookup dentro de commit) é descontada da externa.
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+_current: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    """Tempos por fase de uma requisição (segundos)"""
+
+    __slots__ = ("request_id", "start", "phases", "total", "_nested")
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.start = perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.total = 0.0
+        self._nested = 0.0  # tempo das fases internas da fase em andamento
+
+    def add(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """Valor do cabeçalho Server-Timing (durações em ms)"""
+        parts = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.phases.items()]
+        parts.append(f"app;dur={max(self.total - sum(self.phases.values()), 0.0) * 1000:.3f}")
+        parts.append(f"total;dur={self.total * 1000:.3f}")
+        return ", ".join(parts)
+
+
+class trace_phase:
+    """Mede um bloco como uma fase da requisição em andamento (sem efeito fora de uma requisição).
+
+        with trace_phase("auth"):
+            authorized = await verify_sas_authorization(sas_address, db)
+    """
+
+    __slots__ = ("name", "trace", "start", "outer_nested")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        trace = self.trace = _current.get()
+        if trace is not None:
+            self.outer_nested = trace._nested
+            trace._nested = 0.0
+            self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        trace = self.trace
+        if trace is not None:
+            elapsed = perf_counter() - self.start
+            trace.add(self.name, elapsed - trace._nested)
+            trace._nested = self.outer_nested + elapsed
+        return False
+
+
+def mark_validated():
+    """Fecha a fase "validate"; chamada na primeira linha dos handlers instrumentados"""
+    trace = _current.get()
+    if trace is not None and "validate" not in trace.phases:
+        trace.add("validate", perf_counter() - trace.start)
+
+
+def create_trace_logger(settings) -> Optional[logging.Logger]:
+    """Logger do log amostrado de traces (uma linha JSON por requisição), None se trace_sample_rate=0"""
+    if settings.trace_sample_rate <= 0:
+        return None
+    trace_logger = logging.getLogger("sas.traces")
+    trace_logger.propagate = False
+    trace_logger.setLevel(logging.INFO)
+    if not trace_logger.handlers:
+        directory = os.path.dirname(settings.trace_log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = logging.FileHandler(settings.trace_log_file)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        trace_logger.addHandler(handler)
+    return trace_logger
+
+
+class TracingMiddleware:
+    """Middleware ASGI que mede as fases de cada requisição.
+
+    O ID da requisição vem do cabeçalho X-Request-ID (gerado se ausente) e é
+    devolvido na resposta junto com o Server-Timing. Uma fração sample_rate
+    das requisições é gravada no log de traces com o ID, a rota e as fases,
+    para cruzar com as linhas do .jtl em analyze_results.py --traces.
+    """
+
+    def __init__(self, app, server_timing: bool = True, sample_rate: float = 0.0,
+                 trace_logger: Optional[logging.Logger] = None):
+        self.app = app
+        self.server_timing = server_timing
+        self.sample_rate = sample_rate if trace_logger is not None else 0.0
+        self.trace_logger = trace_logger
+        self._routes: Optional[Dict[Any, str]] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")[:128]
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+        trace = RequestTrace(request_id)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                trace.total = perf_counter() - trace.start
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, request_id.encode("latin-1")))
+                if self.server_timing:
+                    headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current.set(trace)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if self.sample_rate and random.random() < self.sample_rate:
+                self._log(trace, scope, status)
+
+    def _log(self, trace: RequestTrace, scope, status: int):
+        total = trace.total or perf_counter() - trace.start
+        self.trace_logger.info(json.dumps({
+            "requestId": trace.request_id,
+            "timeStamp": round((time.time() - (perf_counter() - trace.start)) * 1000),
+            "method": scope["method"],
+            "route": self._route_for(scope),
+            "status": status,
+            "total": round(total * 1000, 3),
+            "phases": {name: round(seconds * 1000, 3) for name, seconds in trace.phases.items()},
+        }, separators=(",", ":")))
+
+    def _route_for(self, scope) -> str:
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+        return self._routes.get(scope.get("endpoint"), "<unmatched>")
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# operation(db): aplica uma alteração na sessão do escritor e retorna o resultado para a requisição
+WriteOperation = Callable[[AsyncSession], Awaitable[Any]]
+# writer(operation): executa e confirma a operação (run_write da API, pela fila quando ativa)
+Writer = Callable[[WriteOperation], Awaitable[Any]]
+
+
+async def run_in_session(session_factory, operation: WriteOperation) -> Any:
+    """Executa operation(db) em uma sessão própria seguida de commit"""
+    async with session_factory() as db:
+        result = await operation(db)
+        await db.commit()
+        return result
+
+
+class WriteQueue:
+    """Escritor único com commit em grupo para o SQLite.
+
+    As requisições enfileiram operações `operation(db)` e aguardam o próprio
+    resultado; uma única tarefa executa as pendentes na mesma transação, cada
+    uma em um SAVEPOINT, e confirma o grupo com um único COMMIT (um fsync).
+    O grupo fecha com max_batch operações ou após max_delay segundos; operações
+    que chegam durante um commit formam o grupo seguinte. A falha de uma
+    operação desfaz apenas o seu savepoint e é entregue a quem a enviou; uma
+    falha no COMMIT é entregue a todas as operações do grupo.
+
+    O escritor mantém uma conexão própria fora do pool das requisições, que
+    seguram as suas conexões enquanto aguardam o commit. O ledger, o flush das
+    estatísticas e o arquivamento de eventos também gravam por aqui (writer
+    passado no start); só o comando archive-events do manage.py, que roda em
+    outro processo, grava por fora da fila.
+    """
+
+    def __init__(self, max_batch: int = 128, max_delay: float = 0.001):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: Deque[Tuple[WriteOperation, asyncio.Future]] = deque()
+        self._engine = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def submit(self, operation: WriteOperation) -> Any:
+        """Enfileira uma operação e aguarda o commit do grupo que a contém"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((operation, future))
+        self._wakeup.set()
+        return await future
+
+    def start(self, async_engine):
+        self._engine = async_engine
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Encerra após gravar as operações já enfileiradas"""
+        if self._task:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        async with self._engine.connect() as connection:
+            async with AsyncSession(bind=connection, autoflush=False, expire_on_commit=False) as db:
+                while True:
+                    if not self._pending:
+                        if self._stopping:
+                            return
+                        self._wakeup.clear()
+                        await self._wakeup.wait()
+                        continue
+                    if len(self._pending) < self.max_batch and self.max_delay > 0 and not self._stopping:
+                        # Janela curta para agrupar requisições concorrentes no mesmo commit
+                        await asyncio.sleep(self.max_delay)
+                    batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+                    await self._commit_group(db, batch)
+
+    async def _commit_group(self, db: AsyncSession, batch: List[Tuple[WriteOperation, asyncio.Future]]):
+        done: List[Tuple[asyncio.Future, Any]] = []
+        try:
+            if db.bind.dialect.name == "sqlite":
+                # Transação explícita: sem ela o pysqlite trata o primeiro SAVEPOINT
+                # como a transação externa e o RELEASE já faria o commit. IMMEDIATE
+                # obtém o lock de escrita de uma vez, respeitando o busy_timeout.
+                await db.execute(text("BEGIN IMMEDIATE"))
+            for operation, future in batch:
+                if future.done():
+                    # Requisição cancelada (cliente desconectou) antes da vez dela
+                    continue
+                try:
+                    async with db.begin_nested():
+                        result = await operation(db)
+                except Exception as e:
+                    future.set_exception(e)
+                    continue
+                done.append((future, result))
+            await db.commit()
+        except Exception as e:
+            # Nada do grupo foi confirmado: todas as operações ainda pendentes falham
+            logger.error(f"Falha no commit em grupo de {len(batch)} operações: {e}")
+            try:
+                await db.rollback()
+            except Exception:
+                pass
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            # Objetos carregados por uma operação não devem ser vistos pelo próximo grupo
+            db.expunge_all()
+        for future, result in done:
+            if not future.done():
+                future.set_result(result)
+
+
+def create_write_queue(settings: Settings) -> Optional[WriteQueue]:
+    """Cria a fila de escrita conforme as configurações (None se desabilitada)"""
+    if not settings.write_queue_enabled:
+        return None
+    return WriteQueue(
+        max_batch=settings.write_queue_max_batch,
+        max_delay=settings.write_queue_max_delay
+    )
@@ -0,0 +1,101 @@
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.models import Base
+from src.models.database import get_async_database_url
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path):
+    """Banco SQLite novo por teste, com todas as tabelas"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'sas.db'}")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def postgres_engine():
+    """PostgreSQL de TEST_POSTGRES_URL com as tabelas recriadas (o teste é pulado sem ele)"""
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL não definido")
+    engine = create_async_engine(get_async_database_url(url))
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+@pytest.fixture
+def start_api(monkeypatch, engine, session_factory):
+    """Sobe src.api.main sobre o banco do teste, com Redis e serviços em memória novos.
+
+    Uso: ``async with start_api(write_queue_enabled=True) as client``; os
+    argumentos sobrescrevem campos de settings antes de criar os serviços.
+    """
+    import httpx
+
+    from src.api import main
+    from src.config.settings import settings
+    from src.models.database import get_db
+    from src.services import (
+        FakeRedis, create_auth_cache, create_cbsd_registry, create_event_archiver, create_event_ledger,
+        create_expiry_scheduler, create_geo_index, create_heartbeat_store, create_spectrum_index,
+        create_spectrum_locks, create_stats_counters, create_write_queue
+    )
+    from src.services.stats import EVENTS
+
+    @asynccontextmanager
+    async def start(**overrides):
+        for name, value in {"workers": 1, "cluster_mode": False, **overrides}.items():
+            monkeypatch.setattr(settings, name, value)
+        spectrum_index = create_spectrum_index(settings)
+        services = {
+            "async_engine": engine,
+            "AsyncSessionLocal": session_factory,
+            "redis_client": FakeRedis(),
+            "auth_cache": create_auth_cache(settings),
+            "spectrum_index": spectrum_index,
+            "spectrum_locks": create_spectrum_locks(settings, spectrum_index),
+            "geo_index": create_geo_index(settings),
+            "cbsd_registry": create_cbsd_registry(settings),
+            "stats_counters": create_stats_counters(settings),
+            "event_ledger": create_event_ledger(settings, on_written=lambda count: main.stats_counters.add(EVENTS, count)),
+            "write_queue": create_write_queue(settings),
+            "event_archiver": create_event_archiver(settings),
+            "expiry_scheduler": create_expiry_scheduler(settings, main.expire_due_grants),
+            "heartbeat_store": create_heartbeat_store(settings, main.flush_heartbeats),
+        }
+        for name, service in services.items():
+            monkeypatch.setattr(main, name, service)
+
+        async def test_db():
+            async with session_factory() as db:
+                yield db
+
+        monkeypatch.setitem(main.app.dependency_overrides, get_db, test_db)
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://sas") as client:
+                yield client
+
+    return start
+
+
+@pytest_asyncio.fixture
+async def client(start_api):
+    """Cliente HTTP da API com a configuração padrão (processo único, sem fila de escrita)"""
+    async with start_api() as client:
+        yield client
@@ -0,0 +1,28 @@
+"""Linhas válidas de CBSD e grant para inserir direto nas tabelas"""
+
+from typing import Any, Dict
+
+
+def cbsd_row(fcc_id: str, serial: str = "SN1", **overrides) -> Dict[str, Any]:
+    """Colunas de um CBSD válido para inserir direto na tabela"""
+    row = {
+        "fcc_id": fcc_id, "user_id": "user", "cbsd_serial_number": serial, "call_sign": "CALL",
+        "cbsd_category": "A", "air_interface": "NR", "meas_capability": "[]", "eirp_capability": 30,
+        "latitude": 0, "longitude": 0, "height": 10, "height_type": "AGL", "antenna_gain": 5,
+        "antenna_beamwidth": 60, "antenna_azimuth": 0, "cbsd_address": "0xcbsd", "sas_origin": "0xSAS",
+        "registration_timestamp": 1700000000
+    }
+    row.update(overrides)
+    return row
+
+
+def grant_row(grant_id: str, fcc_id: str, low: int = 3550000000, high: int = 3560000000, **overrides) -> Dict[str, Any]:
+    """Colunas de um grant válido para inserir direto na tabela"""
+    row = {
+        "grant_id": grant_id, "fcc_id": fcc_id, "cbsd_serial_number": "SN1", "channel_type": "PAL",
+        "max_eirp": 20, "low_frequency": low, "high_frequency": high, "requested_max_eirp": 20,
+        "requested_low_frequency": low, "requested_high_frequency": high, "grant_expire_time": 4102444800,
+        "state": "GRANTED", "sas_origin": "0xSAS", "grant_timestamp": 1700000000, "terminated": False
+    }
+    row.update(overrides)
+    return row
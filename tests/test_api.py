@@ -0,0 +1,59 @@
+from sqlalchemy import func, select
+
+from src.models.cbsd import CBSD
+
+SAS = {"X-SAS-Address": "0xSAS"}
+
+
+def registration(fcc_id: str, serial: str = "SN1") -> dict:
+    return {
+        "fccId": fcc_id, "userId": "user", "cbsdSerialNumber": serial, "callSign": "CALL",
+        "cbsdCategory": "A", "airInterface": "NR", "measCapability": [], "eirpCapability": 30,
+        "latitude": 40000000, "longitude": -75000000, "height": 10, "heightType": "AGL",
+        "indoorDeployment": False, "antennaGain": 5, "antennaBeamwidth": 60, "antennaAzimuth": 0,
+        "groupingParam": "", "cbsdAddress": "0xcbsd"
+    }
+
+
+async def test_cbsd_lifecycle_through_async_handlers(client):
+    assert (await client.post("/sas/authorize", json={"sas_address": "0xSAS"})).status_code == 200
+    assert (await client.post("/v1.3/registration", json=registration("A"), headers=SAS)).status_code == 200
+    cbsd = (await client.get("/v1.3/cbsd/A/SN1")).json()
+    assert cbsd["fccId"] == "A" and cbsd["sasOrigin"] == "0xSAS"
+
+    response = await client.post("/v1.3/grant", headers=SAS, json={
+        "fccId": "A", "cbsdSerialNumber": "SN1", "channelType": "GAA", "maxEirp": 20,
+        "lowFrequency": 3550000000, "highFrequency": 3560000000, "requestedMaxEirp": 20,
+        "requestedLowFrequency": 3550000000, "requestedHighFrequency": 3560000000, "grantExpireTime": 4102444800
+    })
+    grant_id = response.json()["grantResponse"]["grantId"]
+    [grant] = (await client.get("/v1.3/grants/A/SN1")).json()["grants"]
+    assert grant["grantId"] == grant_id and not grant["terminated"]
+
+    response = await client.post("/v1.3/relinquishment", headers=SAS, json={
+        "fccId": "A", "cbsdSerialNumber": "SN1", "grantId": grant_id
+    })
+    assert response.json()["relinquishmentResponse"]["relinquishment"] == "SUCCESS"
+    response = await client.post("/v1.3/deregistration", headers=SAS, json={"fccId": "A", "cbsdSerialNumber": "SN1"})
+    assert response.status_code == 200
+    assert (await client.get("/v1.3/cbsd/A/SN1")).status_code == 404
+    assert (await client.get("/v1.3/grants/A/SN1")).json()["grants"] == []
+
+
+async def test_unauthorized_sas_writes_nothing(client, session_factory):
+    response = await client.post("/v1.3/registration", json=registration("A"), headers=SAS)
+    assert response.status_code == 403
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count()).select_from(CBSD)) == 0
+
+
+async def test_duplicate_registration_keeps_first_cbsd(client, session_factory):
+    await client.post("/sas/authorize", json={"sas_address": "0xSAS"})
+    assert (await client.post("/v1.3/registration", json=registration("A"), headers=SAS)).status_code == 200
+    response = await client.post("/v1.3/registration", json=registration("A"), headers=SAS)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "CBSD já existe"
+    # A sessão da requisição que falhou não deixa nada pendente
+    assert (await client.get("/v1.3/cbsd/A/SN1")).status_code == 200
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count()).select_from(CBSD)) == 1
@@ -0,0 +1,95 @@
+import asyncio
+
+from src.services.auth_cache import KEY_PREFIX, SASAuthorizationCache
+from src.services.pubsub import FakeRedis
+
+
+async def started(redis) -> SASAuthorizationCache:
+    cache = SASAuthorizationCache()
+    await cache.start(redis)
+    await cache._subscriber.wait_connected(1)
+    return cache
+
+
+async def test_revoke_reaches_other_worker():
+    redis = FakeRedis()
+    first, second = await started(redis), await started(redis)
+    try:
+        await first.set("0xSAS", True, first.version)
+        assert await second.get("0xSAS") is True  # vem do Redis e fica na LRU local
+        await first.invalidate("0xSAS", False)
+        await asyncio.sleep(0.05)
+        assert second.local.get("0xSAS") is False
+        assert await second.get("0xSAS") is False
+    finally:
+        await first.stop()
+        await second.stop()
+
+
+async def test_stale_database_read_does_not_resurrect_entry():
+    redis = FakeRedis()
+    first, second = await started(redis), await started(redis)
+    try:
+        # second leu "autorizado" do banco antes do revoke feito em first
+        version = second.version
+        await first.invalidate("0xSAS", False)
+        await asyncio.sleep(0.05)
+        await second.set("0xSAS", True, version)
+        assert await second.get("0xSAS") is False
+        assert await redis.get(KEY_PREFIX + "0xSAS") == "0"
+    finally:
+        await first.stop()
+        await second.stop()
+
+
+class SlowRedis(FakeRedis):
+    """get() só responde depois de `release`, com o valor lido antes da espera"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+
+    async def get(self, key):
+        value = await super().get(key)
+        await self.release.wait()
+        return value
+
+
+async def test_stale_redis_read_does_not_overwrite_invalidation():
+    redis = SlowRedis()
+    redis.release.set()
+    first, second = await started(redis), await started(redis)
+    try:
+        await first.set("0xSAS", True, first.version)
+        redis.release.clear()
+        lookup = asyncio.create_task(second.get("0xSAS"))
+        await asyncio.sleep(0.01)
+        await first.invalidate("0xSAS", False)
+        await asyncio.sleep(0.05)
+        redis.release.set()
+        await lookup
+        assert second.local.get("0xSAS") is False
+    finally:
+        await first.stop()
+        await second.stop()
+
+
+async def test_revoke_on_one_worker_denies_on_the_other(client):
+    from src.api import main
+
+    first = main.auth_cache
+    second = await started(main.redis_client)
+    try:
+        await client.post("/sas/authorize", json={"sas_address": "0xSAS"})
+        main.auth_cache = second
+        assert (await client.get("/sas/0xSAS/authorized")).json()["authorized"] is True
+        main.auth_cache = first
+        await client.post("/sas/revoke", json={"sas_address": "0xSAS"})
+        await asyncio.sleep(0.05)
+        main.auth_cache = second
+        heartbeat = {"fccId": "A", "cbsdSerialNumber": "SN1", "grantId": "g1"}
+        response = await client.post("/v1.3/heartbeat", json=heartbeat, headers={"X-SAS-Address": "0xSAS"})
+        assert response.status_code == 403
+    finally:
+        main.auth_cache = first
+        await second.stop()
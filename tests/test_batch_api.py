@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from src.models.cbsd import CBSD
+from src.models.event import Event
+from src.models.grant import Grant
+
+SAS = {"X-SAS-Address": "0xSAS"}
+
+
+def registration(fcc_id: str, serial: str) -> dict:
+    return {
+        "fccId": fcc_id, "userId": "user", "cbsdSerialNumber": serial, "callSign": "CALL",
+        "cbsdCategory": "A", "airInterface": "NR", "measCapability": [], "eirpCapability": 30,
+        "latitude": 40000000, "longitude": -75000000, "height": 10, "heightType": "AGL",
+        "indoorDeployment": False, "antennaGain": 5, "antennaBeamwidth": 60, "antennaAzimuth": 0,
+        "groupingParam": "", "cbsdAddress": "0xcbsd"
+    }
+
+
+def grant(fcc_id: str, serial: str, low: int = 3550000000, channel_type: str = "PAL") -> dict:
+    return {
+        "fccId": fcc_id, "cbsdSerialNumber": serial, "channelType": channel_type, "maxEirp": 20,
+        "lowFrequency": low, "highFrequency": low + 10000000, "requestedMaxEirp": 20,
+        "requestedLowFrequency": low, "requestedHighFrequency": low + 10000000, "grantExpireTime": 4102444800
+    }
+
+
+def codes(response, operation: str):
+    return [item["responseCode"] for item in response.json()[f"{operation}Response"]]
+
+
+async def setup(client, *cbsds):
+    await client.post("/sas/authorize", json={"sas_address": "0xSAS"})
+    if cbsds:
+        body = {"registrationRequest": [registration(fcc_id, serial) for fcc_id, serial in cbsds]}
+        assert set(codes(await client.post("/v1.3/registration/batch", json=body, headers=SAS), "registration")) == {0}
+
+
+async def count(session_factory, table, *where):
+    async with session_factory() as db:
+        return await db.scalar(select(func.count()).select_from(table).where(*where))
+
+
+async def test_registration_batch_rejects_existing_and_repeated_cbsds(client):
+    await setup(client, ("A", "SN1"))
+    response = await client.post("/v1.3/registration/batch", headers=SAS, json={"registrationRequest": [
+        registration("A", "SN1"),  # já registrado
+        registration("B", "SN2"),
+        registration("B", "SN3"),  # fccId repetido no lote
+        registration("C", "SN2"),  # serial repetido no lote
+        registration("D", "SN4"),
+    ]})
+    assert codes(response, "registration") == [103, 0, 103, 103, 0]
+    assert response.json()["registrationResponse"][0]["registrationResponse"]["responseMessage"] == "CBSD já existe"
+    assert (await client.get("/stats")).json()["totalCbsds"] == 3
+
+
+async def test_grant_batch_reports_per_item_errors(client):
+    await setup(client, ("A", "SN1"), ("B", "SN2"))
+    response = await client.post("/v1.3/grant/batch", headers=SAS, json={"grantRequest": [
+        grant("A", "SN1"),
+        grant("B", "SN2"),  # sobrepõe o PAL de A na mesma célula
+        grant("X", "SN9"),  # CBSD não registrado
+        grant("B", "SN2", low=3600000000),
+    ]})
+    assert codes(response, "grant") == [0, 401, 103, 0]
+
+
+async def test_grant_batch_skips_cbsd_removed_before_the_write(client, session_factory, monkeypatch):
+    from src.api import main
+
+    await setup(client, ("A", "SN1"), ("B", "SN2"))
+    run_write = main.run_write
+
+    async def deregister_first(operation, db=None):
+        # Deregistration concorrente confirmada entre a validação do lote e a gravação
+        async with session_factory() as other:
+            await other.execute(delete(CBSD).where(CBSD.fcc_id == "A"))
+            await other.commit()
+        return await run_write(operation, db)
+
+    monkeypatch.setattr(main, "run_write", deregister_first)
+    response = await client.post("/v1.3/grant/batch", headers=SAS, json={"grantRequest": [
+        grant("A", "SN1"), grant("B", "SN2", low=3600000000)
+    ]})
+    assert codes(response, "grant") == [103, 0]
+    assert await count(session_factory, Grant) == 1
+    assert main.spectrum_index.find_conflicts("Z", 3550000000, 3560000000, (0, 0)) == []
+
+
+async def test_relinquishment_batch_reports_per_item_errors(client):
+    await setup(client, ("A", "SN1"))
+    response = await client.post("/v1.3/grant/batch", headers=SAS, json={"grantRequest": [grant("A", "SN1")]})
+    grant_id = response.json()["grantResponse"][0]["grantResponse"]["grantId"]
+    response = await client.post("/v1.3/relinquishment/batch", headers=SAS, json={"relinquishmentRequest": [
+        {"fccId": "B", "cbsdSerialNumber": "SN1", "grantId": grant_id},  # grant de outro CBSD
+        {"fccId": "A", "cbsdSerialNumber": "SN1", "grantId": grant_id},
+        {"fccId": "A", "cbsdSerialNumber": "SN1", "grantId": grant_id},  # repetido no lote
+        {"fccId": "A", "cbsdSerialNumber": "SN1", "grantId": "missing"},
+    ]})
+    assert codes(response, "relinquishment") == [103, 0, 500, 103]
+    response = await client.post("/v1.3/relinquishment/batch", headers=SAS, json={"relinquishmentRequest": [
+        {"fccId": "A", "cbsdSerialNumber": "SN1", "grantId": grant_id}
+    ]})
+    assert codes(response, "relinquishment") == [500]
+
+
+async def test_deregistration_batch_removes_cbsds_and_grants(client, session_factory):
+    await setup(client, ("A", "SN1"), ("B", "SN2"))
+    await client.post("/v1.3/grant/batch", headers=SAS, json={"grantRequest": [grant("A", "SN1")]})
+    response = await client.post("/v1.3/deregistration/batch", headers=SAS, json={"deregistrationRequest": [
+        {"fccId": "A", "cbsdSerialNumber": "SN1"},
+        {"fccId": "A", "cbsdSerialNumber": "SN1"},  # repetido no lote
+        {"fccId": "B", "cbsdSerialNumber": "SN9"},  # serial de outro CBSD
+    ]})
+    assert codes(response, "deregistration") == [0, 103, 103]
+    assert await count(session_factory, CBSD) == 1
+    assert await count(session_factory, Grant) == 0
+    stats = (await client.get("/stats")).json()
+    assert stats["totalCbsds"] == 1 and stats["activeGrants"] == 0
+
+
+@pytest.mark.parametrize("write_queue_enabled", [False, True])
+async def test_concurrent_batches_apply_each_item_once(start_api, session_factory, write_queue_enabled):
+    async with start_api(write_queue_enabled=write_queue_enabled) as client:
+        await setup(client)
+        body = {"registrationRequest": [registration(f"F{i}", f"SN{i}") for i in range(5)]}
+        responses = await asyncio.gather(*(
+            client.post("/v1.3/registration/batch", json=body, headers=SAS) for _ in range(3)
+        ))
+        assert all(response.status_code == 200 for response in responses)
+        assert sorted(sum((codes(response, "registration") for response in responses), [])) == [0] * 5 + [103] * 10
+        assert await count(session_factory, Event, Event.event_type == "CBSD_REGISTERED") == 5
+
+        body = {"grantRequest": [grant(f"F{i}", f"SN{i}", channel_type="GAA") for i in range(5)]}
+        response = await client.post("/v1.3/grant/batch", json=body, headers=SAS)
+        grant_ids = [item["grantResponse"]["grantId"] for item in response.json()["grantResponse"]]
+        body = {"relinquishmentRequest": [
+            {"fccId": f"F{i}", "cbsdSerialNumber": f"SN{i}", "grantId": grant_id} for i, grant_id in enumerate(grant_ids)
+        ]}
+        responses = await asyncio.gather(*(
+            client.post("/v1.3/relinquishment/batch", json=body, headers=SAS) for _ in range(3)
+        ))
+        assert all(response.status_code == 200 for response in responses)
+        assert sorted(sum((codes(response, "relinquishment") for response in responses), [])) == [0] * 5 + [500] * 10
+        assert await count(session_factory, Event, Event.event_type == "GRANT_TERMINATED") == 5
+        stats = (await client.get("/stats")).json()
+        assert (stats["activeGrants"], stats["terminatedGrants"]) == (0, 5)
+
+        body = {"deregistrationRequest": [{"fccId": f"F{i}", "cbsdSerialNumber": f"SN{i}"} for i in range(5)]}
+        responses = await asyncio.gather(*(
+            client.post("/v1.3/deregistration/batch", json=body, headers=SAS) for _ in range(3)
+        ))
+        assert all(response.status_code == 200 for response in responses)
+        assert sorted(sum((codes(response, "deregistration") for response in responses), [])) == [0] * 5 + [103] * 10
+        assert await count(session_factory, Event, Event.event_type == "CBSD_DEREGISTERED") == 5
+        stats = (await client.get("/stats")).json()
+        assert (stats["totalCbsds"], stats["terminatedGrants"]) == (0, 0)
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from sqlalchemy import insert
+
+from src.models.cbsd import CBSD
+from src.services.cbsd_registry import CBSDRegistry, RegisteredCBSD, generate_cbsd_key
+from src.services.pubsub import FakeRedis
+from tests.factories import cbsd_row
+
+
+def record(fcc_id: str, serial: str = "SN1") -> RegisteredCBSD:
+    return RegisteredCBSD(fcc_id, serial, 40000000, -75000000, "0xSAS")
+
+
+def test_evicted_record_is_a_miss_but_still_exists():
+    registry = CBSDRegistry(max_records=2)
+    for fcc_id in ("A", "B", "C"):
+        registry.add(record(fcc_id))
+    # "A" saiu da LRU: get não sabe os campos, mas a chave continua registrada
+    assert registry.get("A", "SN1") is None
+    assert registry.contains("A", "SN1")
+    assert registry.get("C", "SN1") == record("C")
+    assert len(registry) == 3
+
+
+def test_key_includes_serial_number():
+    registry = CBSDRegistry()
+    registry.add(record("A", "SN1"))
+    assert not registry.contains("A", "SN2")
+    assert registry.remove("A", "SN1")
+    assert not registry.remove("A", "SN1")
+    assert not registry.contains("A", "SN1")
+
+
+def test_keys_with_separator_do_not_collide():
+    registry = CBSDRegistry()
+    registry.add(record("A_B", "C"))
+    assert not registry.contains("A", "B_C")
+    assert registry.get("A", "B_C") is None
+    registry.add(record("A", "B_C"))
+    assert len(registry) == 2
+    assert registry.remove("A", "B_C") and registry.contains("A_B", "C")
+    assert generate_cbsd_key("A_B", "C") != generate_cbsd_key("A", "B_C")
+
+
+async def test_load_marks_ready_with_every_key(session_factory):
+    async with session_factory() as db:
+        await db.execute(insert(CBSD), [cbsd_row(f"F{i}", f"SN{i}") for i in range(5)])
+        await db.commit()
+    registry = CBSDRegistry(max_records=2)
+    assert not registry.ready
+    await registry.start(None, session_factory)
+    assert registry.ready
+    assert all(registry.contains(f"F{i}", f"SN{i}") for i in range(5))
+    assert not registry.replicated
+
+
+async def test_replication_between_workers(session_factory):
+    redis = FakeRedis()
+    first, second = CBSDRegistry(), CBSDRegistry()
+    await first.start(redis, session_factory)
+    await second.start(redis, session_factory)
+    try:
+        assert first.replicated and second.replicated
+        first.add(record("A"))
+        await first.publish_added([record("A")])
+        await asyncio.sleep(0.05)
+        assert second.contains("A", "SN1")
+        await second.publish_removed([("A", "SN1")])
+        await asyncio.sleep(0.05)
+        assert not first.contains("A", "SN1")
+    finally:
+        await first.stop()
+        await second.stop()
+    assert not first.replicated
+
+
+@pytest.mark.parametrize("workers, cluster_mode, replicated, authoritative", [
+    (1, False, False, True),
+    (4, False, False, False),
+    (4, False, True, True),
+    (1, True, True, False),
+])
+def test_registry_miss_is_final_only_when_complete(monkeypatch, workers, cluster_mode, replicated, authoritative):
+    from src.api import main
+
+    monkeypatch.setattr(main.settings, "workers", workers)
+    monkeypatch.setattr(main.settings, "cluster_mode", cluster_mode)
+    monkeypatch.setattr(main.cbsd_registry, "ready", True)
+    monkeypatch.setattr(CBSDRegistry, "replicated", property(lambda self: replicated))
+    assert main.cbsd_registry_authoritative() is authoritative
+
+
+async def test_find_cbsd_confirms_miss_in_database(monkeypatch, session_factory):
+    from src.api import main
+
+    async with session_factory() as db:
+        await db.execute(insert(CBSD), [cbsd_row("REMOTE", "SN1")])
+        await db.commit()
+    # Registro carregado, mas sem o CBSD registrado por outro worker
+    monkeypatch.setattr(main, "cbsd_registry", CBSDRegistry())
+    main.cbsd_registry.ready = True
+    monkeypatch.setattr(main.settings, "workers", 4)
+    monkeypatch.setattr(main.settings, "cluster_mode", False)
+    async with session_factory() as db:
+        found = await main.find_cbsd(db, "REMOTE", "SN1")
+        assert found is not None and found.fcc_id == "REMOTE"
+        assert main.cbsd_registry.contains("REMOTE", "SN1")
+        monkeypatch.setattr(main.settings, "workers", 1)
+        assert await main.find_cbsd(db, "MISSING", "SN1") is None
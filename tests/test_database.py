@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.config.settings import settings
+from src.models.database import configure_sqlite, get_async_database_url, get_pool_options, get_worker_pool_size
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("sqlite:///./sas.db", "sqlite+aiosqlite:///./sas.db"),
+    ("postgresql://sas:secret@db/sas", "postgresql+asyncpg://sas:secret@db/sas"),
+    ("postgresql+asyncpg://sas@db/sas", "postgresql+asyncpg://sas@db/sas"),
+])
+def test_async_url_uses_backend_driver(url, expected):
+    assert get_async_database_url(url) == expected
+
+
+def test_sqlite_file_gets_small_reused_pool(monkeypatch):
+    monkeypatch.setattr(settings, "sqlite_pool_size", 3)
+    options = get_pool_options("sqlite:///./sas.db", is_async=True)
+    assert options["pool_size"] == 3 and options["max_overflow"] == 0
+    assert options["poolclass"] is AsyncAdaptedQueuePool
+    assert "poolclass" not in get_pool_options("sqlite:///./sas.db", is_async=False)
+    # Em memória cada conexão seria outro banco: mantém o pool padrão
+    assert get_pool_options("sqlite://", is_async=True) == {}
+
+
+def test_postgres_pool_is_split_between_workers(monkeypatch):
+    monkeypatch.setattr(settings, "db_pool_size", 0)
+    monkeypatch.setattr(settings, "db_max_connections", 100)
+    monkeypatch.setattr(settings, "db_max_overflow", 5)
+    monkeypatch.setattr(settings, "workers", 4)
+    assert get_worker_pool_size() == 20
+    options = get_pool_options("postgresql://sas@db/sas", is_async=True)
+    assert options["pool_size"] + options["max_overflow"] == 25
+    assert options["pool_pre_ping"] == settings.db_pool_pre_ping
+    assert options["connect_args"] == {"prepared_statement_cache_size": settings.db_statement_cache_size}
+    assert "connect_args" not in get_pool_options("postgresql://sas@db/sas", is_async=False)
+    monkeypatch.setattr(settings, "db_pool_size", 7)
+    assert get_worker_pool_size() == 7
+    monkeypatch.setattr(settings, "db_pool_size", 0)
+    monkeypatch.setattr(settings, "workers", 200)
+    assert get_worker_pool_size() == 1
+
+
+async def test_sqlite_connections_get_pragmas(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "sqlite_busy_timeout", 1234)
+    url = f"sqlite:///{tmp_path / 'pragmas.db'}"
+    engine = create_async_engine(get_async_database_url(url), **get_pool_options(url, is_async=True))
+    configure_sqlite(engine.sync_engine, url)
+    try:
+        async with engine.connect() as connection:
+            assert (await connection.scalar(text("PRAGMA journal_mode"))) == settings.sqlite_journal_mode.lower()
+            assert await connection.scalar(text("PRAGMA busy_timeout")) == 1234
+            assert await connection.scalar(text("PRAGMA synchronous")) == 1  # NORMAL
+    finally:
+        await engine.dispose()
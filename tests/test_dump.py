@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import insert
+
+from src.models.cbsd import CBSD
+from src.models.grant import Grant
+from src.services.dump import format_cursor, iter_dump, parse_cursor
+from tests.factories import cbsd_row, grant_row
+
+
+@pytest.mark.parametrize("cursor, marks", [
+    (None, {"cbsd": 0, "grant": 0}),
+    ("", {"cbsd": 0, "grant": 0}),
+    ("cbsd:12", {"cbsd": 12, "grant": 0}),
+    ("grant:7,cbsd:3", {"cbsd": 3, "grant": 7}),
+])
+def test_parse_cursor(cursor, marks):
+    assert parse_cursor(cursor) == marks
+
+
+@pytest.mark.parametrize("cursor", ["cbsd", "cbsd:", "cbsd:-1", "cbsd:1x", "event:1", "cbsd:1;grant:2"])
+def test_parse_cursor_rejects_malformed(cursor):
+    with pytest.raises(ValueError):
+        parse_cursor(cursor)
+
+
+def test_format_cursor_round_trip():
+    marks = {"cbsd": 5, "grant": 9}
+    assert format_cursor(marks) == "cbsd:5,grant:9"
+    assert parse_cursor(format_cursor(marks)) == marks
+
+
+async def collect(session_factory, cursor=None, chunk_size=2):
+    records = []
+    async for chunk in iter_dump(session_factory, cursor, chunk_size):
+        records.extend(chunk)
+    return records
+
+
+async def seed(session_factory):
+    async with session_factory() as db:
+        await db.execute(insert(CBSD), [cbsd_row(f"F{i}", f"SN{i}") for i in range(3)])
+        await db.execute(insert(Grant), [
+            grant_row(f"G{i}", f"F{i % 3}", cbsd_serial_number=f"SN{i % 3}") for i in range(4)
+        ])
+        await db.commit()
+
+
+async def test_dump_emits_sections_in_order_with_end(session_factory):
+    await seed(session_factory)
+    records = await collect(session_factory)
+    assert [record["recordType"] for record in records] == ["cbsd"] * 3 + ["grant"] * 4 + ["end"]
+    assert records[0]["record"]["fccId"] == "F0"
+    assert records[3]["record"]["grantId"] == "G0"
+    assert records[-1]["cursor"] == "cbsd:3,grant:4"
+
+
+async def test_cursor_resumes_after_last_record(session_factory):
+    await seed(session_factory)
+    records = await collect(session_factory)
+    resumed = await collect(session_factory, records[4]["cursor"])
+    assert [record["record"]["grantId"] for record in resumed[:-1]] == ["G2", "G3"]
+    assert resumed[-1]["cursor"] == records[-1]["cursor"]
+
+
+async def test_empty_dump_has_only_end(session_factory):
+    records = await collect(session_factory)
+    assert records == [{"recordType": "end", "cursor": "cbsd:0,grant:0", "generatedAt": records[0]["generatedAt"]}]
+
+
+async def test_dump_ignores_rows_committed_after_it_started(engine, session_factory):
+    async with engine.connect() as connection:
+        # WAL: a escrita concorrente não espera a leitura do dump
+        await connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+    await seed(session_factory)
+    records = []
+    async for chunk in iter_dump(session_factory, chunk_size=2):
+        if not records:
+            async with session_factory() as db:
+                await db.execute(insert(Grant), [grant_row("LATE", "F0", cbsd_serial_number="SN0")])
+                await db.commit()
+        records.extend(chunk)
+    assert "LATE" not in {record["record"]["grantId"] for record in records if record["recordType"] == "grant"}
+    assert records[-1]["cursor"] == "cbsd:3,grant:4"
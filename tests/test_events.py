@@ -0,0 +1,86 @@
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select, update
+
+from src.models.event import Event
+from src.models.event_archive import EventArchive
+from src.services.event_archive import EventArchiver
+from src.services.ledger import EventLedger
+
+NOW = datetime(2026, 1, 10, tzinfo=timezone.utc)
+
+
+async def insert_events(session_factory):
+    """8 eventos, três deles com o mesmo created_at (desempate por id)"""
+    times = [NOW - timedelta(minutes=minutes) for minutes in (50, 40, 30, 30, 30, 20, 10, 0)]
+    async with session_factory() as db:
+        await db.execute(insert(Event), [
+            {"event_type": "GRANT_CREATED" if i % 2 else "CBSD_REGISTERED", "payload": json.dumps({"i": i}), "created_at": created_at}
+            for i, created_at in enumerate(times)
+        ])
+        await db.commit()
+
+
+async def read_pages(client, **params):
+    ids, cursor = [], None
+    while True:
+        page = (await client.get("/events/recent", params={**params, **({"cursor": cursor} if cursor else {})})).json()
+        ids.extend(event["payload"]["i"] for event in page["events"])
+        cursor = page["nextCursor"]
+        if cursor is None:
+            return ids
+
+
+async def test_recent_events_paginate_by_key_without_gaps(client, session_factory):
+    await insert_events(session_factory)
+    # Mais novo primeiro; no empate de created_at, maior id primeiro
+    assert await read_pages(client, limit=3) == [7, 6, 5, 4, 3, 2, 1, 0]
+    assert await read_pages(client, limit=2, event_type="GRANT_CREATED") == [7, 5, 3, 1]
+    window = {"since": (NOW - timedelta(minutes=30)).isoformat(), "until": NOW.isoformat()}
+    assert await read_pages(client, limit=2, **window) == [6, 5, 4, 3, 2]
+
+
+async def test_new_events_do_not_shift_later_pages(client, session_factory):
+    await insert_events(session_factory)
+    first = (await client.get("/events/recent", params={"limit": 4})).json()
+    async with session_factory() as db:
+        await db.execute(insert(Event), [{"event_type": "GRANT_CREATED", "payload": '{"i": 99}', "created_at": NOW}])
+        await db.commit()
+    second = (await client.get("/events/recent", params={"limit": 4, "cursor": first["nextCursor"]})).json()
+    assert [event["payload"]["i"] for event in second["events"]] == [3, 2, 1, 0]
+
+
+async def test_invalid_cursor_is_rejected(client):
+    response = await client.get("/events/recent", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+async def test_archive_moves_old_blocks_to_files(client, session_factory, tmp_path):
+    ledger = EventLedger(block_size=4)
+    ledger._session_factory = session_factory
+    for block in range(3):
+        ledger.extend([("GRANT_CREATED", {"block": block, "event": i}) for i in range(4)])
+        await ledger.flush()
+    async with session_factory() as db:
+        await db.execute(update(Event).where(Event.block_number <= 2).values(created_at=NOW - timedelta(days=40)))
+        await db.commit()
+
+    archiver = EventArchiver(retention_days=30, directory=str(tmp_path / "archive"), chunk_blocks=1)
+    assert await archiver.archive(session_factory, archiver.cutoff(NOW)) == 8
+    assert await archiver.archive(session_factory, archiver.cutoff(NOW)) == 0
+
+    async with session_factory() as db:
+        archives = (await db.execute(select(EventArchive).order_by(EventArchive.first_block))).scalars().all()
+        assert await db.scalar(select(func.min(Event.block_number))) == 3
+        verified = await ledger.verify(db)
+    assert [(a.first_block, a.last_block, a.event_count) for a in archives] == [(1, 1, 4), (2, 2, 4)]
+    with gzip.open(archives[1].path, "rt") as archived:
+        lines = [json.loads(line) for line in archived]
+    assert [json.loads(line["payload"]) for line in lines] == [{"block": 1, "event": i} for i in range(4)]
+    assert verified["valid"] and verified["archivedThrough"] == 2
+
+    block = (await client.get("/events/block/1")).json()
+    assert block["archived"] and block["count"] == 0
+    assert (await client.get("/events/block/3")).json()["count"] == 4
@@ -0,0 +1,90 @@
+import pytest
+
+from src.services.expiry import GRANT_EXPIRY, TRANSMIT_EXPIRY, ExpiryScheduler
+
+
+async def no_handler(kind, grant_ids, now):
+    raise AssertionError("handler não deveria ser chamado")
+
+
+def test_pop_due_in_deadline_order():
+    scheduler = ExpiryScheduler(no_handler)
+    scheduler.schedule("b", 200)
+    scheduler.schedule("a", 100)
+    scheduler.schedule("c", 300)
+    assert scheduler.next_deadline() == 100
+    assert scheduler.pop_due(250) == {GRANT_EXPIRY: ["a", "b"], TRANSMIT_EXPIRY: []}
+    assert scheduler.next_deadline() == 300
+    assert len(scheduler) == 1
+
+
+def test_cancel_discards_heap_entries():
+    scheduler = ExpiryScheduler(no_handler)
+    scheduler.schedule("a", 100)
+    scheduler.schedule("a", 150, TRANSMIT_EXPIRY)
+    scheduler.schedule("b", 200)
+    scheduler.cancel("a")
+    assert scheduler.next_deadline() == 200
+    assert scheduler.pop_due(1000) == {GRANT_EXPIRY: ["b"], TRANSMIT_EXPIRY: []}
+
+
+def test_rearm_keeps_only_latest_deadline():
+    scheduler = ExpiryScheduler(no_handler)
+    scheduler.schedule("a", 100)
+    scheduler.schedule("a", 500)
+    assert scheduler.pop_due(400) == {GRANT_EXPIRY: [], TRANSMIT_EXPIRY: []}
+    scheduler.schedule("a", 50)
+    assert scheduler.pop_due(100) == {GRANT_EXPIRY: ["a"], TRANSMIT_EXPIRY: []}
+    # Entradas antigas (100 e 500) não voltam depois que o grant venceu
+    assert scheduler.pop_due(1000) == {GRANT_EXPIRY: [], TRANSMIT_EXPIRY: []}
+    assert scheduler.next_deadline() is None
+
+
+def test_schedule_none_unschedules():
+    scheduler = ExpiryScheduler(no_handler)
+    scheduler.schedule("a", 100, TRANSMIT_EXPIRY)
+    scheduler.schedule("a", None, TRANSMIT_EXPIRY)
+    assert scheduler.next_deadline() is None
+    assert len(scheduler) == 0
+
+
+def test_heap_is_compacted_after_many_rearms():
+    scheduler = ExpiryScheduler(no_handler)
+    for expire_time in range(5000):
+        scheduler.schedule("a", 10000 - expire_time)
+    assert len(scheduler._heap) <= 2 * len(scheduler) + 1024
+    assert scheduler.pop_due(5001) == {GRANT_EXPIRY: ["a"], TRANSMIT_EXPIRY: []}
+
+
+async def test_run_once_delivers_in_batches():
+    batches = []
+
+    async def handler(kind, grant_ids, now):
+        batches.append((kind, list(grant_ids), now))
+
+    scheduler = ExpiryScheduler(handler, batch_size=2)
+    for i in range(5):
+        scheduler.schedule(f"g{i}", 100 + i)
+    scheduler.schedule("t", 100, TRANSMIT_EXPIRY)
+    assert await scheduler.run_once(now=200) == 6
+    assert [len(ids) for _, ids, _ in batches] == [1, 1, 2, 2]
+    assert {grant_id for _, ids, _ in batches for grant_id in ids} == {"g0", "g1", "g2", "g3", "g4", "t"}
+    assert all(now == 200 for _, _, now in batches)
+
+
+async def test_failed_handler_rearms_batch():
+    calls = []
+
+    async def handler(kind, grant_ids, now):
+        calls.append(list(grant_ids))
+        if len(calls) == 1:
+            raise RuntimeError("banco indisponível")
+
+    scheduler = ExpiryScheduler(handler, max_interval=5)
+    scheduler.schedule("a", 100)
+    with pytest.raises(RuntimeError):
+        await scheduler.run_once(now=100)
+    assert scheduler.next_deadline() == 105
+    assert await scheduler.run_once(now=104) == 0
+    assert await scheduler.run_once(now=105) == 1
+    assert calls == [["a"], ["a"]]
@@ -0,0 +1,105 @@
+import random
+
+import numpy as np
+from sqlalchemy import insert
+
+from src.models.cbsd import CBSD
+from src.services.geo_index import GeoIndex, haversine_km
+from tests.factories import cbsd_row
+
+SCALE = 1000000
+
+
+def test_radius_bounds_split_at_antimeridian():
+    index = GeoIndex()
+    [west, east] = index.radius_bounds(0, 179990000, 20)
+    assert west[1] < west[3] == 180 * SCALE
+    assert east[1] == -180 * SCALE < east[3] < -179 * SCALE
+    [single] = index.radius_bounds(0, 0, 20)
+    assert single[1] < 0 < single[3]
+
+
+def test_radius_search_crosses_antimeridian():
+    index = GeoIndex()
+    index.add("EAST", "SN1", 0, 179950000)
+    index.add("WEST", "SN2", 0, -179950000)
+    index.add("FAR", "SN3", 0, -179000000)
+    found = index.within_radius(0, 179990000, 20)
+    assert [cbsd.fcc_id for cbsd, _ in found] == ["EAST", "WEST"]
+    assert found[1][1] < 10
+
+
+async def test_region_loaded_from_database_crosses_antimeridian(session_factory):
+    rows = [cbsd_row("EAST", "SN1", longitude=179950000), cbsd_row("WEST", "SN2", longitude=-179950000)]
+    async with session_factory() as db:
+        await db.execute(insert(CBSD), rows)
+        await db.commit()
+        index = GeoIndex()
+        region = await index.load_region(db, index.radius_bounds(0, -179990000, 20))
+    assert {cbsd.fcc_id for cbsd, _ in region.within_radius(0, -179990000, 20)} == {"EAST", "WEST"}
+
+
+def test_queries_match_brute_force():
+    rng = random.Random(5)
+    index = GeoIndex(cell_degrees=0.05)
+    points = {}
+    for i in range(400):
+        points[f"C{i}"] = (40000000 + rng.randrange(-500000, 500000), -75000000 + rng.randrange(-500000, 500000))
+        index.add(f"C{i}", f"SN{i}", *points[f"C{i}"])
+    found = index.within_radius(40000000, -75000000, 25)
+    distances = [distance for _, distance in found]
+    assert distances == sorted(distances)
+    lats = np.array([lat for lat, _ in points.values()]) / SCALE
+    lons = np.array([lon for _, lon in points.values()]) / SCALE
+    expected = {fcc_id for fcc_id, distance in zip(points, haversine_km(40, -75, lats, lons)) if distance <= 25}
+    assert {cbsd.fcc_id for cbsd, _ in found} == expected
+    assert len(index.within_radius(40000000, -75000000, 25, limit=3)) == 3
+
+    box = (39900000, -75200000, 40100000, -74900000)
+    inside = {
+        fcc_id for fcc_id, (lat, lon) in points.items() if box[0] <= lat <= box[2] and box[1] <= lon <= box[3]
+    }
+    assert {cbsd.fcc_id for cbsd in index.within_bbox(*box)} == inside
+
+
+def test_moved_and_removed_cbsds_leave_their_cells():
+    index = GeoIndex()
+    index.add("A", "SN1", 40000000, -75000000)
+    index.add("A", "SN1", 10000000, 10000000)
+    assert index.within_bbox(39000000, -76000000, 41000000, -74000000) == []
+    assert index.remove("A") and not index.remove("A")
+    assert index._cells == {}
+
+
+async def test_geo_endpoints(client):
+    await client.post("/sas/authorize", json={"sas_address": "0xSAS"})
+    for fcc_id, serial, latitude, longitude in [
+        ("A", "SN1", 40000000, -75000000), ("B", "SN2", 40050000, -75000000), ("C", "SN3", 41000000, -75000000)
+    ]:
+        body = {
+            "fccId": fcc_id, "userId": "user", "cbsdSerialNumber": serial, "callSign": "CALL",
+            "cbsdCategory": "A", "airInterface": "NR", "measCapability": [], "eirpCapability": 30,
+            "latitude": latitude, "longitude": longitude, "height": 10, "heightType": "AGL",
+            "indoorDeployment": False, "antennaGain": 5, "antennaBeamwidth": 60, "antennaAzimuth": 0,
+            "groupingParam": "", "cbsdAddress": "0xcbsd"
+        }
+        await client.post("/v1.3/registration", json=body, headers={"X-SAS-Address": "0xSAS"})
+
+    nearby = (await client.get("/v1.3/cbsds/nearby", params={
+        "latitude": 40000000, "longitude": -75000000, "radiusKm": 10
+    })).json()
+    assert [cbsd["fccId"] for cbsd in nearby["cbsds"]] == ["A", "B"]
+    assert nearby["cbsds"][0]["distanceKm"] == 0 and 5 < nearby["cbsds"][1]["distanceKm"] < 6
+
+    neighbors = (await client.get("/v1.3/cbsd/A/SN1/neighbors", params={"radiusKm": 200})).json()
+    assert [cbsd["fccId"] for cbsd in neighbors["cbsds"]] == ["B", "C"]
+    assert (await client.get("/v1.3/cbsd/A/SN9/neighbors", params={"radiusKm": 10})).status_code == 404
+
+    bbox = (await client.get("/v1.3/cbsds/bbox", params={
+        "minLatitude": 40500000, "minLongitude": -76000000, "maxLatitude": 41000000, "maxLongitude": -75000000
+    })).json()
+    assert bbox == {"cbsds": [{"fccId": "C", "cbsdSerialNumber": "SN3", "latitude": 41000000, "longitude": -75000000}], "count": 1}
+    response = await client.get("/v1.3/cbsds/bbox", params={
+        "minLatitude": 41000000, "minLongitude": -76000000, "maxLatitude": 40000000, "maxLongitude": -75000000
+    })
+    assert response.status_code == 400
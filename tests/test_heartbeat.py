@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from src.models.cbsd import CBSD
+from src.models.event import Event
+from src.models.grant import Grant
+from src.services.heartbeat import HeartbeatState, HeartbeatStore
+from tests.factories import cbsd_row, grant_row
+
+SAS = {"X-SAS-Address": "0xSAS"}
+
+
+def state(grant_id: str = "g1") -> HeartbeatState:
+    return HeartbeatState(grant_id, "A", "SN1", grant_expire_time=10000)
+
+
+async def test_heartbeats_coalesce_until_flush():
+    flushed = []
+
+    async def handler(states):
+        flushed.append([(s.grant_id, s.transmit_expire_time, s.newly_authorized) for s in states])
+
+    store = HeartbeatStore(handler, transmit_expire_seconds=240)
+    first = state()
+    store.put(first)
+    assert store.record(first, 100, "0xSAS") == 340
+    assert store.record(first, 200, "0xSAS") == 440
+    assert store.pending == 1
+    assert await store.flush() == 1
+    assert flushed == [[("g1", 440, True)]]
+    # Já autorizado: renovação sem nova transição
+    store.record(first, 300, "0xSAS")
+    await store.flush()
+    assert flushed[-1] == [("g1", 540, False)]
+    assert await store.flush() == 0
+
+
+def test_transmit_expire_time_is_capped_by_grant_expiry():
+    store = HeartbeatStore(None, transmit_expire_seconds=240)
+    assert store.record(state(), 9900, "0xSAS") == 10000
+
+
+def test_lapsed_authorization_is_authorized_again():
+    store = HeartbeatStore(None, transmit_expire_seconds=240)
+    current = state()
+    store.record(current, 100, "0xSAS")
+    current.newly_authorized = False
+    assert current.authorized(339) and not current.authorized(340)
+    store.record(current, 400, "0xSAS")
+    assert current.newly_authorized
+
+
+async def test_failed_flush_keeps_entries_for_the_next_one():
+    calls = []
+
+    async def handler(states):
+        calls.append(len(states))
+        if len(calls) == 1:
+            raise RuntimeError("banco indisponível")
+
+    store = HeartbeatStore(handler)
+    for grant_id in ("g1", "g2"):
+        store.put(state(grant_id))
+        store.record(store.get(grant_id), 100, "0xSAS")
+    with pytest.raises(RuntimeError):
+        await store.flush()
+    store.remove("g2")  # terminado enquanto isso: não volta a ser gravado
+    assert await store.flush() == 1
+    assert calls == [2, 1]
+
+
+async def test_stop_waits_for_running_flush_and_writes_the_rest():
+    started, release = asyncio.Event(), asyncio.Event()
+    flushed = []
+
+    async def handler(states):
+        started.set()
+        await release.wait()
+        flushed.extend(s.grant_id for s in states)
+
+    store = HeartbeatStore(handler, flush_interval=0.01)
+    store.put(state("g1"))
+    store.record(store.get("g1"), 100, "0xSAS")
+    store.start()
+    await started.wait()
+    # Heartbeat recebido durante o flush em andamento
+    store.put(state("g2"))
+    store.record(store.get("g2"), 100, "0xSAS")
+    stopping = asyncio.create_task(store.stop())
+    await asyncio.sleep(0.05)
+    assert not stopping.done()
+    release.set()
+    await stopping
+    assert flushed == ["g1", "g2"]
+    assert store.pending == 0
+
+
+async def granted(session_factory):
+    async with session_factory() as db:
+        await db.execute(insert(CBSD), [cbsd_row("A")])
+        await db.execute(insert(Grant), [
+            grant_row("g1", "A"), grant_row("g2", "A", 3600000000, 3610000000, terminated=True, state="TERMINATED")
+        ])
+        await db.commit()
+
+
+async def test_heartbeat_authorizes_grant_on_flush(client, session_factory):
+    from src.api import main
+
+    await granted(session_factory)
+    await client.post("/sas/authorize", json={"sas_address": "0xSAS"})
+    response = await client.post("/v1.3/heartbeat", headers=SAS, json={
+        "fccId": "A", "cbsdSerialNumber": "SN1", "grantId": "g1"
+    })
+    body = response.json()["heartbeatResponse"]
+    assert body["heartbeat"] == "SUCCESS" and body["transmitExpireTime"] > 0
+    async with session_factory() as db:
+        assert await db.scalar(select(Grant.state).where(Grant.grant_id == "g1")) == "GRANTED"
+    await main.heartbeat_store.flush()
+    async with session_factory() as db:
+        row = (await db.execute(select(Grant.state, Grant.transmit_expire_time).where(Grant.grant_id == "g1"))).one()
+        assert tuple(row) == ("AUTHORIZED", body["transmitExpireTime"])
+        events = select(func.count()).select_from(Event).where(Event.event_type == "GRANT_AUTHORIZED")
+        assert await db.scalar(events) == 1
+
+    # Já autorizado, o CBSD informa que está transmitindo
+    response = await client.post("/v1.3/heartbeat", headers=SAS, json={
+        "fccId": "A", "cbsdSerialNumber": "SN1", "grantId": "g1", "operationState": "AUTHORIZED"
+    })
+    assert response.json()["heartbeatResponse"]["heartbeat"] == "SUCCESS"
+
+
+async def test_transmitting_without_authorization_is_unsync(client, session_factory):
+    from src.api import main
+
+    await granted(session_factory)
+    await client.post("/sas/authorize", json={"sas_address": "0xSAS"})
+    item = {"fccId": "A", "cbsdSerialNumber": "SN1", "grantId": "g1", "operationState": "AUTHORIZED"}
+    response = await client.post("/v1.3/heartbeat", headers=SAS, json=item)
+    assert response.status_code == 409
+    response = await client.post("/v1.3/heartbeat/batch", headers=SAS, json={"heartbeatRequest": [item]})
+    assert response.json()["heartbeatResponse"][0]["responseCode"] == 502
+    assert main.heartbeat_store.pending == 0
+    response = await client.post("/v1.3/heartbeat", headers=SAS, json={**item, "operationState": "IDLE"})
+    assert response.status_code == 422
+
+
+async def test_heartbeat_batch_reports_per_item_errors(client, session_factory):
+    await granted(session_factory)
+    await client.post("/sas/authorize", json={"sas_address": "0xSAS"})
+    response = await client.post("/v1.3/heartbeat/batch", headers=SAS, json={"heartbeatRequest": [
+        {"fccId": "A", "cbsdSerialNumber": "SN1", "grantId": "g1"},
+        {"fccId": "A", "cbsdSerialNumber": "SN1", "grantId": "g2"},  # terminado
+        {"fccId": "A", "cbsdSerialNumber": "SN1", "grantId": "missing"},
+        {"fccId": "A", "cbsdSerialNumber": "SN9", "grantId": "g1"},  # grant de outro CBSD
+    ]})
+    assert [item["responseCode"] for item in response.json()["heartbeatResponse"]] == [0, 500, 103, 103]
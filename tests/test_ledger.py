@@ -0,0 +1,84 @@
+import asyncio
+
+from sqlalchemy import select, update
+
+from src.models.event import Event
+from src.models.ledger import LedgerBlock
+from src.services.ledger import GENESIS_HASH, EventLedger, event_hash
+
+
+async def write_blocks(session_factory, blocks: int = 3, events_per_block: int = 4) -> EventLedger:
+    ledger = EventLedger(block_size=events_per_block)
+    ledger._session_factory = session_factory
+    for block in range(blocks):
+        ledger.extend([("grant", {"block": block, "event": i}) for i in range(events_per_block)])
+        await ledger.flush()
+    return ledger
+
+
+async def test_blocks_are_chained(session_factory):
+    ledger = await write_blocks(session_factory)
+    assert (ledger.blocks_written, ledger.events_written) == (3, 12)
+    async with session_factory() as db:
+        blocks = (await db.execute(select(LedgerBlock).order_by(LedgerBlock.block_number))).scalars().all()
+        first_events = (await db.execute(
+            select(Event).where(Event.block_number == 1).order_by(Event.id)
+        )).scalars().all()
+    assert [block.block_number for block in blocks] == [1, 2, 3]
+    assert blocks[0].previous_hash == GENESIS_HASH
+    assert all(block.previous_hash == previous.block_hash for previous, block in zip(blocks, blocks[1:]))
+    current = GENESIS_HASH
+    for event in first_events:
+        current = event_hash(current, event.event_type, event.payload)
+        assert event.transaction_hash == current
+    assert blocks[0].block_hash == current
+
+
+async def test_verify_accepts_untouched_chain(session_factory):
+    await write_blocks(session_factory)
+    async with session_factory() as db:
+        result = await EventLedger().verify(db, chunk_size=5)
+    assert result["valid"] and result["firstInvalidBlock"] is None
+    assert (result["blocks"], result["events"]) == (3, 12)
+
+
+async def test_verify_detects_edited_payload(session_factory):
+    await write_blocks(session_factory)
+    async with session_factory() as db:
+        event_id = await db.scalar(select(Event.id).where(Event.block_number == 2).order_by(Event.id).offset(1))
+        await db.execute(update(Event).where(Event.id == event_id).values(payload='{"forged": true}'))
+        await db.commit()
+        result = await EventLedger().verify(db)
+    assert not result["valid"]
+    assert result["firstInvalidBlock"] == 2
+
+
+async def test_verify_detects_deleted_event(session_factory):
+    await write_blocks(session_factory)
+    async with session_factory() as db:
+        last_id = await db.scalar(select(Event.id).where(Event.block_number == 3).order_by(Event.id.desc()))
+        await db.execute(Event.__table__.delete().where(Event.id == last_id))
+        await db.commit()
+        result = await EventLedger().verify(db)
+    assert result["firstInvalidBlock"] == 3
+
+
+async def test_verify_detects_rewritten_block(session_factory):
+    await write_blocks(session_factory)
+    async with session_factory() as db:
+        # O hash do bloco deixa de conferir com o último evento e com o previous_hash do bloco 2
+        await db.execute(update(LedgerBlock).where(LedgerBlock.block_number == 1).values(block_hash="0x" + "1" * 64))
+        await db.commit()
+        result = await EventLedger().verify(db)
+    assert result["firstInvalidBlock"] == 1
+
+
+async def test_request_flush_closes_block_before_interval(session_factory):
+    ledger = EventLedger(block_size=256, block_interval=60)
+    ledger.start(session_factory)
+    try:
+        block = ledger.append("registration", {"fccId": "F1"})
+        ledger.request_flush()
+        assert await asyncio.wait_for(block, timeout=5) == 1
+    finally:
+        await ledger.stop()
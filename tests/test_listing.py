@@ -0,0 +1,80 @@
+import base64
+
+import pytest
+from sqlalchemy import insert
+
+from src.models.cbsd import CBSD
+from src.models.grant import Grant
+from tests.factories import cbsd_row, grant_row
+
+
+async def read_pages(client, path, key, **params):
+    items, cursor = [], None
+    while True:
+        page = (await client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})).json()
+        assert page.get("count", len(page[key])) == len(page[key])
+        items.extend(page[key])
+        cursor = page["nextCursor"]
+        if cursor is None:
+            return items
+
+
+@pytest.fixture
+async def listed(session_factory):
+    """6 CBSDs de dois SAS e 12 grants em faixas de 10 MHz a partir de 3550 MHz.
+
+    Pedido antes de client: o registro de CBSDs da API carrega a tabela na inicialização.
+    """
+    async with session_factory() as db:
+        await db.execute(insert(CBSD), [
+            cbsd_row(f"C{i}", f"SN{i}", sas_origin="0xSAS" if i % 2 else "0xOTHER", cbsd_category="B" if i < 2 else "A",
+                     latitude=40000000 + i * 100000, longitude=-75000000 - i * 100000)
+            for i in range(6)
+        ])
+        await db.execute(insert(Grant), [
+            grant_row(
+                f"g{i}", "C0", 3550000000 + i * 10000000, 3560000000 + i * 10000000, cbsd_serial_number="SN0",
+                sas_origin="0xSAS" if i % 2 else "0xOTHER", channel_type="GAA" if i % 3 == 0 else "PAL",
+                state="AUTHORIZED" if i < 4 else "GRANTED"
+            )
+            for i in range(12)
+        ])
+        await db.commit()
+
+
+@pytest.mark.parametrize("params, expected", [
+    ({}, range(12)),
+    ({"sasOrigin": "0xSAS"}, [1, 3, 5, 7, 9, 11]),
+    ({"state": "AUTHORIZED"}, range(4)),
+    ({"channelType": "GAA", "sasOrigin": "0xOTHER"}, [0, 6]),
+    ({"fccId": "C1"}, []),
+    # Sobreposição com [3575, 3605) MHz: g2 (3570-3580) até g5 (3600-3610)
+    ({"minFrequency": 3575000000, "maxFrequency": 3605000000}, [2, 3, 4, 5]),
+])
+async def test_grant_listing_filters_across_pages(listed, client, params, expected):
+    grants = await read_pages(client, "/v1.3/grants", "grants", limit=2, **params)
+    assert [grant["grantId"] for grant in grants] == [f"g{i}" for i in expected]
+
+
+async def test_cbsd_listing_filters_by_category_and_inclusive_region(listed, client):
+    cbsds = await read_pages(client, "/v1.3/cbsds", "cbsds", limit=2)
+    assert [cbsd["fccId"] for cbsd in cbsds] == [f"C{i}" for i in range(6)]
+    region = {"minLatitude": 40100000, "maxLatitude": 40400000, "minLongitude": -75400000, "maxLongitude": -75100000}
+    cbsds = await read_pages(client, "/v1.3/cbsds", "cbsds", limit=1, **region)
+    assert [cbsd["fccId"] for cbsd in cbsds] == ["C1", "C2", "C3", "C4"]
+    cbsds = await read_pages(client, "/v1.3/cbsds", "cbsds", limit=1, cbsdCategory="A", sasOrigin="0xSAS", **region)
+    assert [cbsd["fccId"] for cbsd in cbsds] == ["C3"]
+
+
+async def test_cbsd_grants_paginate(listed, client):
+    first = (await client.get("/v1.3/grants/C0/SN0", params={"limit": 5})).json()
+    assert len(first["grants"]) == 5 and first["nextCursor"]
+    grants = await read_pages(client, "/v1.3/grants/C0/SN0", "grants", limit=5)
+    assert [grant["grantId"] for grant in grants] == [f"g{i}" for i in range(12)]
+
+
+@pytest.mark.parametrize("path", ["/v1.3/grants", "/v1.3/cbsds", "/v1.3/grants/C0/SN0"])
+@pytest.mark.parametrize("cursor", ["not-a-cursor", base64.urlsafe_b64encode(b"cbsd|5").decode(), base64.urlsafe_b64encode(b"id|x").decode()])
+async def test_invalid_cursor_is_rejected(listed, client, path, cursor):
+    response = await client.get(path, params={"cursor": cursor})
+    assert response.status_code == 400
@@ -0,0 +1,46 @@
+from prometheus_client import REGISTRY
+
+from src.services.metrics import instrument_engine
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+async def test_latency_is_labelled_by_route_template(client):
+    labels = {"method": "GET", "route": "/v1.3/cbsd/{fcc_id}/{cbsd_serial_number}", "status": "404"}
+    before = sample("sas_request_duration_seconds_count", **labels)
+    await client.get("/v1.3/cbsd/A/SN1")
+    await client.get("/v1.3/cbsd/B/SN2")
+    assert sample("sas_request_duration_seconds_count", **labels) == before + 2
+    # Paths concretos nunca viram rótulos
+    assert sample("sas_request_duration_seconds_count", method="GET", route="/v1.3/cbsd/A/SN1", status="404") == 0
+
+
+async def test_unknown_paths_share_one_label(client):
+    labels = {"method": "GET", "route": "<unmatched>", "status": "404"}
+    before = sample("sas_request_duration_seconds_count", **labels)
+    await client.get("/no/such/path")
+    await client.get("/another/one")
+    assert sample("sas_request_duration_seconds_count", **labels) == before + 2
+
+
+async def test_database_queries_are_counted_per_request(start_api, engine):
+    instrument_engine(engine)
+    async with start_api() as client:
+        before = sample("sas_request_db_queries_sum", route="/v1.3/cbsds")
+        count = sample("sas_request_db_queries_count", route="/v1.3/cbsds")
+        await client.get("/v1.3/cbsds")
+        assert sample("sas_request_db_queries_count", route="/v1.3/cbsds") == count + 1
+        assert sample("sas_request_db_queries_sum", route="/v1.3/cbsds") == before + 1
+
+
+async def test_metrics_endpoint_exposes_cache_and_ledger_series(client):
+    await client.post("/sas/authorize", json={"sas_address": "0xSAS"})
+    await client.get("/sas/0xUNKNOWN/authorized")
+    response = await client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'sas_events_written_total{event_type="SAS_AUTHORIZED"}' in body
+    assert 'sas_cache_lookups_total{cache="sas_auth",result="miss"}' in body
+    assert 'sas_request_duration_seconds_bucket{le="0.001",method="POST",route="/sas/authorize",status="200"}' in body
@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import insert
+
+from src.models.cbsd import CBSD
+from src.models.grant import Grant
+from src.services import serialization
+from src.services.serialization import dumps, load_json_field
+from tests.factories import cbsd_row, grant_row
+
+
+class Item(BaseModel):
+    grantId: str
+    responseCode: int
+
+
+@pytest.mark.parametrize("with_orjson", [True, False])
+def test_dumps_is_compact_utf8_with_or_without_orjson(monkeypatch, with_orjson):
+    if not with_orjson:
+        monkeypatch.setattr(serialization, "orjson", None)
+    content = {
+        "grantResponse": [Item(grantId="g1", responseCode=0)],
+        "sasOrigin": "São Paulo",
+        "at": datetime(2026, 1, 1, tzinfo=timezone.utc),
+        "ratio": 0.5,
+        "nextCursor": None
+    }
+    assert dumps(content) == (
+        '{"grantResponse":[{"grantId":"g1","responseCode":0}],"sasOrigin":"São Paulo",'
+        '"at":"2026-01-01T00:00:00+00:00","ratio":0.5,"nextCursor":null}'
+    ).encode()
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_json_field_is_decoded_once_per_value():
+    assert load_json_field('["RECEIVED_POWER_WITHOUT_GRANT"]') is load_json_field('["RECEIVED_POWER_WITHOUT_GRANT"]')
+
+
+async def test_read_endpoints_keep_the_winnf_shape(start_api, session_factory):
+    async with session_factory() as db:
+        await db.execute(insert(CBSD), [cbsd_row("A", meas_capability='["RECEIVED_POWER_WITHOUT_GRANT"]')])
+        await db.execute(insert(Grant), [grant_row("g1", "A")])
+        await db.commit()
+
+    async with start_api() as client:
+        response = await client.get("/v1.3/cbsd/A/SN1")
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == {
+            "fccId": "A", "userId": "user", "cbsdSerialNumber": "SN1", "callSign": "CALL",
+            "cbsdCategory": "A", "airInterface": "NR", "measCapability": ["RECEIVED_POWER_WITHOUT_GRANT"],
+            "eirpCapability": 30, "latitude": 0, "longitude": 0, "height": 10, "heightType": "AGL",
+            "indoorDeployment": False, "antennaGain": 5, "antennaBeamwidth": 60, "antennaAzimuth": 0,
+            "groupingParam": None, "cbsdAddress": "0xcbsd", "sasOrigin": "0xSAS",
+            "registrationTimestamp": 1700000000
+        }
+        grants = (await client.get("/v1.3/grants/A/SN1")).json()
+        assert grants == {"grants": [{
+            "grantId": "g1", "channelType": "PAL", "grantExpireTime": 4102444800, "terminated": False,
+            "maxEirp": 20, "lowFrequency": 3550000000, "highFrequency": 3560000000, "requestedMaxEirp": 20,
+            "requestedLowFrequency": 3550000000, "requestedHighFrequency": 3560000000, "sasOrigin": "0xSAS",
+            "grantTimestamp": 1700000000
+        }], "nextCursor": None}
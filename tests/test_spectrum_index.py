@@ -0,0 +1,95 @@
+import random
+
+from src.services.spectrum_index import IntervalTree, SpectrumIndex
+
+
+def depth(node) -> int:
+    return 0 if node is None else 1 + max(depth(node.left), depth(node.right))
+
+
+def check_max_high(node) -> int:
+    if node is None:
+        return -1
+    expected = max(node.high, check_max_high(node.left), check_max_high(node.right))
+    assert node.max_high == expected
+    return expected
+
+
+def test_interval_tree_matches_brute_force():
+    rng = random.Random(7)
+    tree = IntervalTree()
+    intervals = {}
+    for i in range(500):
+        low = rng.randrange(0, 10000)
+        intervals[f"g{i}"] = (low, low + rng.randrange(1, 300))
+        tree.insert(*intervals[f"g{i}"], f"g{i}")
+    for key in rng.sample(sorted(intervals), 200):
+        assert tree.remove(intervals[key][0], key)
+        del intervals[key]
+    check_max_high(tree._root)
+    assert len(tree) == len(intervals)
+    for _ in range(300):
+        low = rng.randrange(0, 10000)
+        high = low + rng.randrange(1, 500)
+        expected = {key for key, (a, b) in intervals.items() if a < high and b > low}
+        assert set(tree.overlapping(low, high)) == expected
+
+
+def test_interval_tree_half_open_bounds():
+    tree = IntervalTree()
+    tree.insert(100, 200, "a")
+    assert tree.overlapping(200, 300) == []
+    assert tree.overlapping(0, 100) == []
+    assert tree.overlapping(199, 201) == ["a"]
+
+
+def test_interval_tree_stays_balanced_with_sorted_inserts():
+    random.seed(1)
+    tree = IntervalTree()
+    for i in range(4096):
+        tree.insert(i * 10, i * 10 + 5, f"g{i}")
+    # Treap: profundidade esperada ~3 ln n (~25 para 4096); uma lista ligada teria 4096
+    assert depth(tree._root) < 60
+    for i in range(0, 4096, 2):
+        assert tree.remove(i * 10, f"g{i}")
+    assert depth(tree._root) < 60
+    check_max_high(tree._root)
+    assert not tree.remove(0, "g0")
+
+
+def test_conflicts_only_with_other_cbsds_in_protected_types():
+    index = SpectrumIndex()
+    cell = index.cell_for(40000000, -75000000)
+    index.add("pal", "CBSD1", "PAL", 3550000000, 3560000000, cell)
+    index.add("gaa", "CBSD1", "GAA", 3560000000, 3570000000, cell)
+    assert index.find_conflicts("CBSD2", 3555000000, 3565000000, cell) == ["pal"]
+    # Os próprios grants e a borda superior do intervalo não conflitam
+    assert index.find_conflicts("CBSD1", 3555000000, 3565000000, cell) == []
+    assert index.find_conflicts("CBSD2", 3560000000, 3570000000, cell) == []
+
+
+def test_conflicts_reach_neighbouring_cells_only():
+    index = SpectrumIndex(cell_degrees=0.5)
+    row, col = index.cell_for(40000000, -75000000)
+    index.add("pal", "CBSD1", "PAL", 3550000000, 3560000000, (row, col))
+    assert index.find_conflicts("CBSD2", 3550000000, 3560000000, (row + 1, col - 1)) == ["pal"]
+    assert index.find_conflicts("CBSD2", 3550000000, 3560000000, (row + 2, col)) == []
+
+
+def test_remove_cbsd_drops_all_its_grants():
+    index = SpectrumIndex()
+    index.add("a", "CBSD1", "PAL", 3550000000, 3560000000, (0, 0))
+    index.add("b", "CBSD1", "PAL", 3600000000, 3610000000, (0, 0))
+    index.add("c", "CBSD2", "PAL", 3650000000, 3660000000, (0, 0))
+    assert sorted(index.remove_cbsd("CBSD1")) == ["a", "b"]
+    assert len(index) == 1
+    assert index.find_conflicts("CBSD3", 3550000000, 3700000000, (0, 0)) == ["c"]
+
+
+def test_replicated_messages_apply_to_other_workers():
+    source, replica = SpectrumIndex(), SpectrumIndex()
+    source.add("a", "CBSD1", "PAL", 3550000000, 3560000000, (3, 4))
+    replica.apply({"op": "add", "grants": [source.get("a").__dict__]})
+    assert replica.find_conflicts("CBSD2", 3550000000, 3560000000, (3, 4)) == ["a"]
+    replica.apply({"op": "remove", "grantIds": ["a"]})
+    assert len(replica) == 0
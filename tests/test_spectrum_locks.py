@@ -0,0 +1,156 @@
+import asyncio
+import random
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.models.cbsd import CBSD
+from src.models.grant import Grant
+from src.services.spectrum_index import SpectrumIndex
+from src.services.spectrum_locks import Allocation, SpectrumLocks
+from tests.factories import cbsd_row, grant_row
+
+BAND_HZ = 10000000
+
+
+def locks() -> SpectrumLocks:
+    return SpectrumLocks(SpectrumIndex(), band_hz=BAND_HZ)
+
+
+def blocking_keys(first: Allocation, second: Allocation):
+    """Chaves comuns em que ao menos um dos lados pede o lock exclusivo"""
+    first_keys, second_keys = locks().lock_keys([first]), locks().lock_keys([second])
+    return [key for key in first_keys.keys() & second_keys.keys() if first_keys[key] or second_keys[key]]
+
+
+def test_pal_locks_own_cell_exclusive_and_neighbours_shared():
+    keys = locks().lock_keys([Allocation("A", "PAL", 3550000000, 3560000000, (10, 20))])
+    assert len(keys) == 9
+    assert sum(keys.values()) == 1
+
+
+def test_gaa_locks_everything_shared():
+    keys = locks().lock_keys([Allocation("A", "GAA", 3550000000, 3560000000, (10, 20))])
+    assert len(keys) == 9 and not any(keys.values())
+
+
+def test_bands_follow_half_open_range():
+    inside = locks().lock_keys([Allocation("A", "GAA", 3550000000, 3560000000, (0, 0))])
+    crossing = locks().lock_keys([Allocation("A", "GAA", 3555000000, 3565000000, (0, 0))])
+    assert len(inside) == 9
+    assert len(crossing) == 18
+
+
+def test_exclusive_wins_when_allocations_share_a_key():
+    keys = locks().lock_keys([
+        Allocation("A", "GAA", 3550000000, 3560000000, (0, 1)),
+        Allocation("B", "PAL", 3550000000, 3560000000, (0, 0)),
+    ])
+    own_cell = locks().lock_keys([Allocation("B", "PAL", 3550000000, 3560000000, (0, 0))])
+    exclusive_key = next(key for key, exclusive in own_cell.items() if exclusive)
+    assert keys[exclusive_key]
+    assert sum(keys.values()) == 1
+
+
+def test_conflicting_allocations_always_share_a_blocking_key():
+    rng = random.Random(3)
+    for _ in range(2000):
+        allocations = []
+        for fcc_id in ("A", "B"):
+            low = 3550000000 + rng.randrange(0, 30) * 5000000
+            allocations.append(Allocation(
+                fcc_id, rng.choice(["PAL", "GAA"]), low, low + rng.choice([5000000, 10000000, 20000000]),
+                (rng.randrange(-3, 4), rng.randrange(-3, 4))
+            ))
+        first, second = allocations
+        neighbours = max(abs(first.cell[0] - second.cell[0]), abs(first.cell[1] - second.cell[1])) <= 1
+        overlap = first.low_frequency < second.high_frequency and second.low_frequency < first.high_frequency
+        protected = "PAL" in (first.channel_type, second.channel_type)
+        if neighbours and overlap and protected:
+            assert blocking_keys(first, second), (first, second)
+        if not protected:
+            assert not blocking_keys(first, second)
+
+
+def test_cells_two_apart_do_not_block_each_other():
+    first = Allocation("A", "PAL", 3550000000, 3560000000, (0, 0))
+    second = Allocation("B", "PAL", 3550000000, 3560000000, (0, 2))
+    assert not blocking_keys(first, second)
+
+
+class RecordingSession:
+    def __init__(self):
+        self.params = []
+
+    async def execute(self, statement, params):
+        self.params.append(params)
+
+
+async def test_acquire_takes_keys_in_ascending_order():
+    session = RecordingSession()
+    await locks().acquire(session, [
+        Allocation("A", "PAL", 3600000000, 3620000000, (5, -3)),
+        Allocation("B", "GAA", 3550000000, 3560000000, (-1, 7)),
+    ])
+    (params,) = session.params
+    assert params["keys"] == sorted(params["keys"])
+    assert len(set(params["keys"])) == len(params["keys"])
+    assert len(params["exclusive"]) == len(params["keys"])
+    assert sum(params["exclusive"]) == 2
+    assert all(0 < key < 2 ** 63 for key in params["keys"])
+
+
+async def insert_cbsds(session_factory, *grants):
+    """CBSDs A e B na mesma célula e FAR 5 graus ao norte, com os grants informados"""
+    async with session_factory() as db:
+        await db.execute(insert(CBSD), [
+            cbsd_row("A", "SN1", latitude=40000000, longitude=-75000000),
+            cbsd_row("B", "SN2", latitude=40100000, longitude=-75000000),
+            cbsd_row("FAR", "SN3", latitude=45000000, longitude=-75000000),
+        ])
+        if grants:
+            await db.execute(insert(Grant), list(grants))
+        await db.commit()
+
+
+@pytest.mark.postgres
+async def test_lock_and_check_finds_committed_conflicts(postgres_engine):
+    session_factory = async_sessionmaker(postgres_engine, expire_on_commit=False)
+    await insert_cbsds(session_factory, grant_row("g1", "A"), grant_row("g2", "FAR", 3600000000, 3610000000, cbsd_serial_number="SN3"))
+    spectrum_locks = locks()
+    cell = spectrum_locks.spectrum_index.cell_for(40000000, -75000000)
+    async with session_factory() as db:
+        conflicts = await spectrum_locks.lock_and_check(db, [
+            Allocation("B", "PAL", 3555000000, 3565000000, cell),  # sobrepõe g1
+            Allocation("B", "PAL", 3560000000, 3570000000, cell),  # adjacente a g1
+            Allocation("A", "PAL", 3550000000, 3560000000, cell),  # grant do próprio CBSD
+            Allocation("B", "GAA", 3550000000, 3560000000, (cell[0], cell[1] + 1)),  # GAA ao lado de PAL
+            Allocation("B", "PAL", 3600000000, 3610000000, cell),  # g2 fica longe
+        ])
+        await db.rollback()
+    assert conflicts == [True, False, False, True, False]
+
+
+@pytest.mark.postgres
+async def test_lock_and_check_waits_for_the_holder_to_commit(postgres_engine):
+    session_factory = async_sessionmaker(postgres_engine, expire_on_commit=False)
+    await insert_cbsds(session_factory)
+    spectrum_locks = locks()
+    cell = spectrum_locks.spectrum_index.cell_for(40000000, -75000000)
+    async with session_factory() as first, session_factory() as second, session_factory() as third:
+        assert await spectrum_locks.lock_and_check(first, [Allocation("A", "PAL", 3550000000, 3560000000, cell)]) == [False]
+        waiting = asyncio.create_task(
+            spectrum_locks.lock_and_check(second, [Allocation("B", "PAL", 3555000000, 3565000000, cell)])
+        )
+        # Faixa que não se sobrepõe não espera
+        other_band = [Allocation("B", "PAL", 3600000000, 3610000000, cell)]
+        assert await asyncio.wait_for(spectrum_locks.lock_and_check(third, other_band), 5) == [False]
+        await asyncio.sleep(0.2)
+        assert not waiting.done()
+        await first.execute(insert(Grant), [grant_row("g1", "A")])
+        await first.commit()
+        # Liberado no commit, quando o grant já é visível
+        assert await asyncio.wait_for(waiting, 5) == [True]
+        await second.rollback()
+        await third.rollback()
@@ -0,0 +1,78 @@
+import sqlite3
+from contextlib import closing
+
+from sqlalchemy import event, insert
+
+from src.models.cbsd import CBSD
+from src.models.grant import Grant
+from src.models.stats import StatsCounter
+from src.services.stats import CBSDS, GRANTS_ACTIVE, StatsCounters
+from tests.factories import cbsd_row, grant_row
+
+
+def counters(session_factory) -> StatsCounters:
+    stats = StatsCounters()
+    stats._session_factory = session_factory
+    return stats
+
+
+async def test_reconcile_counts_tables_per_sas(session_factory):
+    async with session_factory() as db:
+        await db.execute(insert(CBSD), [cbsd_row("A", "SN1", sas_origin="0x1"), cbsd_row("B", "SN2", sas_origin="0x2")])
+        await db.execute(insert(Grant), [grant_row("G1", "A", sas_origin="0x1"), grant_row("G2", "A", terminated=True, sas_origin="0x1")])
+        await db.execute(insert(StatsCounter), [{"name": f"{CBSDS}:0xGONE", "value": 4}])
+        await db.commit()
+    stats = counters(session_factory)
+    await stats.reconcile()
+    snapshot = stats.snapshot()
+    assert snapshot["totals"] == {"cbsds": 2, "grants_active": 1, "grants_terminated": 1, "events": 0, "sas_authorized": 0}
+    assert snapshot["perSas"] == {
+        "0x1": {"cbsds": 1, "grants_active": 1, "grants_terminated": 1},
+        "0x2": {"cbsds": 1}
+    }
+
+
+async def test_reconcile_does_not_apply_counted_deltas_twice(session_factory):
+    async with session_factory() as db:
+        await db.execute(insert(CBSD), [cbsd_row("A", "SN1")])
+        await db.commit()
+    stats = counters(session_factory)
+    # Delta de um commit já visível para a contagem, ainda não gravado
+    stats.add(CBSDS, 1, "0xSAS")
+    await stats.reconcile()
+    assert stats.get(CBSDS) == 1
+    await stats.flush()
+    assert stats.get(CBSDS) == 1
+
+
+async def test_delta_committed_while_reconcile_runs_counts_once(engine, session_factory):
+    stats = counters(session_factory)
+    database = engine.url.database
+    injected = []
+
+    def commit_during_reconcile(connection, cursor, statement, parameters, context, executemany):
+        # Um handler confirma um CBSD e registra o delta enquanto a reconciliação está em andamento
+        if injected:
+            return
+        injected.append(statement)
+        row = cbsd_row("LATE", "SN9")
+        with closing(sqlite3.connect(database)) as other, other:
+            other.execute(f"INSERT INTO cbsds ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})", list(row.values()))
+        stats.add(CBSDS, 1, "0xSAS")
+
+    event.listen(engine.sync_engine, "before_cursor_execute", commit_during_reconcile)
+    await stats.reconcile()
+    event.remove(engine.sync_engine, "before_cursor_execute", commit_during_reconcile)
+    assert injected
+    await stats.flush()
+    assert stats.get(CBSDS) == 1
+
+
+async def test_flush_from_another_worker_adds_on_top_of_reconcile(session_factory):
+    stats, other = counters(session_factory), counters(session_factory)
+    await stats.reconcile()
+    other.add(GRANTS_ACTIVE, 3, "0xOTHER")
+    await other.flush()
+    await stats.flush()
+    assert stats.get(GRANTS_ACTIVE) == 3
+    assert stats.snapshot()["perSas"] == {"0xOTHER": {"grants_active": 3}}
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.cbsd import CBSD
+from src.services.stats import EVENTS
+from src.services.write_queue import WriteQueue
+from tests.factories import cbsd_row
+
+
+def insert_cbsd(fcc_id: str, fail: bool = False):
+    async def operation(db):
+        await db.execute(insert(CBSD), [cbsd_row(fcc_id, f"SN-{fcc_id}")])
+        if fail:
+            raise ValueError(f"{fcc_id} recusado")
+        return fcc_id
+    return operation
+
+
+async def stored_fcc_ids(session_factory):
+    async with session_factory() as db:
+        return set((await db.execute(select(CBSD.fcc_id))).scalars())
+
+
+@pytest.fixture
+def commits(engine):
+    commits = []
+    event.listen(engine.sync_engine, "commit", lambda connection: commits.append(connection))
+    return commits
+
+
+@pytest.fixture
+async def queue(engine):
+    queue = WriteQueue(max_batch=16, max_delay=0.05)
+    queue.start(engine)
+    yield queue
+    await queue.stop()
+
+
+async def test_failed_operation_rolls_back_only_its_savepoint(queue, commits, session_factory):
+    results = await asyncio.gather(
+        queue.submit(insert_cbsd("A")),
+        queue.submit(insert_cbsd("B", fail=True)),
+        queue.submit(insert_cbsd("C")),
+        queue.submit(insert_cbsd("A")),
+        return_exceptions=True
+    )
+    assert results[0] == "A" and results[2] == "C"
+    assert isinstance(results[1], ValueError)
+    assert isinstance(results[3], IntegrityError)
+    assert len(commits) == 1
+    assert await stored_fcc_ids(session_factory) == {"A", "C"}
+
+
+async def test_commit_failure_fails_whole_group(queue, session_factory, monkeypatch):
+    async def failing_commit(self):
+        raise OSError("disco cheio")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(AsyncSession, "commit", failing_commit)
+        results = await asyncio.gather(
+            queue.submit(insert_cbsd("A")),
+            queue.submit(insert_cbsd("B")),
+            return_exceptions=True
+        )
+    assert all(isinstance(result, OSError) for result in results)
+    assert await stored_fcc_ids(session_factory) == set()
+    # O escritor continua funcionando depois da falha
+    assert await queue.submit(insert_cbsd("C")) == "C"
+    assert await stored_fcc_ids(session_factory) == {"C"}
+
+
+async def test_stop_writes_queued_operations(engine, session_factory):
+    queue = WriteQueue(max_batch=2, max_delay=0)
+    queue.start(engine)
+    submitted = [asyncio.ensure_future(queue.submit(insert_cbsd(f"F{i}"))) for i in range(5)]
+    await asyncio.sleep(0)
+    await queue.stop()
+    assert [future.result() for future in submitted] == [f"F{i}" for i in range(5)]
+    assert await stored_fcc_ids(session_factory) == {f"F{i}" for i in range(5)}
+
+
+async def test_ledger_stats_and_archive_commit_through_the_writer(start_api, commits, tmp_path):
+    from src.api import main
+
+    async with start_api(write_queue_enabled=True, event_archive_dir=str(tmp_path)) as client:
+        await client.post("/sas/authorize", json={"sas_address": "0xSAS"})
+        await main.event_ledger.flush()
+        await main.stats_counters.flush()
+        await main.stats_counters.reconcile()
+        assert await main.event_archiver.archive(main.AsyncSessionLocal, datetime.now(timezone.utc) + timedelta(days=1)) == 1
+        assert main.event_ledger.blocks_written == 1 and main.stats_counters.get(EVENTS) == 1
+        # Todos os commits saíram da conexão do escritor único
+        assert len({id(connection) for connection in commits}) == 1